@@ -0,0 +1,241 @@
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import urljoin
+
+from flask import Blueprint, current_app, request, stream_with_context, url_for
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from catalog import apply_filters, movie_page, page_size_arg
+from images import poster_url
+from models import db, Movie, Screening
+from scheduling import Showtime, showtimes
+from seat_map import get_seat_map
+
+# orjson 为可选依赖：未安装时使用标准库 json，输出相同
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 默认参数，可通过 app.config 覆盖
+DEFAULT_BATCH_MAX = 50
+DEFAULT_EXPORT_BATCH = 500
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# 各资源可选的字段（?fields= 逗号分隔）与未指定时返回的字段
+MOVIE_COLUMNS = ('movie_id', 'title', 'director', 'actors', 'genre', 'duration', 'release_date',
+                 'description', 'rating', 'review_count')
+# 海报字段 -> 图片尺寸，返回绝对地址
+MOVIE_POSTERS = {'poster': 'card', 'poster_thumb': 'thumb', 'poster_hero': 'hero'}
+MOVIE_FIELDS = MOVIE_COLUMNS + tuple(MOVIE_POSTERS)
+MOVIE_DEFAULT_FIELDS = ('movie_id', 'title', 'director', 'genre', 'duration', 'release_date', 'rating',
+                        'review_count', 'poster')
+SHOWTIME_FIELDS = Showtime._fields
+# occupied 为已售或锁定的座位号；seats 为逐个座位 [座位号, 排, 列, 类型]，数据量较大，需显式选择
+SEAT_MAP_FIELDS = ('screening_id', 'hall_id', 'rows', 'cols', 'layout', 'seat_id_base', 'available',
+                   'occupied', 'seats')
+SEAT_MAP_DEFAULT_FIELDS = SEAT_MAP_FIELDS[:-1]
+
+
+# 请求参数有误，返回 {"error": {"status": ..., "message": ...}}
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'无法序列化 {type(value).__name__}')
+
+
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def _json_response(body, status=200):
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+
+@api.errorhandler(ApiError)
+def _api_error(error):
+    return _json_response(dumps({'error': {'status': error.status, 'message': str(error)}}), error.status)
+
+
+@api.errorhandler(404)
+def _not_found(error):
+    return _api_error(ApiError('资源不存在', 404))
+
+
+# 稀疏字段：?fields=a,b,c，未指定时使用默认字段
+def _fields(allowed, default):
+    value = request.args.get('fields')
+    if not value:
+        return default
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ApiError(f'未知字段：{",".join(unknown)}；可选字段：{",".join(allowed)}')
+    return fields or default
+
+
+# 批量接口的 ID 列表：?name=1,2,3，去重后保持顺序，数量不超过 API_BATCH_MAX
+def _ids(name):
+    try:
+        ids = list(dict.fromkeys(int(value) for value in request.args.get(name, '').split(',') if value.strip()))
+    except ValueError:
+        raise ApiError(f'{name} 须为逗号分隔的整数')
+    limit = current_app.config.get('API_BATCH_MAX', DEFAULT_BATCH_MAX)
+    if not ids or len(ids) > limit:
+        raise ApiError(f'{name} 须包含 1 到 {limit} 个 ID')
+    return ids
+
+
+# 文档结构 {"data": [...], 其他键...}；每一项单独序列化，逐块输出
+def _document(items, **meta):
+    yield b'{"data":['
+    for position, item in enumerate(items):
+        yield dumps(item) if position == 0 else b',' + dumps(item)
+    yield b']'
+    for key, value in meta.items():
+        yield b',' + dumps(key) + b':' + dumps(value)
+    yield b'}'
+
+
+# 有界的结果：序列化后按内容计算 ETag，客户端带 If-None-Match 且内容未变时返回 304，不传输正文
+def _conditional(chunks):
+    body = b''.join(chunks)
+    response = _json_response(body)
+    response.set_etag(hashlib.md5(body).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def _movie(movie, fields):
+    item = {}
+    for field in fields:
+        if field in MOVIE_POSTERS:
+            item[field] = urljoin(request.host_url, poster_url(movie, MOVIE_POSTERS[field]))
+        else:
+            item[field] = getattr(movie, field)
+    return item
+
+
+# 电影列表：?search=&genre=&year=&cursor=&per_page=&fields=，按 movie_id 的键集分页（检索时按相关度位置），
+# next_cursor 为空表示没有下一页
+@api.route('/movies')
+def movies():
+    fields = _fields(MOVIE_FIELDS, MOVIE_DEFAULT_FIELDS)
+    page, next_cursor = movie_page(
+        request.args.get('search', ''),
+        request.args.get('genre', ''),
+        request.args.get('year', ''),
+        cursor=request.args.get('cursor'),
+        page_size=page_size_arg(request.args.get('per_page'))
+    )
+    return _conditional(_document((_movie(movie, fields) for movie in page), next_cursor=next_cursor))
+
+
+@api.route('/movies/<int:movie_id>')
+def movie(movie_id):
+    fields = _fields(MOVIE_FIELDS, MOVIE_DEFAULT_FIELDS)
+    return _conditional([dumps({'data': _movie(Movie.query.get_or_404(movie_id), fields)})])
+
+
+# 全部电影：?genre=&year=&fields=，只查询所选字段需要的列，按 movie_id 分批读取并边查边输出，不在内存中拼出整个结果
+@api.route('/movies/export')
+def movie_export():
+    fields = _fields(MOVIE_FIELDS, MOVIE_DEFAULT_FIELDS)
+    names = {'movie_id'} | {field for field in fields if field in MOVIE_COLUMNS}
+    if any(field in MOVIE_POSTERS for field in fields):
+        names |= {'poster', 'poster_image'}
+    columns = [getattr(Movie, name) for name in sorted(names)]
+    genre = request.args.get('genre', '')
+    year = request.args.get('year', '')
+    batch_size = current_app.config.get('API_EXPORT_BATCH', DEFAULT_EXPORT_BATCH)
+
+    def rows():
+        last_id = 0
+        while True:
+            batch = db.session.execute(
+                apply_filters(select(*columns), genre, year)
+                .where(Movie.movie_id > last_id).order_by(Movie.movie_id).limit(batch_size)
+            ).all()
+            for row in batch:
+                yield _movie(row, fields)
+            if len(batch) < batch_size:
+                return
+            last_id = batch[-1].movie_id
+
+    return _json_response(stream_with_context(_document(rows())))
+
+
+# 多部电影的场次：?movie_ids=1,2,3&fields=，按日期分组，已开场的场次不返回；未缓存的电影合并为一次查询
+@api.route('/showtimes')
+def showtimes_batch():
+    movie_ids = _ids('movie_ids')
+    fields = _fields(SHOWTIME_FIELDS, SHOWTIME_FIELDS)
+    by_movie = showtimes.by_date_many(movie_ids)
+    return _conditional(_document({
+        'movie_id': movie_id,
+        'days': [{
+            'date': day['date'],
+            'screenings': [{field: getattr(showtime, field) for field in fields} for showtime in day['screenings']]
+        } for day in by_movie[movie_id]]
+    } for movie_id in movie_ids))
+
+
+def _seat_map(screening, fields):
+    seat_map = get_seat_map(screening)
+    layout = seat_map.layout
+    values = {
+        'screening_id': lambda: screening.screening_id,
+        'hall_id': lambda: layout.hall_id,
+        'rows': lambda: layout.rows,
+        'cols': lambda: layout.cols,
+        'layout': layout.encoded,
+        'seat_id_base': lambda: layout.seat_id_base,
+        'available': lambda: layout.capacity - seat_map.occupied_count(),
+        'occupied': lambda: [seat.seat_id for seat in layout.seats if seat_map.is_occupied(seat)],
+        'seats': lambda: [[seat.seat_id, seat.seat_row, seat.seat_col, seat.type] for seat in layout.seats],
+    }
+    return {field: values[field]() for field in fields}
+
+
+# 多个场次的座位图：?screening_ids=1,2&fields=；layout 为放映厅布局编码（格式同 flask provision-halls），
+# 座位号为 seat_id_base + 行 * cols + 列；missing 为不存在的场次
+@api.route('/seat-maps')
+def seat_maps():
+    screening_ids = _ids('screening_ids')
+    fields = _fields(SEAT_MAP_FIELDS, SEAT_MAP_DEFAULT_FIELDS)
+    found = {
+        screening.screening_id: screening
+        for screening in Screening.query.options(joinedload(Screening.hall))
+        .filter(Screening.screening_id.in_(screening_ids))
+    }
+    return _conditional(_document(
+        (_seat_map(found[screening_id], fields) for screening_id in screening_ids if screening_id in found),
+        missing=[screening_id for screening_id in screening_ids if screening_id not in found]
+    ))
+
+
+# 接口入口：列出各接口地址，便于客户端发现
+@api.route('/')
+def index():
+    return _json_response(dumps({
+        'version': 1,
+        'movies': url_for('api.movies', _external=True),
+        'movie_export': url_for('api.movie_export', _external=True),
+        'showtimes': url_for('api.showtimes_batch', _external=True),
+        'seat_maps': url_for('api.seat_maps', _external=True),
+    }))
@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from flask import abort, current_app, request, send_file, url_for
+
+# brotli 为可选依赖：未安装时只生成 gzip 预压缩文件
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# rcssmin / rjsmin 为可选依赖：未安装时 CSS / JavaScript 不压缩，直接使用源文件内容
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+# 内容哈希命名的文件内容不会变化，浏览器与 CDN 可以缓存一年且无需再验证
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+MANIFEST = 'manifest.json'
+# 预压缩文件：Accept-Encoding 中的编码 -> 文件后缀，按优先顺序
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+MIMETYPES = {'.css': 'text/css', '.js': 'application/javascript'}
+# 可用的压缩器：扩展名 -> 函数；对应的库未安装时该类文件原样构建（仍按内容哈希命名并预压缩）
+MINIFIERS = {}
+if rcssmin is not None:
+    MINIFIERS['.css'] = rcssmin.cssmin
+if rjsmin is not None:
+    MINIFIERS['.js'] = rjsmin.jsmin
+
+
+# 响应可被浏览器与 CDN 长期缓存（文件名带内容哈希，内容变化时地址随之变化）
+def immutable(response):
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+# 构建静态资源：压缩 ASSET_FILES 中的文件（需要 rcssmin / rjsmin，未安装时原样使用），按内容哈希命名写入 ASSET_BUILD_DIR，
+# 同时生成 .gz 与 .br 预压缩文件，最后写入清单（原路径 -> 构建后的路径）。旧版本文件保留，已缓存的页面仍能取到它们引用的文件；返回清单
+def build_assets(app=None):
+    app = app or current_app
+    build_dir = asset_build_dir(app)
+    manifest = {}
+    for filename in app.config.get('ASSET_FILES', ()):
+        with open(os.path.join(app.static_folder, filename), encoding='utf-8') as f:
+            source = f.read()
+        stem, ext = os.path.splitext(filename)
+        minify = MINIFIERS.get(ext)
+        data = (minify(source) if minify else source).encode('utf-8')
+        built = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        path = os.path.join(build_dir, built)
+        if not os.path.exists(path):
+            _write(path + '.gz', gzip.compress(data, 9, mtime=0))
+            if brotli is not None:
+                _write(path + '.br', brotli.compress(data, quality=11))
+            _write(path, data)
+        manifest[filename] = built
+    _write(os.path.join(build_dir, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    bundles.reload()
+    return manifest
+
+
+def asset_build_dir(app=None):
+    app = app or current_app
+    return app.config.get('ASSET_BUILD_DIR') or os.path.join(app.static_folder, 'dist')
+
+
+# 构建清单，每个进程第一次使用时读取；没有清单（未执行构建）时页面直接引用源文件
+class AssetBundles:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._manifest = None
+
+    def manifest(self):
+        with self._lock:
+            if self._manifest is None:
+                try:
+                    with open(os.path.join(asset_build_dir(), MANIFEST), encoding='utf-8') as f:
+                        self._manifest = json.load(f)
+                except (OSError, ValueError):
+                    self._manifest = {}
+            return self._manifest
+
+    def reload(self):
+        with self._lock:
+            self._manifest = None
+
+
+bundles = AssetBundles()
+
+
+# 模板中替代 url_for 使用：asset_url('static', filename='css/style.css') 返回构建后的带哈希地址，
+# 未构建的文件与其他端点原样交给 url_for
+def asset_url(endpoint, **values):
+    if endpoint == 'static' and current_app.config.get('ASSET_BUNDLES_ENABLED', True):
+        built = bundles.manifest().get(values.get('filename'))
+        if built:
+            values['filename'] = built
+            return url_for('main.asset', **values)
+    return url_for(endpoint, **values)
+
+
+# 返回构建后的文件：按 Accept-Encoding 选择 br / gzip 预压缩版本，长期缓存
+def send_asset(filename):
+    build_dir = asset_build_dir()
+    path = os.path.realpath(os.path.join(build_dir, filename))
+    if filename == MANIFEST or not path.startswith(os.path.realpath(build_dir) + os.sep) or not os.path.isfile(path):
+        abort(404)
+
+    mimetype = MIMETYPES.get(os.path.splitext(path)[1])
+    download_name = os.path.basename(path)
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if request.accept_encodings[name] > 0 and os.path.isfile(path + suffix):
+            encoding = name
+            path += suffix
+            break
+    response = send_file(path, mimetype=mimetype, download_name=download_name, max_age=IMMUTABLE_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return immutable(response)
+
+
+def init_app(app):
+    app.jinja_env.globals['asset_url'] = asset_url
@@ -0,0 +1,82 @@
+# JSON 接口压测：客户端获取多部电影的场次时，逐个抓取电影详情页 HTML 与调用一次批量接口的请求数、SQL 条数、
+# 传输字节数和耗时对比；内容未变时带 If-None-Match 的重复请求；全量导出在 orjson 与标准库 json 下的耗时与内存峰值
+# 用法（在 backend 目录下）：python -m benchmarks.api_bench [--movies 2000] [--batch 50]
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.hall_layout_bench import StatementCounter
+
+
+def measure(counter, requests):
+    counter.reset()
+    started = time.perf_counter()
+    sizes = [len(request()) for request in requests]
+    return len(sizes), counter.count(), sum(sizes), (time.perf_counter() - started) * 1000
+
+
+def report(label, result):
+    count, statements, size, elapsed = result
+    print(f'  {label}：{count} 个请求，{statements} 条 SQL，{size / 1024:.1f} KB，{elapsed:.1f} ms')
+
+
+def run(movie_count, batch):
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    try:
+        import api
+        import scheduling
+        from app import create_app
+        from commands import prepare_database
+        from init_test_data import generate_dataset, rebuild_derived_data
+        from models import db, Screening
+
+        app = create_app({'PAGE_CACHE_ENABLED': False, 'API_BATCH_MAX': max(batch, 50)})
+        with app.app_context():
+            prepare_database()
+            generate_dataset(movies=movie_count, cinemas=10, days=2, users=100, reviews=0)
+            rebuild_derived_data()
+            movie_ids = [movie_id for (movie_id,) in db.session.query(Screening.movie_id).distinct().limit(batch)]
+            counter = StatementCounter(db.engine)
+        client = app.test_client()
+
+        print(f'{len(movie_ids)} 部电影的场次：')
+        scheduling.showtimes.invalidate()
+        report('抓取电影详情页', measure(counter, [
+            lambda movie_id=movie_id: client.get(f'/movie/{movie_id}').data for movie_id in movie_ids
+        ]))
+        url = '/api/v1/showtimes?movie_ids=' + ','.join(map(str, movie_ids))
+        for phase in ('未缓存', '已缓存'):
+            if phase == '未缓存':
+                scheduling.showtimes.invalidate()
+            report(f'批量接口（{phase}）', measure(counter, [lambda: client.get(url).data]))
+        etag = client.get(url).headers['ETag']
+        report('批量接口（If-None-Match，304）', measure(counter, [
+            lambda: client.get(url, headers={'If-None-Match': etag}).data
+        ]))
+
+        print(f'全量导出 {movie_count} 部电影：')
+        serializers = [('orjson', api.orjson), ('json', None)] if api.orjson is not None else [('json', None)]
+        for name, serializer in serializers:
+            api.orjson = serializer
+            tracemalloc.start()
+            started = time.perf_counter()
+            response = client.get('/api/v1/movies/export?fields=movie_id,title,genre,release_date,rating,poster')
+            size = sum(len(chunk) for chunk in response.response)
+            elapsed = (time.perf_counter() - started) * 1000
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f'  {name}：{size / 1024:.0f} KB，{elapsed:.0f} ms，内存峰值 {peak / 1024:.0f} KB')
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='JSON 批量接口与逐页抓取的对比')
+    parser.add_argument('--movies', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=50, help='一次获取场次的电影数')
+    args = parser.parse_args()
+    run(args.movies, args.batch)
@@ -0,0 +1,68 @@
+# 静态资源压测：对比源文件与构建后文件（压缩、gzip / brotli 预压缩）的传输字节数，
+# 并按响应的 Cache-Control 模拟一位访客间隔若干分钟反复打开页面时，浏览器需要为静态资源发出的请求数
+# 用法（在 backend 目录下）：python -m benchmarks.asset_bench [--visits 20] [--interval 10]
+import argparse
+import re
+import shutil
+import tempfile
+
+_ASSET_RE = re.compile(r'(?:href|src)="(/(?:static|assets)/(?:css|js)/[^"]+)"')
+
+
+# 打开首页与电影详情页，取出页面引用的样式表与脚本，返回 {地址: (传输字节数, max-age, immutable)}
+def page_assets(client, encoding):
+    found = {}
+    for page in ('/', '/movie/1'):
+        for url in _ASSET_RE.findall(client.get(page).get_data(as_text=True)):
+            response = client.get(url, headers={'Accept-Encoding': encoding})
+            cache_control = response.cache_control
+            found[url] = (len(response.data), cache_control.max_age or 0, bool(cache_control.immutable))
+            response.close()
+    return found
+
+
+# 模拟浏览器缓存：未过期时不发请求；过期后发条件请求（304，一次往返）；immutable 的资源在缓存有效期内从不再验证
+def simulate(assets, visits, interval):
+    fetched = {}
+    requests = 0
+    for visit in range(visits):
+        now = visit * interval * 60
+        for url, (_, max_age, _) in assets.items():
+            if url not in fetched or now - fetched[url] >= max_age:
+                requests += 1
+                fetched[url] = now
+    return requests
+
+
+def run(visits, interval, encoding):
+    build_dir = tempfile.mkdtemp()
+    try:
+        from app import create_app
+        from assets import build_assets
+
+        results = {}
+        for label, enabled in (('源文件', False), ('构建后', True)):
+            app = create_app({'PAGE_CACHE_ENABLED': False, 'ASSET_BUILD_DIR': build_dir, 'ASSET_BUNDLES_ENABLED': enabled})
+            if enabled:
+                with app.app_context():
+                    build_assets()
+            results[label] = page_assets(app.test_client(), encoding)
+
+        for label, assets in results.items():
+            total = sum(size for size, _, _ in assets.values())
+            print(f'{label}（Accept-Encoding: {encoding or "无"}）：{len(assets)} 个文件共 {total / 1024:.1f} KB')
+            for url, (size, max_age, immutable) in assets.items():
+                print(f'  {url}：{size / 1024:.1f} KB，max-age={max_age}{"，immutable" if immutable else ""}')
+            print(f'  每 {interval} 分钟访问一次、共 {visits} 次：静态资源请求 {simulate(assets, visits, interval)} 次'
+                  f'（首次访问 {len(assets)} 次）')
+    finally:
+        shutil.rmtree(build_dir)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='静态资源传输字节数与重复访问的请求数')
+    parser.add_argument('--visits', type=int, default=20)
+    parser.add_argument('--interval', type=int, default=10, help='两次访问之间的分钟数')
+    parser.add_argument('--encoding', default='br, gzip', help='模拟浏览器的 Accept-Encoding')
+    args = parser.parse_args()
+    run(args.visits, args.interval, args.encoding)
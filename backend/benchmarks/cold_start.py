@@ -0,0 +1,50 @@
+# 冷启动耗时：每轮在新的 Python 进程中测量 导入应用模块 -> create_app -> 第一个响应 的耗时
+# 使用当前数据库（需已执行 flask init-db），取多轮的中位数
+# 用法（在 backend 目录下）：python -m benchmarks.cold_start [--runs 5] [--path /movies]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+app = module.create_app()
+created = time.perf_counter()
+response = app.test_client().get(sys.argv[1])
+responded = time.perf_counter()
+print(json.dumps({
+    'status': response.status_code,
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_response_ms': (responded - created) * 1000,
+    'total_ms': (responded - started) * 1000
+}))
+'''
+
+
+def measure(path):
+    env = dict(os.environ, LOG_LEVEL='WARNING')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, path], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='测量应用冷启动到第一个响应的耗时')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', default='/', help='第一个请求的路径')
+    args = parser.parse_args()
+
+    samples = [measure(args.path) for _ in range(args.runs)]
+    statuses = {sample['status'] for sample in samples}
+    print(f'{args.runs} 轮，{args.path} 状态码 {sorted(statuses)}，中位数：')
+    for key in ('import_ms', 'create_app_ms', 'first_response_ms', 'total_ms'):
+        print(f'  {key:<18} {statistics.median(sample[key] for sample in samples):8.1f}')
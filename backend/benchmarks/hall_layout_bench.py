@@ -0,0 +1,145 @@
+# 放映厅布局压测：按不同大小的布局批量开厅，统计开厅与选座页渲染的 SQL 条数和耗时，
+# 验证查询数与放映厅大小无关；同时对比没有编码布局（按 Seat 表读取）的旧放映厅
+# 用法（在 backend 目录下）：python -m benchmarks.hall_layout_bench [--halls 12] [--sizes 10x10,40x60]
+import argparse
+import os
+import re
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+PASSWORD = 'password123'
+
+
+# IMAX 式布局：两侧过道、中间一条横向过道、后排 VIP、首排两端为停用座
+def multiplex_layout(rows, cols):
+    grid = []
+    for row in range(rows):
+        if row == rows // 2:
+            grid.append('_' * cols)
+            continue
+        cell = 'v' if row >= rows - max(rows // 6, 1) else 'r'
+        line = '_' + cell * (cols - 2) + '_'
+        if row == 0:
+            line = '_d' + line[2:-2] + 'd_'
+        grid.append(line)
+    return grid
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self.on_execute)
+
+    def on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def reset(self):
+        self.statements = []
+
+    def count(self, table=None):
+        if table is None:
+            return len(self.statements)
+        pattern = re.compile(rf'\bFROM {table}\b', re.IGNORECASE)
+        return sum(1 for statement in self.statements if pattern.search(statement))
+
+
+def _screening(movie_id, hall_id, total_seats, start_time):
+    from models import Screening
+
+    return Screening(
+        movie_id=movie_id, hall_id=hall_id, start_time=start_time, end_time=start_time + timedelta(minutes=120),
+        price=60, remaining_seats=total_seats
+    )
+
+
+def run(halls, sizes):
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    try:
+        from werkzeug.security import generate_password_hash
+
+        import hall_layout
+        import seat_map
+        from app import create_app
+        from commands import prepare_database
+        from models import db, Cinema, Hall, Movie, User
+
+        app = create_app({'WTF_CSRF_ENABLED': False, 'PAGE_CACHE_ENABLED': False})
+        with app.app_context():
+            prepare_database()
+            cinema = Cinema(name='压测影城', address='压测地址')
+            movie = Movie(title='压测电影', duration=120)
+            db.session.add_all([cinema, movie, User(
+                username='layout_bench', email='layout_bench@example.com', password=generate_password_hash(PASSWORD)
+            )])
+            db.session.commit()
+            counter = StatementCounter(db.engine)
+
+            start_time = datetime.now() + timedelta(days=1)
+            screenings = {}
+            for rows, cols in sizes:
+                grid = multiplex_layout(rows, cols)
+                counter.reset()
+                started = time.perf_counter()
+                created = hall_layout.provision_halls(
+                    {'cinema_id': cinema.cinema_id, 'name': f'{rows}x{cols} 厅 {i + 1}', 'layout': grid}
+                    for i in range(halls)
+                )
+                db.session.commit()
+                elapsed = (time.perf_counter() - started) * 1000
+                hall_id = created[0][0]
+                hall = Hall.query.get(hall_id)
+                print(
+                    f'{rows}x{cols}：开厅 {halls} 个（{hall.total_seats} 个可售座位 / 厅），'
+                    f'{counter.count()} 条 SQL，{elapsed:.1f} ms，布局编码 {len(hall.layout)} 字节'
+                )
+                screening = _screening(movie.movie_id, hall_id, hall.total_seats, start_time)
+                db.session.add(screening)
+                db.session.commit()
+                screenings[f'{rows}x{cols}'] = screening.screening_id
+
+            # 旧放映厅：去掉编码布局，选座页需要按 Seat 表读取
+            legacy = Hall.query.get(created[1][0])
+            legacy.layout = None
+            legacy.seat_id_base = None
+            screening = _screening(movie.movie_id, legacy.hall_id, legacy.total_seats, start_time)
+            db.session.add(screening)
+            db.session.commit()
+            screenings[f'{rows}x{cols} 旧放映厅'] = screening.screening_id
+
+        client = app.test_client()
+        client.post('/login', data={'username': 'layout_bench', 'password': PASSWORD})
+        for label, screening_id in screenings.items():
+            samples = {}
+            for phase in ('cold', 'warm'):
+                if phase == 'cold':
+                    seat_map.invalidate()
+                    hall_layout.invalidate()
+                counter.reset()
+                started = time.perf_counter()
+                response = client.get(f'/screening/{screening_id}/seats')
+                samples[phase] = (response.status_code, counter.count(), counter.count('seats'),
+                                  (time.perf_counter() - started) * 1000)
+            print(f'选座页 {label}：' + '；'.join(
+                f'{phase} {status} {queries} 条 SQL（Seat 表 {seat_queries} 条）{elapsed:.1f} ms'
+                for phase, (status, queries, seat_queries, elapsed) in samples.items()
+            ))
+    finally:
+        os.remove(db_path)
+
+
+def _size(value):
+    rows, _, cols = value.partition('x')
+    return int(rows), int(cols)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='放映厅布局开厅与选座页渲染的查询数')
+    parser.add_argument('--halls', type=int, default=12, help='每种大小开厅的数量')
+    parser.add_argument('--sizes', default='10x10,40x60', help='放映厅大小（排x列），用逗号分隔')
+    args = parser.parse_args()
+    run(args.halls, [_size(size) for size in args.sizes.split(',')])
@@ -0,0 +1,86 @@
+# 图片处理压测：把 static/images/posters 下的海报与一张大尺寸照片各处理一次，统计每张图的处理耗时，
+# 以及首页卡片、详情页背景、订单缩略图按尺寸文件传输的字节数与直接传原图的对比
+# 用法（在 backend 目录下）：python -m benchmarks.image_bench [--posters 56] [--format webp]
+import argparse
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+
+
+# 带噪点的大尺寸照片（类似手机拍摄的头像），用于测量大图的解码与缩放耗时
+def large_photo(width, height):
+    from PIL import Image, ImageFilter
+
+    random.seed(0)
+    image = Image.effect_noise((width // 8, height // 8), 64).convert('RGB')
+    image = image.resize((width, height)).filter(ImageFilter.GaussianBlur(2))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=92)
+    return buffer.getvalue()
+
+
+def run(poster_count, fmt):
+    import images
+    from app import create_app
+
+    if images.Image is None:
+        print('未安装 Pillow，无法运行图片处理压测')
+        return
+
+    directory = tempfile.mkdtemp()
+    try:
+        app = create_app({'IMAGE_DIR': directory, 'IMAGE_FORMAT': fmt})
+        poster_dir = os.path.join(app.static_folder, 'images', 'posters')
+        paths = sorted(os.path.join(poster_dir, name) for name in os.listdir(poster_dir))[:poster_count]
+        with app.app_context():
+            originals = 0
+            variant_bytes = {variant: 0 for variant in images.VARIANTS['poster']}
+            elapsed = []
+            skipped = 0
+            for path in paths:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                started = time.perf_counter()
+                try:
+                    name = images.pipeline.process(data, 'poster', inline=True)
+                except images.ImageError:
+                    # 部分海报是扩展名为 .jpg 的 SVG 占位图，无法作为位图处理
+                    skipped += 1
+                    continue
+                elapsed.append((time.perf_counter() - started) * 1000)
+                originals += len(data)
+                for variant in variant_bytes:
+                    variant_bytes[variant] += os.path.getsize(
+                        os.path.join(directory, images.variant_filename(name, variant))
+                    )
+
+            count = len(elapsed)
+            print(f'海报 {count} 张（另有 {skipped} 张无法识别）：平均处理 {sum(elapsed) / count:.1f} ms / 张'
+                  f'（生成 {len(variant_bytes)} 个尺寸），原图平均 {originals / count / 1024:.1f} KB')
+            for variant, total in variant_bytes.items():
+                print(f'  {variant}：平均 {total / count / 1024:.1f} KB，为原图的 {total / originals:.0%}')
+            # 首页一屏按 12 张卡片计
+            print(f'首页 12 张卡片：原图 {originals / count * 12 / 1024:.0f} KB，'
+                  f'card 尺寸 {variant_bytes["card"] / count * 12 / 1024:.0f} KB')
+
+            for width, height in ((4032, 3024), (1600, 1200)):
+                data = large_photo(width, height)
+                started = time.perf_counter()
+                name = images.pipeline.process(data, 'avatar', inline=True)
+                total = sum(os.path.getsize(os.path.join(directory, images.variant_filename(name, variant)))
+                            for variant in images.VARIANTS['avatar'])
+                print(f'头像 {width}x{height}（{len(data) / 1024:.0f} KB）：处理 '
+                      f'{(time.perf_counter() - started) * 1000:.1f} ms，生成文件共 {total / 1024:.1f} KB')
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='头像与海报的处理耗时和传输字节数')
+    parser.add_argument('--posters', type=int, default=56, help='处理的海报数')
+    parser.add_argument('--format', default='webp', choices=['webp', 'jpeg'])
+    args = parser.parse_args()
+    run(args.posters, args.format)
@@ -0,0 +1,104 @@
+# 点赞压测：大量用户并发点赞/取消点赞同一条热门影评，统计点击吞吐并校验计数没有丢失更新
+# 用法（在 backend 目录下）：python -m benchmarks.likes_bench --workers 16 --clicks 200
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.reservation_bench import create_bench_app
+from likes import like_buffer, toggle_like
+from models import db, User, Movie, Review, ReviewLike
+
+
+def seed(app, users):
+    with app.app_context():
+        db.create_all()
+        db.session.execute(User.__table__.insert(), [
+            {'username': f'liker{i}', 'email': f'liker{i}@example.com', 'password': 'x'}
+            for i in range(users)
+        ])
+        movie = Movie(title='压测电影', duration=120)
+        db.session.add(movie)
+        db.session.flush()
+        review = Review(user_id=1, movie_id=movie.movie_id, rating=5, content='热门影评', likes=0)
+        db.session.add(review)
+        db.session.commit()
+        return review.review_id
+
+
+def worker(app, user_ids, review_id, clicks, stats, lock):
+    rng = random.Random(user_ids[0])
+    done = busy = 0
+    with app.app_context():
+        for _ in range(clicks):
+            try:
+                toggle_like(rng.choice(user_ids), review_id)
+                done += 1
+                if like_buffer.should_flush():
+                    like_buffer.flush()
+            except OperationalError:
+                db.session.rollback()
+                busy += 1
+            finally:
+                db.session.remove()
+    with lock:
+        stats['clicks'] += done
+        stats['busy'] += busy
+
+
+def run(workers=16, clicks=200, users=64):
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        app = create_bench_app(db_path)
+        app.config['LIKE_FLUSH_SECONDS'] = 0.5
+        review_id = seed(app, users)
+
+        # 每个线程代表一组用户，组内的点击天然串行，组间并发
+        groups = [list(range(1, users + 1))[i::workers] for i in range(workers)]
+        stats = {'clicks': 0, 'busy': 0}
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(target=worker, args=(app, group, review_id, clicks, stats, lock))
+            for group in groups if group
+        ]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        with app.app_context():
+            like_buffer.flush()
+            likes = db.session.query(Review.likes).filter_by(review_id=review_id).scalar()
+            rows = ReviewLike.query.filter_by(review_id=review_id).count()
+
+        stats.update({
+            'workers': len(threads),
+            'elapsed_seconds': round(elapsed, 3),
+            'clicks_per_second': round(stats['clicks'] / elapsed, 1) if elapsed else 0.0,
+            'review_likes': likes,
+            'like_rows': rows,
+            'lost_updates': abs(likes - rows),
+            'consistent': likes == rows
+        })
+        return stats
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='点赞并发压测')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--clicks', type=int, default=200, help='每个线程的点击次数')
+    parser.add_argument('--users', type=int, default=64)
+    args = parser.parse_args()
+
+    result = run(args.workers, args.clicks, args.users)
+    for key, value in result.items():
+        print(f'{key}: {value}')
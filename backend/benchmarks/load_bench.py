@@ -0,0 +1,426 @@
+# 全流程压测：用测试客户端或本地 WSGI 服务驱动真实应用，按用户旅程（浏览、购票、影评与点赞）发请求，
+# 统计各路由的 p50/p95/p99 延迟、每秒请求数与每个请求的 SQL 条数，结果保存为 JSON 便于跨提交对比
+# 用法（在 backend 目录下）：
+#   python -m benchmarks.load_bench --clients 8 --journeys 20 --output results.json
+#   python -m benchmarks.load_bench --server --compare results.json       # 通过本地 HTTP 服务压测并与上次结果对比
+#   python -m benchmarks.load_bench --scenario contention --clients 32    # 所有客户端抢同一场次
+#   python -m benchmarks.load_bench --database big.db                      # 使用已生成的数据库（会写入订单和影评）
+import argparse
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from sqlalchemy import event
+
+# 各旅程被选中的权重
+JOURNEY_WEIGHTS = {'browse': 5, 'booking': 3, 'review': 2}
+PASSWORD = 'password123'
+_ORDER_RE = re.compile(r'/order/(\d+)$')
+
+
+# 统计每个请求执行的 SQL 条数，通过响应头返回给客户端（测试客户端与 HTTP 服务两种模式通用）
+class QueryCounter:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.local = threading.local()
+
+    def on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if getattr(self.local, 'active', False):
+            self.local.queries += 1
+
+    def __call__(self, environ, start_response):
+        self.local.active = True
+        self.local.queries = 0
+
+        def counting_start_response(status, headers, exc_info=None):
+            headers.append(('X-Query-Count', str(self.local.queries)))
+            return start_response(status, headers, exc_info)
+
+        try:
+            return self.wsgi_app(environ, counting_start_response)
+        finally:
+            self.local.active = False
+
+
+# 各路由的延迟、状态码与 SQL 条数
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.events = defaultdict(int)
+
+    def add(self, route, elapsed, status, queries):
+        with self.lock:
+            self.samples[route].append((elapsed, queries))
+            if status >= 500:
+                self.errors[route] += 1
+
+    def count(self, name):
+        with self.lock:
+            self.events[name] += 1
+
+
+def _percentile(values, percent):
+    index = max(0, math.ceil(percent / 100 * len(values)) - 1)
+    return values[index]
+
+
+def summarize(recorder, elapsed):
+    routes = {}
+    for route, samples in sorted(recorder.samples.items()):
+        latencies = sorted(latency * 1000 for latency, _ in samples)
+        queries = [count for _, count in samples if count is not None]
+        routes[route] = {
+            'requests': len(samples),
+            'errors': recorder.errors[route],
+            'p50_ms': round(_percentile(latencies, 50), 2),
+            'p95_ms': round(_percentile(latencies, 95), 2),
+            'p99_ms': round(_percentile(latencies, 99), 2),
+            'requests_per_second': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+            'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None
+        }
+    total = sum(route['requests'] for route in routes.values())
+    return {
+        'elapsed_seconds': round(elapsed, 3),
+        'requests': total,
+        'requests_per_second': round(total / elapsed, 1) if elapsed else 0.0,
+        'events': dict(recorder.events),
+        'routes': routes
+    }
+
+
+# Flask 测试客户端，不经过网络
+class TestClientSession:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        response.close()
+        return response.status_code, response.headers
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+# 通过本地 HTTP 服务发请求，带 Cookie，不自动跟随重定向
+class HttpSession:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = build_opener(HTTPCookieProcessor(CookieJar()), _NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urlencode(data).encode() if data is not None else None
+        try:
+            with self.opener.open(Request(self.base_url + path, data=body, method=method)) as response:
+                response.read()
+                return response.status, response.headers
+        except HTTPError as e:
+            e.read()
+            return e.code, e.headers
+
+
+# 一个虚拟用户：按权重随机选择旅程，每个请求都记录到 Recorder
+class VirtualUser:
+    def __init__(self, session, recorder, fixtures, user_id, rng):
+        self.session = session
+        self.recorder = recorder
+        self.fixtures = fixtures
+        self.user_id = user_id
+        self.rng = rng
+        self.logged_in = False
+
+    def call(self, route, method, path, data=None):
+        started = time.perf_counter()
+        status, headers = self.session.request(method, path, data)
+        queries = headers.get('X-Query-Count')
+        self.recorder.add(route, time.perf_counter() - started, status, int(queries) if queries is not None else None)
+        return status, headers.get('Location', '')
+
+    def login(self):
+        if not self.logged_in:
+            self.call('login', 'POST', '/login', {'username': f'user{self.user_id}', 'password': PASSWORD})
+            self.logged_in = True
+
+    def browse(self):
+        self.call('home', 'GET', '/')
+        self.call('movie_list', 'GET', '/movies')
+        self.call('movie_detail', 'GET', f'/movie/{self.rng.choice(self.fixtures["movie_ids"])}')
+
+    def book(self, screening_id=None, max_group=4):
+        self.login()
+        if screening_id is None:
+            screening_id = self.rng.choice(list(self.fixtures['screenings']))
+            movie_id = self.fixtures['screenings'][screening_id]['movie_id']
+            self.call('home', 'GET', '/')
+            self.call('movie_detail', 'GET', f'/movie/{movie_id}')
+        self.call('select_seats', 'GET', f'/screening/{screening_id}/seats')
+
+        seat_ids = self.rng.sample(self.fixtures['screenings'][screening_id]['seat_ids'], self.rng.randint(1, max_group))
+        status, location = self.call('create_order', 'POST', '/create_order', {
+            'screening_id': screening_id,
+            'seat_ids': ','.join(str(seat_id) for seat_id in seat_ids)
+        })
+        match = _ORDER_RE.search(location)
+        if not match:
+            self.recorder.count('seat_conflicts')
+            return False
+
+        order_id = match.group(1)
+        self.recorder.count('orders_created')
+        self.call('order_confirmation', 'GET', f'/order/{order_id}')
+        self.call('pay_order', 'POST', f'/order/{order_id}/pay')
+        return True
+
+    def review(self):
+        self.login()
+        movie_id = self.rng.choice(self.fixtures['movie_ids'])
+        self.call('add_review', 'POST', f'/movie/{movie_id}/review', {
+            'rating': self.rng.randint(1, 5),
+            'content': '压测影评'
+        })
+        self.call('movie_detail', 'GET', f'/movie/{movie_id}')
+        for review_id in self.rng.sample(self.fixtures['review_ids'], min(3, len(self.fixtures['review_ids']))):
+            self.call('like_review', 'POST', f'/review/{review_id}/like')
+
+    def run_journeys(self, journeys):
+        names = list(JOURNEY_WEIGHTS)
+        weights = list(JOURNEY_WEIGHTS.values())
+        for _ in range(journeys):
+            journey = self.rng.choices(names, weights)[0]
+            if journey == 'browse':
+                self.browse()
+            elif journey == 'booking':
+                self.book()
+            else:
+                self.review()
+
+    # 抢座场景：反复抢同一场次，直到连续多次失败（基本售罄）
+    def contend(self, screening_id, max_failures=5):
+        failures = 0
+        while failures < max_failures:
+            if self.book(screening_id):
+                failures = 0
+            else:
+                failures += 1
+
+
+# 压测用的电影、场次（含放映厅座位）、影评与用户
+def load_fixtures(limit=200):
+    from models import db, Movie, Screening, Seat, Review, User
+
+    movie_ids = [movie_id for (movie_id,) in db.session.query(Movie.movie_id).order_by(Movie.movie_id).limit(limit)]
+    screenings = db.session.query(Screening.screening_id, Screening.movie_id, Screening.hall_id).filter(
+        Screening.start_time > datetime.now()
+    ).order_by(Screening.screening_id).limit(limit).all()
+    seats = defaultdict(list)
+    for seat_id, hall_id in db.session.query(Seat.seat_id, Seat.hall_id).filter(
+        Seat.hall_id.in_({hall_id for _, _, hall_id in screenings})
+    ):
+        seats[hall_id].append(seat_id)
+
+    return {
+        'movie_ids': movie_ids,
+        'screenings': {
+            screening_id: {'movie_id': movie_id, 'seat_ids': seats[hall_id]}
+            for screening_id, movie_id, hall_id in screenings
+        },
+        'review_ids': [review_id for (review_id,) in db.session.query(Review.review_id).limit(limit * 10)],
+        'user_ids': [user_id for (user_id,) in db.session.query(User.user_id).filter(
+            User.username.like('user%')
+        ).order_by(User.user_id).limit(limit * 10)]
+    }
+
+
+# 抢座结束后校验没有重复售出，且剩余座位数与占用记录一致
+def seat_consistency(screening_id):
+    from models import db, Hall, Screening, ScreeningSeat
+
+    screening = Screening.query.get(screening_id)
+    total = Hall.query.get(screening.hall_id).total_seats
+    taken = ScreeningSeat.query.filter_by(screening_id=screening_id).count()
+    distinct = db.session.query(db.func.count(db.distinct(ScreeningSeat.seat_id))).filter_by(
+        screening_id=screening_id
+    ).scalar()
+    return {
+        'screening_id': screening_id,
+        'seats': total,
+        'seats_taken': taken,
+        'remaining_seats': screening.remaining_seats,
+        'double_booked': taken - distinct,
+        'consistent': taken == distinct and taken + screening.remaining_seats == total
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _prepare_database(args):
+    if args.database:
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(args.database)}'
+        return None
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    return db_path
+
+
+def _seed(app, args):
+    from init_test_data import generate_dataset, rebuild_derived_data
+
+    with app.app_context():
+        started = time.perf_counter()
+        counts = generate_dataset(
+            movies=args.movies, cinemas=args.cinemas, days=2, users=max(args.clients, 1000),
+            reviews=args.movies * 10, seed=args.seed
+        )
+        rebuild_derived_data()
+        print(f'已生成压测数据（{counts["order_seats"]} 个订单座位），耗时 {time.perf_counter() - started:.1f} 秒')
+
+
+def _start_server(app):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def run(args):
+    db_path = _prepare_database(args)
+    try:
+        # 应用按 DATABASE_URL 连接数据库
+        from app import create_app
+        from commands import prepare_database
+        from likes import like_buffer
+        from models import db
+
+        app = create_app({'WTF_CSRF_ENABLED': False})
+        with app.app_context():
+            prepare_database()
+        if db_path:
+            _seed(app, args)
+
+        with app.app_context():
+            fixtures = load_fixtures()
+            counter = QueryCounter(app.wsgi_app)
+            event.listen(db.engine, 'before_cursor_execute', counter.on_execute)
+        app.wsgi_app = counter
+
+        server = None
+        if args.server:
+            server, base_url = _start_server(app)
+            make_session = lambda: HttpSession(base_url)
+        else:
+            make_session = lambda: TestClientSession(app)
+
+        recorder = Recorder()
+        contended = next(iter(fixtures['screenings']), None)
+
+        def client(index):
+            rng = random.Random(args.seed + index)
+            user = VirtualUser(make_session(), recorder, fixtures, fixtures['user_ids'][index % len(fixtures['user_ids'])], rng)
+            if args.scenario == 'contention':
+                user.contend(contended)
+            else:
+                user.run_journeys(args.journeys)
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        if server is not None:
+            server.shutdown()
+        # 写回尚未落库的点赞计数，之后才能删除临时数据库
+        with app.app_context():
+            like_buffer.flush()
+
+        result = {
+            'commit': _git_commit(),
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'mode': 'server' if args.server else 'test_client',
+            'scenario': args.scenario,
+            'clients': args.clients,
+            'journeys': args.journeys,
+            **summarize(recorder, elapsed)
+        }
+        if args.scenario == 'contention':
+            with app.app_context():
+                result['contention'] = seat_consistency(contended)
+        return result
+    finally:
+        if db_path:
+            os.remove(db_path)
+
+
+# 与上次保存的结果对比各路由 p95 与 SQL 条数的变化
+def compare(result, baseline):
+    lines = []
+    for route, current in result['routes'].items():
+        previous = baseline.get('routes', {}).get(route)
+        if not previous:
+            continue
+        change = (current['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100 if previous['p95_ms'] else 0.0
+        lines.append(
+            f'{route:<20} p95 {previous["p95_ms"]:>8} -> {current["p95_ms"]:>8} ms ({change:+.1f}%)'
+            f'  queries {previous["queries_per_request"]} -> {current["queries_per_request"]}'
+        )
+    return lines
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='全流程压测')
+    parser.add_argument('--clients', type=int, default=8, help='并发虚拟用户数')
+    parser.add_argument('--journeys', type=int, default=20, help='每个虚拟用户执行的旅程数')
+    parser.add_argument('--scenario', choices=['mixed', 'contention'], default='mixed')
+    parser.add_argument('--server', action='store_true', help='通过本地 WSGI 服务以 HTTP 压测，默认使用测试客户端')
+    parser.add_argument('--database', help='使用已有数据库文件；不指定时生成临时数据库')
+    parser.add_argument('--movies', type=int, default=500)
+    parser.add_argument('--cinemas', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='结果保存为 JSON 文件')
+    parser.add_argument('--compare', help='与之前保存的 JSON 结果对比')
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps({key: value for key, value in result.items() if key != 'routes'}, ensure_ascii=False))
+    for route, stats in result['routes'].items():
+        print(f'{route:<20} {json.dumps(stats, ensure_ascii=False)}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            for line in compare(result, json.load(f)):
+                print(line)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
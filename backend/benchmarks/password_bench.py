@@ -0,0 +1,126 @@
+# 登录风暴压测：用 Gunicorn gevent 单个工作进程启动应用，大量客户端同时反复登录，同时测量浏览页面的延迟；
+# 对比密码哈希在请求内计算（PASSWORD_HASH_WORKERS=0）与放在进程池中计算两种方式的登录吞吐量和浏览延迟
+# 用法（在 backend 目录下）：python -m benchmarks.password_bench [--logins 32] [--clients 8] [--duration 10]
+import argparse
+import os
+import re
+import threading
+import time
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, build_opener
+
+from benchmarks.load_bench import PASSWORD, _percentile, _prepare_database, _seed, load_fixtures
+from benchmarks.serving_bench import _free_port, browse_load, start_server, stop_server
+
+# 对比的方式：名称 -> 密码哈希进程数
+MODES = {'inline': 0, 'pool': 2}
+_TOKEN_RE = re.compile(r'name="csrf_token" value="([^"]+)"')
+
+
+# 每个客户端在 duration 秒内循环：打开登录页取 CSRF 令牌，提交用户名密码，登录成功后退出登录
+def login_storm(base_url, user_ids, clients, duration):
+    deadline = time.perf_counter() + duration
+    lock = threading.Lock()
+    latencies = []
+    counts = {'ok': 0, 'busy': 0, 'failed': 0}
+
+    def client(index):
+        opener = build_opener(HTTPCookieProcessor(CookieJar()))
+        user_id = user_ids[index % len(user_ids)]
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                token = _TOKEN_RE.search(opener.open(base_url + '/login', timeout=60).read().decode('utf-8')).group(1)
+                response = opener.open(base_url + '/login', urlencode({
+                    'csrf_token': token, 'username': f'user{user_id}', 'password': PASSWORD
+                }).encode(), timeout=60)
+                body = response.read().decode('utf-8')
+                outcome = 'busy' if '稍后再试' in body else 'ok' if response.url.rstrip('/') == base_url else 'failed'
+                if outcome == 'ok':
+                    opener.open(base_url + '/logout', timeout=60).read()
+            except (HTTPError, OSError, AttributeError):
+                outcome = 'failed'
+            with lock:
+                counts[outcome] += 1
+                if outcome == 'ok':
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return {
+        'logins_per_second': round(counts['ok'] / duration, 1),
+        'login_p95_ms': round(_percentile(latencies, 95), 1) if latencies else None,
+        'busy': counts['busy'],
+        'failed': counts['failed']
+    }
+
+
+def bench_mode(mode, args, fixtures):
+    port = _free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    process = start_server('gevent', port, 1, {'PASSWORD_HASH_WORKERS': str(MODES[mode])})
+    try:
+        idle = browse_load(port, fixtures['movie_ids'], args.clients, min(args.duration, 3), args.seed)
+        result = {}
+        storm = threading.Thread(
+            target=lambda: result.update(login_storm(base_url, fixtures['user_ids'], args.logins, args.duration))
+        )
+        storm.start()
+        time.sleep(0.5)
+        load = browse_load(port, fixtures['movie_ids'], args.clients, args.duration - 1, args.seed)
+        storm.join()
+        return {'mode': mode, 'idle_p95_ms': idle['p95_ms'], 'browse_p50_ms': load['p50_ms'],
+                'browse_p95_ms': load['p95_ms'], 'browse_rps': load['requests_per_second'], **result}
+    finally:
+        stop_server(process)
+
+
+def run(args):
+    db_path = _prepare_database(args)
+    try:
+        from app import create_app
+        from commands import prepare_database
+
+        app = create_app()
+        with app.app_context():
+            prepare_database()
+        if db_path:
+            _seed(app, args)
+        with app.app_context():
+            fixtures = load_fixtures()
+        return [bench_mode(mode, args, fixtures) for mode in args.modes.split(',')]
+    finally:
+        if db_path:
+            os.remove(db_path)
+
+
+def report(results):
+    print(f'{"mode":<8} {"logins/s":>9} {"login p95":>10} {"busy":>5} {"failed":>7} '
+          f'{"browse rps":>11} {"p50 ms":>8} {"p95 ms":>8} {"idle p95":>9}')
+    for result in results:
+        print(
+            f'{result["mode"]:<8} {result["logins_per_second"]:>9} {result["login_p95_ms"]!s:>10} {result["busy"]:>5} '
+            f'{result["failed"]:>7} {result["browse_rps"]:>11} {result["browse_p50_ms"]:>8} {result["browse_p95_ms"]:>8} '
+            f'{result["idle_p95_ms"]:>9}'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='登录风暴下的登录吞吐量与其他页面延迟')
+    parser.add_argument('--modes', default='inline,pool', help='逗号分隔：inline（请求内计算）、pool（进程池）')
+    parser.add_argument('--logins', type=int, default=32, help='同时反复登录的客户端数')
+    parser.add_argument('--clients', type=int, default=8, help='浏览页面的并发客户端数')
+    parser.add_argument('--duration', type=float, default=10, help='压测时长（秒）')
+    parser.add_argument('--database', help='使用已有数据库文件；不指定时生成临时数据库')
+    parser.add_argument('--movies', type=int, default=300)
+    parser.add_argument('--cinemas', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    report(run(args))
@@ -0,0 +1,157 @@
+# 查询计划检查：在临时数据库上走一遍各路由，记录每条 SELECT，用 EXPLAIN QUERY PLAN 检查是否使用了索引
+# 出现未经索引的全表扫描时列出对应路由与语句，并以非零状态退出，可在提交前或 CI 中运行
+# 用法（在 backend 目录下）：python -m benchmarks.query_plans [--verbose]
+import argparse
+import os
+import re
+import sys
+import tempfile
+from collections import defaultdict
+
+from sqlalchemy import event
+
+# 允许全表扫描的语句：首页本身就展示全部电影
+ALLOWED_SCANS = {
+    ('home', 'movies'),
+}
+_SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+def _record_statements(engine, statements, current):
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if current['route'] and not executemany and statement.lstrip().upper().startswith('SELECT'):
+            statements[current['route']].append((statement, parameters))
+    event.listen(engine, 'before_cursor_execute', before_execute)
+
+
+# 依次请求各个路由，包括登录后的选座、下单、支付、取消、影评与点赞
+def exercise_routes(app, current):
+    from models import Movie, Review, Screening, Seat
+
+    with app.app_context():
+        movie = Movie.query.order_by(Movie.movie_id).first()
+        screening = Screening.query.filter_by(movie_id=movie.movie_id).order_by(Screening.screening_id).first()
+        seat_ids = [seat_id for (seat_id,) in Seat.query.with_entities(Seat.seat_id).filter_by(hall_id=screening.hall_id)]
+        review_id = Review.query.with_entities(Review.review_id).filter_by(movie_id=movie.movie_id).first()[0]
+
+    client = app.test_client()
+
+    def call(route, method, path, data=None):
+        current['route'] = route
+        response = client.open(path, method=method, data=data)
+        # 流式响应在读取正文时才执行查询
+        response.get_data()
+        current['route'] = None
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method} {path} 返回 {response.status_code}')
+        return response
+
+    call('home', 'GET', '/')
+    call('movie_list', 'GET', '/movies')
+    call('movie_list', 'GET', f'/movies?genre={movie.genre}&year={movie.release_date.year}')
+    call('movie_list', 'GET', f'/movies?search={movie.title.split()[0]}')
+    call('movie_detail', 'GET', f'/movie/{movie.movie_id}')
+    call('register', 'POST', '/register', {
+        'username': 'plan_user', 'email': 'plan_user@example.com', 'password': 'p', 'confirm_password': 'p'
+    })
+    call('login', 'POST', '/login', {'username': 'plan_user', 'password': 'p'})
+    call('movie_detail', 'GET', f'/movie/{movie.movie_id}')
+    call('select_seats', 'GET', f'/screening/{screening.screening_id}/seats')
+
+    # 从空座中选座下单，第一张订单支付，第二张取消
+    order_ids = []
+    for seat_id in seat_ids:
+        response = call('create_order', 'POST', '/create_order', {
+            'screening_id': screening.screening_id, 'seat_ids': str(seat_id)
+        })
+        match = re.search(r'/order/(\d+)$', response.location or '')
+        if match:
+            order_ids.append(match.group(1))
+            if len(order_ids) == 2:
+                break
+    if len(order_ids) < 2:
+        raise RuntimeError('没有足够的空座用于检查下单路由')
+    call('order_confirmation', 'GET', f'/order/{order_ids[0]}')
+    call('pay_order', 'POST', f'/order/{order_ids[0]}/pay')
+    call('cancel_order', 'POST', f'/order/{order_ids[1]}/cancel')
+    call('user_profile', 'GET', '/user/profile')
+    call('edit_profile', 'GET', '/user/edit')
+    call('add_review', 'POST', f'/movie/{movie.movie_id}/review', {'rating': '4', 'content': '查询计划检查'})
+    call('like_review', 'POST', f'/review/{review_id}/like')
+
+    # JSON 接口
+    call('api_movies', 'GET', f'/api/v1/movies?genre={movie.genre}&fields=movie_id,title,poster')
+    call('api_movie', 'GET', f'/api/v1/movies/{movie.movie_id}')
+    call('api_movie_export', 'GET', '/api/v1/movies/export?fields=movie_id,title')
+    call('api_showtimes', 'GET', f'/api/v1/showtimes?movie_ids={movie.movie_id},{movie.movie_id + 1}')
+    call('api_seat_maps', 'GET', f'/api/v1/seat-maps?screening_ids={screening.screening_id}')
+
+
+# 对记录的每条语句执行 EXPLAIN QUERY PLAN，返回 {路由: [(语句, 计划, 全表扫描的表)]}
+def explain(engine, statements):
+    results = defaultdict(list)
+    with engine.connect() as conn:
+        for route, items in statements.items():
+            seen = set()
+            for statement, parameters in items:
+                if statement in seen:
+                    continue
+                seen.add(statement)
+                plan = [row[3] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+                scans = [match.group(1) for match in (_SCAN_RE.match(detail) for detail in plan) if match]
+                results[route].append((statement, plan, scans))
+    return results
+
+
+def run(verbose=False):
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    try:
+        from app import create_app
+        from commands import prepare_database
+        from init_test_data import generate_dataset, rebuild_derived_data
+        from likes import like_buffer
+        from models import db
+
+        app = create_app({'WTF_CSRF_ENABLED': False, 'PAGE_CACHE_ENABLED': False})
+        with app.app_context():
+            prepare_database()
+            generate_dataset(movies=300, cinemas=5, days=2, users=200, reviews=3000)
+            rebuild_derived_data()
+            engine = db.engine
+
+        statements = defaultdict(list)
+        current = {'route': None}
+        _record_statements(engine, statements, current)
+        exercise_routes(app, current)
+        # 写回点赞计数，之后才能删除临时数据库
+        with app.app_context():
+            like_buffer.flush()
+
+        failures = 0
+        for route, results in sorted(explain(engine, statements).items()):
+            for statement, plan, scans in results:
+                unexpected = [table for table in scans if (route, table) not in ALLOWED_SCANS]
+                failures += bool(unexpected)
+                if unexpected or verbose:
+                    status = '全表扫描 ' + ', '.join(unexpected) if unexpected else 'OK'
+                    print(f'[{route}] {status}')
+                    print('    ' + ' '.join(statement.split())[:300])
+                    for detail in plan:
+                        print(f'      {detail}')
+            if not verbose:
+                print(f'[{route}] {len(results)} 条查询')
+        return failures
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='检查各路由查询是否使用索引')
+    parser.add_argument('--verbose', action='store_true', help='输出每条语句的查询计划')
+    args = parser.parse_args()
+
+    failures = run(args.verbose)
+    print(f'{failures} 条查询存在未使用索引的全表扫描' if failures else '所有查询均使用索引')
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,133 @@
+# 并发抢座压测：多个线程同时抢同一场次的座位，统计每秒成功订票数并校验没有重复售出
+# 用法（在 backend 目录下）：python -m benchmarks.reservation_bench --workers 16 --rows 20 --cols 30
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+
+from hall_layout import default_grid, provision_halls
+from models import db, User, Movie, Cinema, Screening, Seat, ScreeningSeat
+from reservation import SeatUnavailableError, reserve_seats, occupied_seat_ids
+
+
+def create_bench_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30, 'check_same_thread': False}}
+    db.init_app(app)
+    return app
+
+
+def seed(app, rows, cols, workers):
+    with app.app_context():
+        db.create_all()
+        cinema = Cinema(name='压测影城', address='压测地址')
+        movie = Movie(title='压测电影', duration=120)
+        db.session.add_all([cinema, movie])
+        db.session.flush()
+        [(hall_id, _)] = provision_halls([{'cinema_id': cinema.cinema_id, 'name': '压测厅', 'layout': default_grid(rows, cols)}])
+        start_time = datetime.now() + timedelta(days=1)
+        screening = Screening(
+            movie_id=movie.movie_id,
+            hall_id=hall_id,
+            start_time=start_time,
+            end_time=start_time + timedelta(minutes=120),
+            price=50,
+            remaining_seats=rows * cols
+        )
+        db.session.add(screening)
+        db.session.execute(User.__table__.insert(), [
+            {'username': f'bench{i}', 'email': f'bench{i}@example.com', 'password': 'x'}
+            for i in range(workers)
+        ])
+        db.session.commit()
+        seat_ids = [seat_id for (seat_id,) in db.session.query(Seat.seat_id).filter_by(hall_id=hall_id)]
+        return screening.screening_id, seat_ids
+
+
+def worker(app, user_id, screening_id, seat_ids, max_group, stats, lock):
+    rng = random.Random(user_id)
+    booked = conflicts = busy = 0
+    with app.app_context():
+        while True:
+            # 模拟用户从页面上看到的空座中挑选，页面快照与提交之间仍可能被别人抢走
+            available = list(set(seat_ids) - occupied_seat_ids(screening_id))
+            if not available:
+                break
+            screening = Screening.query.get(screening_id)
+            group = rng.sample(available, min(len(available), rng.randint(1, max_group)))
+            try:
+                reserve_seats(user_id, screening, group)
+                booked += 1
+            except SeatUnavailableError:
+                conflicts += 1
+            except OperationalError:
+                # SQLite 写锁竞争，回滚后重试
+                db.session.rollback()
+                busy += 1
+            finally:
+                db.session.remove()
+    with lock:
+        stats['booked'] += booked
+        stats['conflicts'] += conflicts
+        stats['busy'] += busy
+
+
+def run(workers=16, rows=10, cols=10, max_group=4):
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        app = create_bench_app(db_path)
+        screening_id, seat_ids = seed(app, rows, cols, workers)
+
+        stats = {'booked': 0, 'conflicts': 0, 'busy': 0}
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(target=worker, args=(app, user_id, screening_id, seat_ids, max_group, stats, lock))
+            for user_id in range(1, workers + 1)
+        ]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        with app.app_context():
+            held = ScreeningSeat.query.filter_by(screening_id=screening_id).count()
+            distinct = db.session.query(db.func.count(db.distinct(ScreeningSeat.seat_id))).filter_by(screening_id=screening_id).scalar()
+            remaining = Screening.query.get(screening_id).remaining_seats
+
+        stats.update({
+            'workers': workers,
+            'seats': len(seat_ids),
+            'elapsed_seconds': round(elapsed, 3),
+            'bookings_per_second': round(stats['booked'] / elapsed, 1) if elapsed else 0.0,
+            'seats_sold': held,
+            'double_booked': held - distinct,
+            'remaining_seats': remaining,
+            'consistent': held == distinct and held + remaining == len(seat_ids)
+        })
+        return stats
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='并发抢座压测')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--rows', type=int, default=10)
+    parser.add_argument('--cols', type=int, default=10)
+    parser.add_argument('--max-group', type=int, default=4)
+    args = parser.parse_args()
+
+    result = run(args.workers, args.rows, args.cols, args.max_group)
+    for key, value in result.items():
+        print(f'{key}: {value}')
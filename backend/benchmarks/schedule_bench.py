@@ -0,0 +1,101 @@
+# 排片导入压测：为大量放映厅生成一周的连续排片并批量导入，统计校验（含时间重叠检测）与写入耗时，
+# 再导入一批故意重叠的场次确认全部被拦下；最后统计电影详情页场次索引未命中与命中时的 SQL 条数
+# 用法（在 backend 目录下）：python -m benchmarks.schedule_bench [--halls 1000] [--days 7] [--shows 6]
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+GAP_MINUTES = 20
+
+
+def build_schedule(hall_ids, movies, days, shows, start_date):
+    schedule = []
+    for hall_index, hall_id in enumerate(hall_ids):
+        for day in range(days):
+            start_time = start_date + timedelta(days=day, hours=10)
+            for show in range(shows):
+                movie_id, duration = movies[(hall_index + day + show) % len(movies)]
+                end_time = start_time + timedelta(minutes=duration)
+                schedule.append({
+                    'movie_id': movie_id,
+                    'hall_id': hall_id,
+                    'start_time': start_time.isoformat(sep=' '),
+                    'end_time': end_time.isoformat(sep=' '),
+                    'price': 60
+                })
+                start_time = end_time + timedelta(minutes=GAP_MINUTES)
+    return schedule
+
+
+def run(halls, days, shows, movie_count):
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    try:
+        from app import create_app
+        from commands import prepare_database
+        from hall_layout import default_grid, provision_halls
+        from models import db, Cinema, Movie
+        from scheduling import ScheduleError, import_schedule, showtimes
+
+        app = create_app({'PAGE_CACHE_ENABLED': False})
+        with app.app_context():
+            prepare_database()
+            cinema = Cinema(name='压测影城', address='压测地址')
+            db.session.add(cinema)
+            db.session.add_all(Movie(title=f'压测电影 {i}', duration=90 + i % 6 * 15) for i in range(movie_count))
+            db.session.flush()
+            hall_ids = [hall_id for hall_id, _ in provision_halls(
+                {'cinema_id': cinema.cinema_id, 'name': f'{i + 1}号厅', 'layout': default_grid(10, 12)}
+                for i in range(halls)
+            )]
+            db.session.commit()
+            movies = db.session.query(Movie.movie_id, Movie.duration).order_by(Movie.movie_id).all()
+
+            start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            schedule = build_schedule(hall_ids, movies, days, shows, start_date)
+
+            started = time.perf_counter()
+            import_schedule(schedule, dry_run=True)
+            validated = time.perf_counter()
+            count = import_schedule(schedule)
+            imported = time.perf_counter()
+            print(f'导入 {count} 个场次（{halls} 个放映厅 × {days} 天 × {shows} 场）：'
+                  f'校验 {validated - started:.2f} 秒，校验并写入 {imported - validated:.2f} 秒')
+
+            # 每个放映厅再排一场与第一天首场重叠的场次，应全部报告为冲突且不写入
+            overlapping = [dict(show, price=80) for show in schedule[::days * shows]]
+            started = time.perf_counter()
+            try:
+                import_schedule(overlapping)
+                print('重叠场次没有被拦下！')
+            except ScheduleError as e:
+                print(f'重叠检测：{len(overlapping)} 个场次对照 {count} 个已有场次，'
+                      f'发现 {len(e.problems)} 处重叠，耗时 {time.perf_counter() - started:.2f} 秒')
+
+            statements = []
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+            movie_id = movies[0][0]
+            for phase in ('未命中', '命中'):
+                statements.clear()
+                started = time.perf_counter()
+                days_listed = showtimes.by_date(movie_id)
+                elapsed = (time.perf_counter() - started) * 1000
+                print(f'场次索引{phase}：{len(statements)} 条 SQL，{elapsed:.2f} ms，'
+                      f'{sum(len(day["screenings"]) for day in days_listed)} 个场次分布在 {len(days_listed)} 天')
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='批量导入排片与场次索引压测')
+    parser.add_argument('--halls', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--shows', type=int, default=6, help='每个放映厅每天的场次数')
+    parser.add_argument('--movies', type=int, default=40)
+    args = parser.parse_args()
+    run(args.halls, args.days, args.shows, args.movies)
@@ -0,0 +1,89 @@
+# 电影检索延迟压测：对比 LIKE '%…%' 全表扫描、FTS5 与进程内倒排索引在不同片库规模下的查询耗时
+# 用法（在 backend 目录下）：python -m benchmarks.search_bench --sizes 1000 10000 50000
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.reservation_bench import create_bench_app
+from models import db, Movie
+from search import Fts5SearchIndex, MemorySearchIndex
+
+WORDS = ['dark', 'night', 'river', 'star', 'city', 'war', 'love', 'ghost', 'king', 'dream', 'storm', 'shadow']
+CJK = '流浪地球星际穿越疯狂动物城霸王别姬阿凡达碟中谍蜘蛛侠宇宙速度激情复仇者联盟哈利波特'
+QUERIES = ['dark', 'star city', '流浪', '宇宙', 'kin', '星际']
+
+
+def _title(rng):
+    if rng.random() < 0.5:
+        return ' '.join(rng.choice(WORDS).title() for _ in range(rng.randint(1, 3)))
+    start = rng.randrange(len(CJK) - 4)
+    return CJK[start:start + rng.randint(2, 5)] + str(rng.randint(1, 9))
+
+
+def seed(app, size):
+    rng = random.Random(size)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(Movie.__table__.insert(), [
+            {
+                'title': _title(rng),
+                'director': ' '.join(rng.choice(WORDS).title() for _ in range(2)),
+                'actors': ', '.join(_title(rng) for _ in range(3)),
+                'description': ' '.join(rng.choice(WORDS) for _ in range(20)),
+                'duration': 120
+            }
+            for _ in range(size)
+        ])
+        db.session.commit()
+
+
+def _timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def run(sizes=(1000, 10000), repeat=20):
+    results = []
+    for size in sizes:
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            app = create_bench_app(db_path)
+            seed(app, size)
+            with app.app_context():
+                fts5 = Fts5SearchIndex()
+                fts5.rebuild()
+                memory = MemorySearchIndex()
+                memory.rebuild()
+                for query in QUERIES:
+                    results.append({
+                        'movies': size,
+                        'query': query,
+                        'like_ms': _timed(lambda: db.session.query(Movie.movie_id).filter(db.or_(
+                            Movie.title.contains(query), Movie.director.contains(query),
+                            Movie.actors.contains(query), Movie.description.contains(query)
+                        )).limit(500).all(), repeat),
+                        'fts5_ms': _timed(lambda: fts5.search(query), repeat),
+                        'memory_ms': _timed(lambda: memory.search(query), repeat),
+                    })
+        finally:
+            os.remove(db_path)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='电影检索延迟压测')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    for row in run(args.sizes, args.repeat):
+        print(json.dumps(row, ensure_ascii=False))
@@ -0,0 +1,251 @@
+# 服务方式对比：分别用开发服务器（app.run 线程模式）与 Gunicorn 启动应用，先建立大量空闲的
+# 选座页面 SSE 连接，在这些连接保持期间并发压测浏览页面，比较能保持的连接数与浏览请求的延迟
+# 用法（在 backend 目录下）：
+#   python -m benchmarks.serving_bench --watchers 1000 --clients 32 --duration 10
+#   python -m benchmarks.serving_bench --modes dev,gevent,gthread --workers 2
+import argparse
+import http.client
+import os
+import random
+import re
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.cookiejar import CookieJar
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, build_opener
+
+from benchmarks.load_bench import PASSWORD, Recorder, _percentile, _prepare_database, _seed, load_fixtures, summarize
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEV_SERVER = "from app import create_app; create_app().run(host='127.0.0.1', port={port}, threaded=True)"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, port, workers, extra_env=None):
+    env = dict(os.environ, LOG_LEVEL='WARNING', **(extra_env or {}))
+    if mode == 'dev':
+        command = [sys.executable, '-c', DEV_SERVER.format(port=port)]
+    else:
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py']
+        env.update(BIND=f'127.0.0.1:{port}', WEB_WORKERS=str(workers), WEB_WORKER_CLASS=mode)
+    process = subprocess.Popen(
+        command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'{mode} 服务未能启动')
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=20)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+# 登录后返回 Cookie 请求头，登录表单带 CSRF 令牌
+def login(base_url, user_id):
+    jar = CookieJar()
+    opener = build_opener(HTTPCookieProcessor(jar))
+    page = opener.open(base_url + '/login').read().decode('utf-8')
+    token = re.search(r'name="csrf_token" value="([^"]+)"', page).group(1)
+    opener.open(base_url + '/login', urlencode({
+        'csrf_token': token, 'username': f'user{user_id}', 'password': PASSWORD
+    }).encode())
+    return '; '.join(f'{cookie.name}={cookie.value}' for cookie in jar)
+
+
+# 建立空闲的 SSE 订阅连接，在 timeout 秒内收到响应开头的 retry 行视为连接成功
+def open_watchers(port, screening_id, cookie, count, timeout=10):
+    request = (
+        f'GET /screening/{screening_id}/seats/events HTTP/1.1\r\n'
+        f'Host: 127.0.0.1:{port}\r\nAccept: text/event-stream\r\nCookie: {cookie}\r\n\r\n'
+    ).encode()
+    sockets, failed = [], 0
+    started = time.perf_counter()
+    for _ in range(count):
+        try:
+            sock = socket.create_connection(('127.0.0.1', port), timeout=timeout)
+            sock.sendall(request)
+            sockets.append(sock)
+        except OSError:
+            failed += 1
+    # 所有连接共用一个截止时间，超出服务并发上限的连接不会逐个等满超时
+    deadline = time.monotonic() + timeout
+    connected = []
+    for sock in sockets:
+        try:
+            sock.settimeout(max(deadline - time.monotonic(), 0.01))
+            data = b''
+            while b'retry:' not in data:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+            if b'retry:' in data:
+                connected.append(sock)
+                continue
+        except OSError:
+            pass
+        failed += 1
+        sock.close()
+    return connected, failed, time.perf_counter() - started
+
+
+# 在 duration 秒内用 clients 个并发客户端请求首页、电影列表与详情页
+def browse_load(port, movie_ids, clients, duration, seed):
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        rng = random.Random(seed + index)
+        while time.perf_counter() < deadline:
+            route, path = rng.choice([
+                ('home', '/'),
+                ('movie_list', f'/movies?page={rng.randint(1, 5)}'),
+                ('movie_detail', f'/movie/{rng.choice(movie_ids)}'),
+            ])
+            started = time.perf_counter()
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                connection.close()
+            except OSError:
+                status = 599
+            recorder.add(route, time.perf_counter() - started, status, None)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    result = summarize(recorder, time.perf_counter() - started)
+    latencies = sorted(latency * 1000 for samples in recorder.samples.values() for latency, _ in samples)
+    for percent in (50, 95, 99):
+        result[f'p{percent}_ms'] = round(_percentile(latencies, percent), 2) if latencies else None
+    result['errors'] = sum(recorder.errors.values())
+    return result
+
+
+def bench_mode(mode, args, fixtures):
+    port = _free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    process = start_server(mode, port, args.workers)
+    watchers = []
+    try:
+        cookie = login(base_url, fixtures['user_ids'][0])
+        screening_id = next(iter(fixtures['screenings']))
+        watchers, failed, connect_seconds = open_watchers(port, screening_id, cookie, args.watchers)
+        load = browse_load(port, fixtures['movie_ids'], args.clients, args.duration, args.seed)
+        # 压测结束后连接仍应保持
+        alive = sum(1 for sock in watchers if _is_open(sock))
+        rss = _server_rss_mb(process)
+        return {
+            'mode': mode,
+            'watchers': len(watchers),
+            'watchers_failed': failed,
+            'watchers_alive': alive,
+            'connect_seconds': round(connect_seconds, 2),
+            'server_rss_mb': rss,
+            **load
+        }
+    finally:
+        for sock in watchers:
+            sock.close()
+        stop_server(process)
+
+
+# 服务端所有进程（同一进程组）的常驻内存，只在有 /proc 的系统上统计
+def _server_rss_mb(process):
+    if not os.path.isdir('/proc'):
+        return None
+    total = 0
+    for pid in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            if os.getpgid(int(pid)) != process.pid:
+                continue
+            with open(f'/proc/{pid}/status') as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+        except (OSError, StopIteration):
+            continue
+    return round(total / 1024, 1)
+
+
+def _is_open(sock):
+    sock.setblocking(False)
+    try:
+        return sock.recv(4096) != b''
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.setblocking(True)
+
+
+def run(args):
+    db_path = _prepare_database(args)
+    try:
+        from app import create_app
+        from commands import prepare_database
+        from likes import like_buffer
+
+        app = create_app()
+        with app.app_context():
+            prepare_database()
+        if db_path:
+            _seed(app, args)
+        with app.app_context():
+            fixtures = load_fixtures()
+            like_buffer.flush()
+        return [bench_mode(mode, args, fixtures) for mode in args.modes.split(',')]
+    finally:
+        if db_path:
+            os.remove(db_path)
+
+
+def report(results):
+    print(f'{"mode":<8} {"watchers":>9} {"failed":>7} {"alive":>6} {"rps":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7} {"rss MB":>8}')
+    for result in results:
+        print(
+            f'{result["mode"]:<8} {result["watchers"]:>9} {result["watchers_failed"]:>7} {result["watchers_alive"]:>6} '
+            f'{result["requests_per_second"]:>8} {result["p50_ms"]:>8} {result["p95_ms"]:>8} {result["p99_ms"]:>8} '
+            f'{result["errors"]:>7} {result["server_rss_mb"]!s:>8}'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='对比开发服务器与 Gunicorn 的并发连接能力')
+    parser.add_argument('--modes', default='dev,gevent', help='逗号分隔：dev、gevent、gthread')
+    parser.add_argument('--workers', type=int, default=2, help='Gunicorn 工作进程数')
+    parser.add_argument('--watchers', type=int, default=1000, help='保持的空闲 SSE 连接数')
+    parser.add_argument('--clients', type=int, default=32, help='浏览页面的并发客户端数')
+    parser.add_argument('--duration', type=float, default=10, help='浏览压测时长（秒）')
+    parser.add_argument('--database', help='使用已有数据库文件；不指定时生成临时数据库')
+    parser.add_argument('--movies', type=int, default=300)
+    parser.add_argument('--cinemas', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    report(run(args))
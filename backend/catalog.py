@@ -0,0 +1,129 @@
+import threading
+import time
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import event
+
+from models import db, Movie
+from search import search_movie_ids
+
+# 默认分页与缓存参数，可通过 app.config 覆盖
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 60
+DEFAULT_FACET_CACHE_SECONDS = 300
+
+_lock = threading.Lock()
+_facets = None
+_facets_built_at = 0.0
+
+
+def _build_facets():
+    genres = db.session.query(Movie.genre, db.func.count(Movie.movie_id)).filter(
+        Movie.genre.isnot(None), Movie.genre != ''
+    ).group_by(Movie.genre).order_by(Movie.genre).all()
+
+    year = db.extract('year', Movie.release_date)
+    years = db.session.query(year, db.func.count(Movie.movie_id)).filter(
+        Movie.release_date.isnot(None)
+    ).group_by(year).all()
+
+    return {
+        'genres': [(genre, count) for genre, count in genres],
+        'years': sorted(((str(int(y)), count) for y, count in years if y), reverse=True),
+    }
+
+
+# 类型与年份的筛选项及各自电影数，缓存在进程内，电影写入时失效
+def get_facets():
+    global _facets, _facets_built_at
+    max_age = current_app.config.get('FACET_CACHE_SECONDS', DEFAULT_FACET_CACHE_SECONDS)
+    with _lock:
+        if _facets is not None and time.monotonic() - _facets_built_at < max_age:
+            return _facets
+
+    facets = _build_facets()
+    with _lock:
+        _facets = facets
+        _facets_built_at = time.monotonic()
+    return facets
+
+
+def invalidate_facets():
+    global _facets
+    with _lock:
+        _facets = None
+
+
+def page_size_arg(value):
+    default = current_app.config.get('MOVIE_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    try:
+        size = int(value) if value else default
+    except ValueError:
+        size = default
+    return max(1, min(size, current_app.config.get('MOVIE_PAGE_SIZE_MAX', MAX_PAGE_SIZE)))
+
+
+def _cursor_arg(value):
+    try:
+        return max(0, int(value)) if value else 0
+    except ValueError:
+        return 0
+
+
+def apply_filters(query, genre, year):
+    if genre:
+        query = query.filter(Movie.genre == genre)
+    # 按日期范围过滤年份，可以使用 release_date 上的索引
+    if year:
+        try:
+            year = int(year)
+            query = query.filter(Movie.release_date >= date(year, 1, 1), Movie.release_date < date(year + 1, 1, 1))
+        except ValueError:
+            query = query.filter(db.false())
+    return query
+
+
+# 电影列表分页：浏览时游标为上一页最后的 movie_id；检索时游标为相关度排序中的位置
+def movie_page(search_query='', genre='', year='', cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    position = _cursor_arg(cursor)
+
+    if not search_query:
+        movies = apply_filters(Movie.query, genre, year).filter(
+            Movie.movie_id > position
+        ).order_by(Movie.movie_id).limit(page_size + 1).all()
+        next_cursor = movies[page_size - 1].movie_id if len(movies) > page_size else None
+        return movies[:page_size], next_cursor
+
+    ranked_ids = search_movie_ids(search_query)
+    if genre or year:
+        matched = {movie_id for (movie_id,) in apply_filters(
+            db.session.query(Movie.movie_id).filter(Movie.movie_id.in_(ranked_ids)), genre, year
+        )}
+        ranked_ids = [movie_id for movie_id in ranked_ids if movie_id in matched]
+
+    page_ids = ranked_ids[position:position + page_size]
+    next_cursor = position + page_size if len(ranked_ids) > position + page_size else None
+    movies = Movie.query.filter(Movie.movie_id.in_(page_ids)).all() if page_ids else []
+    rank = {movie_id: index for index, movie_id in enumerate(page_ids)}
+    movies.sort(key=lambda movie: rank[movie.movie_id])
+    return movies, next_cursor
+
+
+# 电影增删改后在提交时使筛选项缓存失效
+@event.listens_for(Movie, 'after_insert')
+@event.listens_for(Movie, 'after_update')
+@event.listens_for(Movie, 'after_delete')
+def _movie_written(mapper, connection, movie):
+    db.session.info['facets_dirty'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('facets_dirty', False):
+        invalidate_facets()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('facets_dirty', None)
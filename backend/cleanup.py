@@ -0,0 +1,108 @@
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, select, update
+
+from models import db, Order, OrderSeat, Screening, ScreeningSeat
+
+# 场次结束多久之后清理（小时）与每批处理的场次数
+DEFAULT_RETENTION_HOURS = 5
+DEFAULT_BATCH_SIZE = 200
+
+
+# 清理一批过期场次：已支付订单归档为 completed，未支付/已取消订单及座位删除，
+# 没有归档订单的场次直接删除，其余场次标记为 ended 以保留历史
+def _cleanup_batch(screening_ids, report):
+    stale_orders = select(Order.order_id).where(
+        Order.screening_id.in_(screening_ids),
+        Order.status.in_(['pending', 'cancelled'])
+    )
+
+    result = db.session.execute(
+        delete(ScreeningSeat)
+        .where(ScreeningSeat.screening_id.in_(screening_ids))
+        .execution_options(synchronize_session=False)
+    )
+    report['seat_holds_deleted'] += result.rowcount
+
+    result = db.session.execute(
+        delete(OrderSeat)
+        .where(OrderSeat.order_id.in_(stale_orders))
+        .execution_options(synchronize_session=False)
+    )
+    report['order_seats_deleted'] += result.rowcount
+
+    result = db.session.execute(
+        delete(Order)
+        .where(Order.screening_id.in_(screening_ids), Order.status.in_(['pending', 'cancelled']))
+        .execution_options(synchronize_session=False)
+    )
+    report['orders_deleted'] += result.rowcount
+
+    result = db.session.execute(
+        update(Order)
+        .where(Order.screening_id.in_(screening_ids), Order.status == 'paid')
+        .values(status='completed')
+        .execution_options(synchronize_session=False)
+    )
+    report['orders_archived'] += result.rowcount
+
+    result = db.session.execute(
+        delete(Screening)
+        .where(
+            Screening.screening_id.in_(screening_ids),
+            ~exists().where(Order.screening_id == Screening.screening_id)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    report['screenings_deleted'] += result.rowcount
+
+    result = db.session.execute(
+        update(Screening)
+        .where(Screening.screening_id.in_(screening_ids))
+        .values(status='ended')
+        .execution_options(synchronize_session=False)
+    )
+    report['screenings_archived'] += result.rowcount
+
+
+# 分批清理过期场次，每批单独提交，避免长事务阻塞下单写入
+def cleanup_expired_screenings(now=None, retention_hours=DEFAULT_RETENTION_HOURS, batch_size=DEFAULT_BATCH_SIZE):
+    started = time.perf_counter()
+    now = now or datetime.now()
+    cutoff_time = now - timedelta(hours=retention_hours)
+
+    report = {
+        'batches': 0,
+        'screenings_deleted': 0,
+        'screenings_archived': 0,
+        'orders_deleted': 0,
+        'orders_archived': 0,
+        'order_seats_deleted': 0,
+        'seat_holds_deleted': 0,
+    }
+
+    while True:
+        screening_ids = db.session.execute(
+            select(Screening.screening_id)
+            .where(Screening.end_time < cutoff_time, Screening.status != 'ended')
+            .order_by(Screening.screening_id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not screening_ids:
+            break
+
+        try:
+            _cleanup_batch(screening_ids, report)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        report['batches'] += 1
+
+    report['rows_removed'] = (
+        report['screenings_deleted'] + report['orders_deleted']
+        + report['order_seats_deleted'] + report['seat_holds_deleted']
+    )
+    report['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+    return report
@@ -0,0 +1,51 @@
+# 过期场次清理进程，与 Web 进程分开运行
+# 用法（在 backend 目录下）：python cleanup_worker.py [--once] [--interval 3600] [--batch-size 200]
+# 也可以通过 Flask 命令运行：flask cleanup-worker [--once]
+import argparse
+import logging
+import time
+from datetime import datetime
+
+from cleanup import DEFAULT_BATCH_SIZE, DEFAULT_RETENTION_HOURS, cleanup_expired_screenings
+from models import db
+
+logger = logging.getLogger(__name__)
+
+
+# 以下函数需在应用上下文中调用
+def run_once(retention_hours, batch_size):
+    try:
+        report = cleanup_expired_screenings(retention_hours=retention_hours, batch_size=batch_size)
+    finally:
+        db.session.remove()
+    print(
+        f"[{datetime.now()}] 已清理过期场次：删除 {report['screenings_deleted']} 个场次，"
+        f"归档 {report['screenings_archived']} 个场次 / {report['orders_archived']} 个订单，"
+        f"共删除 {report['rows_removed']} 行，耗时 {report['elapsed_seconds']} 秒"
+    )
+    return report
+
+
+def run(retention_hours=DEFAULT_RETENTION_HOURS, batch_size=DEFAULT_BATCH_SIZE, interval=3600, once=False):
+    while True:
+        try:
+            run_once(retention_hours, batch_size)
+        except Exception:
+            logger.exception('清理过期场次时出错')
+        if once:
+            break
+        time.sleep(interval)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='清理过期场次')
+    parser.add_argument('--once', action='store_true', help='只执行一次后退出')
+    parser.add_argument('--interval', type=int, default=3600, help='两次清理之间的间隔（秒）')
+    parser.add_argument('--retention-hours', type=int, default=DEFAULT_RETENTION_HOURS)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from app import create_app
+
+    with create_app().app_context():
+        run(args.retention_hours, args.batch_size, args.interval, args.once)
@@ -0,0 +1,151 @@
+import json
+
+import click
+
+import cleanup_worker
+import expiry_worker
+from assets import build_assets
+from cleanup import DEFAULT_BATCH_SIZE, DEFAULT_RETENTION_HOURS
+from database import REPLICA_BIND, copy_sqlite_database
+from hall_layout import backfill_hall_layouts, provision_halls
+from images import ImageError, mirror_posters
+from likes import rebuild_like_counts
+from models import db
+from ratings import rebuild_rating_aggregates
+from reservation import backfill_screening_seats
+from scheduling import ScheduleError, import_schedule, read_schedule
+from schema import DuplicateRowsError, upgrade_schema
+from search import get_search_index, init_search_index
+
+
+# 建表并升级已有数据库：补齐列与索引，新增列或约束时重算相关数据，补齐放映厅布局与占座记录并确保检索索引存在
+# 需在应用上下文中调用；由 flask init-db、开发服务器启动与 Gunicorn 主进程启动时执行。
+# 已有数据违反新增的唯一索引时抛出 DuplicateRowsError，只有 dedupe=True（flask init-db --dedupe）时才删除重复行
+def prepare_database(dedupe=False):
+    schema_changes = upgrade_schema(dedupe)
+    if 'movies.review_count' in schema_changes:
+        rebuild_rating_aggregates()
+    if 'uq_review_like_user_review' in schema_changes:
+        rebuild_like_counts()
+    backfill_hall_layouts()
+    backfill_screening_seats()
+    init_search_index()
+    return schema_changes
+
+
+def register_commands(app):
+    # 建表与升级表结构：flask init-db [--dedupe]
+    @app.cli.command('init-db')
+    @click.option('--dedupe', is_flag=True, help='删除违反新增唯一索引的重复行（每组保留主键最小的一行，逐行记录日志）')
+    def init_db_command(dedupe):
+        try:
+            changes = prepare_database(dedupe=dedupe)
+        except DuplicateRowsError as e:
+            raise click.ClickException(str(e))
+        print(f'数据库已就绪，新增 {len(changes)} 个列或索引' if changes else '数据库已就绪')
+
+    # 重新计算所有电影的评分聚合：flask rebuild-ratings
+    @app.cli.command('rebuild-ratings')
+    def rebuild_ratings_command():
+        count = rebuild_rating_aggregates()
+        print(f'已重新计算 {count} 部电影的评分')
+
+    # 按点赞表重新计算所有影评的点赞数：flask rebuild-likes
+    @app.cli.command('rebuild-likes')
+    def rebuild_likes_command():
+        rebuild_like_counts()
+        print('已重新计算影评点赞数')
+
+    # 重建电影全文索引：flask rebuild-search
+    @app.cli.command('rebuild-search')
+    def rebuild_search_command():
+        index = get_search_index()
+        index.rebuild()
+        print(f'已重建电影检索索引（{index.name}）')
+
+    # 按布局文件批量开厅并生成座位：flask provision-halls halls.json
+    # 文件为列表，每项 {"cinema_id": 1, "name": "IMAX厅", "layout": ["__rrrr__", ...]}，layout 也可以是编码后的字符串
+    @app.cli.command('provision-halls')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    def provision_halls_command(path):
+        with open(path, encoding='utf-8') as f:
+            halls = json.load(f)
+        try:
+            created = provision_halls(halls)
+        except (KeyError, ValueError) as e:
+            db.session.rollback()
+            print(f'布局文件无效：{e}')
+            return
+        db.session.commit()
+        print(f'已创建 {len(created)} 个放映厅')
+
+    # 批量导入排片：flask import-schedule week.csv [--dry-run]
+    # CSV 表头或 JSON 对象的键为 movie_id, hall_id, start_time, price，可选 end_time；同一放映厅时间重叠时整批不导入
+    @app.cli.command('import-schedule')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--dry-run', is_flag=True, help='只校验，不写入')
+    def import_schedule_command(path, dry_run):
+        try:
+            count = import_schedule(read_schedule(path), dry_run=dry_run)
+        except ScheduleError as e:
+            db.session.rollback()
+            print(e)
+            for problem in e.problems[:20]:
+                print(f'  {problem}')
+            if len(e.problems) > 20:
+                print(f'  ……另有 {len(e.problems) - 20} 处')
+            return
+        print(f'校验通过，可导入 {count} 个场次' if dry_run else f'已导入 {count} 个场次')
+
+    # 构建静态资源（压缩、内容哈希命名、gzip / brotli 预压缩）：flask build-assets
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        manifest = build_assets()
+        for source, built in sorted(manifest.items()):
+            print(f'{source} -> {built}')
+
+    # 把电影海报下载到本地并生成各尺寸文件：flask mirror-posters [--limit 100] [--force]
+    # 需要安装 Pillow；页面随后使用本地文件，海报地址修改后需重新执行
+    @app.cli.command('mirror-posters')
+    @click.option('--limit', type=int, help='最多处理的电影数')
+    @click.option('--force', is_flag=True, help='已镜像的电影也重新处理')
+    def mirror_posters_command(limit, force):
+        try:
+            mirrored, failures = mirror_posters(limit, force)
+        except ImageError as e:
+            print(e)
+            return
+        print(f'已镜像 {mirrored} 张海报' + (f'，{len(failures)} 张失败' if failures else ''))
+        for movie, reason in failures[:20]:
+            print(f'  {movie.movie_id} {movie.title}：{reason}')
+
+    # 本地用两个 SQLite 文件测试只读副本时，把主库复制到副本：flask sync-replica
+    @app.cli.command('sync-replica')
+    def sync_replica_command():
+        if REPLICA_BIND not in app.config.get('SQLALCHEMY_BINDS', {}):
+            print('未配置只读副本（DATABASE_REPLICA_URL）')
+            return
+        replica = db.replica_engine()
+        if db.engine.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+            print('只支持 SQLite 之间的复制，其他数据库请使用数据库自身的复制功能')
+            return
+        copy_sqlite_database(db.engine, replica)
+        print('已将主库复制到只读副本')
+
+    # 过期场次清理进程：flask cleanup-worker
+    @app.cli.command('cleanup-worker')
+    @click.option('--once', is_flag=True, help='只执行一次后退出')
+    @click.option('--interval', default=3600, help='两次清理之间的间隔（秒）')
+    @click.option('--retention-hours', default=DEFAULT_RETENTION_HOURS)
+    @click.option('--batch-size', default=DEFAULT_BATCH_SIZE)
+    def cleanup_worker_command(once, interval, retention_hours, batch_size):
+        cleanup_worker.run(retention_hours, batch_size, interval, once)
+
+    # 超时订单进程：flask expiry-worker
+    @app.cli.command('expiry-worker')
+    @click.option('--once', is_flag=True, help='只执行一次后退出')
+    @click.option('--batch-size', type=int, help='每个事务释放的订单数')
+    @click.option('--lookahead', type=int, help='每次预读多少秒内到期的订单')
+    @click.option('--metrics-port', type=int, help='在本机该端口提供 /metrics')
+    def expiry_worker_command(once, batch_size, lookahead, metrics_port):
+        expiry_worker.start(batch_size, lookahead, metrics_port, once)
@@ -0,0 +1,97 @@
+import sqlite3
+import time
+
+from flask import current_app, has_app_context, has_request_context, request, session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm
+from sqlalchemy.sql.dml import UpdateBase
+
+# 连接池默认参数（SQLite 文件库使用 NullPool，不受这些参数影响），可通过 app.config 覆盖
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_OVERFLOW = 20
+DEFAULT_POOL_RECYCLE = 1800
+DEFAULT_POOL_TIMEOUT = 30
+DEFAULT_SQLITE_BUSY_TIMEOUT_MS = 5000
+DEFAULT_REPLICA_PIN_SECONDS = 5
+REPLICA_BIND = 'replica'
+
+
+# 会话标记为只读时，查询走只读副本；flush 与 INSERT/UPDATE/DELETE 始终走主库
+class RoutingSession(SignallingSession):
+    def get_bind(self, mapper=None, clause=None):
+        replica = self.info.get('read_replica')
+        if replica is not None and not self._flushing and not isinstance(clause, UpdateBase):
+            return replica
+        return super().get_bind(mapper, clause)
+
+
+def _sqlite_pragmas(journal_mode, busy_timeout):
+    def on_connect(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA busy_timeout = {int(busy_timeout)}')
+        if journal_mode:
+            cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+        cursor.close()
+    return on_connect
+
+
+# 按配置创建数据库引擎：MySQL 等服务端数据库使用连接池、连接检测与定期回收；
+# SQLite 开启 WAL（读写互不阻塞）并设置忙等待时间；可选的只读副本供只读页面使用
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        if not sa_url.drivername.startswith('sqlite'):
+            config = app.config
+            options.setdefault('pool_size', config.get('DB_POOL_SIZE', DEFAULT_POOL_SIZE))
+            options.setdefault('max_overflow', config.get('DB_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW))
+            options.setdefault('pool_recycle', config.get('DB_POOL_RECYCLE', DEFAULT_POOL_RECYCLE))
+            options.setdefault('pool_timeout', config.get('DB_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT))
+            options.setdefault('pool_pre_ping', config.get('DB_POOL_PRE_PING', True))
+        return super().apply_driver_hacks(app, sa_url, options)
+
+    def create_engine(self, sa_url, engine_opts):
+        engine = super().create_engine(sa_url, engine_opts)
+        if engine.dialect.name == 'sqlite':
+            config = current_app.config if has_app_context() else {}
+            event.listen(engine, 'connect', _sqlite_pragmas(
+                config.get('SQLITE_JOURNAL_MODE', 'WAL'),
+                config.get('SQLITE_BUSY_TIMEOUT_MS', DEFAULT_SQLITE_BUSY_TIMEOUT_MS)
+            ))
+        return engine
+
+    def init_app(self, app):
+        super().init_app(app)
+        if REPLICA_BIND in (app.config.get('SQLALCHEMY_BINDS') or {}):
+            app.before_request(self._route_to_replica)
+            event.listen(self.session, 'after_commit', self._pin_primary)
+
+    def replica_engine(self):
+        return self.get_engine(current_app, bind=REPLICA_BIND)
+
+    # 只读页面的查询走副本；用户刚写入过数据时短时间内仍读主库，保证能看到自己的修改
+    def _route_to_replica(self):
+        if request.endpoint not in current_app.config.get('READ_REPLICA_ENDPOINTS', ()):
+            return
+        if session.get('_primary_until', 0) > time.time():
+            return
+        self.session.info['read_replica'] = self.replica_engine()
+
+    def _pin_primary(self, db_session):
+        if has_request_context():
+            seconds = current_app.config.get('READ_REPLICA_PIN_SECONDS', DEFAULT_REPLICA_PIN_SECONDS)
+            session['_primary_until'] = time.time() + seconds
+
+
+# 本地用两个 SQLite 文件模拟主库与只读副本：用 SQLite 备份接口把主库复制到副本
+def copy_sqlite_database(source_engine, target_engine):
+    source = source_engine.raw_connection()
+    target = target_engine.raw_connection()
+    try:
+        source.connection.backup(target.connection)
+    finally:
+        target.close()
+        source.close()
@@ -0,0 +1,137 @@
+import heapq
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from models import db, Order, ScreeningSeat
+from reservation import release_orders
+
+# 每批释放的订单数与预读窗口（秒），可通过 app.config 覆盖
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_LOOKAHEAD_SECONDS = 60
+
+
+# 待支付订单到期调度：按锁座到期时间维护一个小顶堆，每次只从 expires_at 索引预读
+# 接下来一个窗口内到期的订单；到期后分批取消订单、删除锁座并归还余票
+class ExpiryScheduler:
+    def __init__(self, batch_size=None, lookahead_seconds=None):
+        config = current_app.config
+        self.batch_size = batch_size or config.get('ORDER_EXPIRY_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        lookahead = lookahead_seconds or config.get('ORDER_EXPIRY_LOOKAHEAD_SECONDS', DEFAULT_LOOKAHEAD_SECONDS)
+        self.lookahead = timedelta(seconds=lookahead)
+        self._lock = threading.Lock()
+        self._heap = []
+        self._queued = set()
+        # 上次预读的窗口末尾，用于安排下一次预读
+        self._loaded_until = None
+        self.orders_expired = 0
+        self.seats_released = 0
+
+    # 把 now + 预读窗口 之前到期的订单放入堆。不以上次预读位置为下限：预读之后新建、且到期时间早于上次窗口末尾的锁座
+    # （锁座时长短于预读窗口或各进程时钟有偏差时）也会在下一次预读时入堆；已在堆中的订单按 _queued 去重。
+    # 首次预读同样补上进程停止期间积压的订单；返回新入堆的订单数
+    def refill(self, now=None):
+        now = now or datetime.now()
+        horizon = now + self.lookahead
+        rows = db.session.execute(
+            select(ScreeningSeat.order_id, func.min(ScreeningSeat.expires_at))
+            .where(ScreeningSeat.status == 'held', ScreeningSeat.expires_at < horizon)
+            .group_by(ScreeningSeat.order_id)
+        ).all()
+        db.session.commit()
+
+        queued = 0
+        with self._lock:
+            for order_id, expires_at in rows:
+                if order_id not in self._queued:
+                    self._queued.add(order_id)
+                    heapq.heappush(self._heap, (expires_at, order_id))
+                    queued += 1
+            self._loaded_until = horizon
+        return queued
+
+    def _pop_due(self, now):
+        with self._lock:
+            due = []
+            while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                _, order_id = heapq.heappop(self._heap)
+                self._queued.discard(order_id)
+                due.append(order_id)
+            return due
+
+    # 释放所有已到期的订单，每批一个事务；期间已支付或已取消的订单会被跳过
+    def release_due(self, now=None):
+        now = now or datetime.now()
+        orders = seats = 0
+        while True:
+            due = self._pop_due(now)
+            if not due:
+                break
+            order_ids = db.session.execute(
+                select(ScreeningSeat.order_id).distinct()
+                .join(Order, Order.order_id == ScreeningSeat.order_id)
+                .where(
+                    ScreeningSeat.order_id.in_(due),
+                    ScreeningSeat.status == 'held',
+                    ScreeningSeat.expires_at <= now,
+                    Order.status == 'pending'
+                )
+            ).scalars().all()
+            try:
+                released = release_orders(order_ids)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                # 放回堆中，下一轮重试
+                with self._lock:
+                    for order_id in due:
+                        if order_id not in self._queued:
+                            self._queued.add(order_id)
+                            heapq.heappush(self._heap, (now, order_id))
+                raise
+            orders += len(order_ids)
+            seats += released
+
+        with self._lock:
+            self.orders_expired += orders
+            self.seats_released += seats
+        return orders, seats
+
+    # 预读并释放一轮，返回本轮取消的订单数与释放的座位数
+    def tick(self, now=None):
+        now = now or datetime.now()
+        if self._loaded_until is None or now + self.lookahead / 2 >= self._loaded_until:
+            self.refill(now)
+        return self.release_due(now)
+
+    # 距离下一次需要处理的时间（秒）：最早到期的订单或下一次预读，取较早者
+    def seconds_until_next(self, now=None):
+        now = now or datetime.now()
+        with self._lock:
+            next_refill = self._loaded_until - self.lookahead / 2 if self._loaded_until else now
+            wake_at = min(self._heap[0][0], next_refill) if self._heap else next_refill
+        return max((wake_at - now).total_seconds(), 0.0)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued_orders': len(self._heap),
+                'next_expiry': self._heap[0][0].isoformat() if self._heap else None,
+                'orders_expired': self.orders_expired,
+                'seats_released': self.seats_released
+            }
+
+    def render_metrics(self):
+        stats = self.stats()
+        lines = []
+        for name, metric_type, help_text, value in (
+            ('lumina_expiry_orders_total', 'counter', '超时取消的待支付订单数', stats['orders_expired']),
+            ('lumina_expiry_seats_released_total', 'counter', '超时释放的座位数', stats['seats_released']),
+            ('lumina_expiry_queued_orders', 'gauge', '等待到期的订单数', stats['queued_orders']),
+        ):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,83 @@
+# 待支付订单超时进程：锁座到期即取消订单并释放座位，与 Web 进程分开运行
+# 用法（在 backend 目录下）：python expiry_worker.py [--once] [--batch-size 200] [--metrics-port 9105]
+# 也可以通过 Flask 命令运行：flask expiry-worker [--once]
+import argparse
+import logging
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from expiry import ExpiryScheduler
+from models import db
+
+logger = logging.getLogger(__name__)
+
+# 两次检查之间的最长与最短等待时间（秒）
+MAX_SLEEP_SECONDS = 30
+MIN_SLEEP_SECONDS = 0.1
+
+
+# 以 Prometheus 文本格式暴露超时取消的订单数与释放的座位数
+def serve_metrics(scheduler, port):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = scheduler.render_metrics().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# 以下函数需在应用上下文中调用
+def run(scheduler, once=False):
+    while True:
+        wait = MAX_SLEEP_SECONDS
+        try:
+            orders, seats = scheduler.tick()
+            if orders or once:
+                stats = scheduler.stats()
+                print(
+                    f"[{datetime.now()}] 已取消超时订单 {orders} 个，释放座位 {seats} 个"
+                    f"（累计 {stats['orders_expired']} 个订单 / {stats['seats_released']} 个座位）"
+                )
+            wait = min(max(scheduler.seconds_until_next(), MIN_SLEEP_SECONDS), MAX_SLEEP_SECONDS)
+        except Exception:
+            logger.exception('释放超时订单时出错')
+        finally:
+            db.session.remove()
+        if once:
+            break
+        time.sleep(wait)
+
+
+def start(batch_size=None, lookahead=None, metrics_port=None, once=False):
+    scheduler = ExpiryScheduler(batch_size=batch_size, lookahead_seconds=lookahead)
+    if metrics_port:
+        serve_metrics(scheduler, metrics_port)
+    run(scheduler, once=once)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='取消超时未支付的订单并释放座位')
+    parser.add_argument('--once', action='store_true', help='只执行一次后退出')
+    parser.add_argument('--batch-size', type=int, default=None, help='每个事务释放的订单数')
+    parser.add_argument('--lookahead', type=int, default=None, help='每次预读多少秒内到期的订单')
+    parser.add_argument('--metrics-port', type=int, default=None, help='在本机该端口提供 /metrics')
+    args = parser.parse_args()
+
+    from app import create_app
+
+    with create_app().app_context():
+        start(args.batch_size, args.lookahead, args.metrics_port, args.once)
@@ -0,0 +1,20 @@
+from flask_login import LoginManager
+from flask_wtf.csrf import CSRFProtect
+
+from identity import load_principal
+
+# 扩展对象在此创建，由 create_app 调用 init_app 绑定到应用
+
+# 启用CSRF保护
+csrf = CSRFProtect()
+
+# 登录管理器
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+login_manager.login_message_category = 'info'
+
+
+# 用户加载器：从身份缓存取只读的 Principal，命中时不查询数据库
+@login_manager.user_loader
+def load_user(user_id):
+    return load_principal(user_id)
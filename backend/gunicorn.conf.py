@@ -0,0 +1,78 @@
+# 生产环境部署配置（Gunicorn）
+# 用法（在 backend 目录下）：gunicorn -c gunicorn.conf.py
+#
+# 并发能力 = 进程数 × 每进程并发：
+#   gevent（默认，需安装 gevent）：每个进程用协程处理最多 WEB_WORKER_CONNECTIONS 个连接，
+#     等待数据库或客户端时让出，适合选座页面的 SSE 长连接；
+#   gthread（未安装 gevent 时）：每个进程 WEB_THREADS 个线程，每个长连接占用一个线程。
+# 每个进程有独立的连接池，MySQL 的 max_connections 需不少于 进程数 × (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+import multiprocessing
+import os
+
+try:
+    import gevent
+except ImportError:
+    gevent = None
+
+wsgi_app = 'app:create_app()'
+bind = os.environ.get('BIND', '0.0.0.0:5001')
+workers = int(os.environ.get('WEB_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = os.environ.get('WEB_WORKER_CLASS', 'gevent' if gevent else 'gthread')
+worker_connections = int(os.environ.get('WEB_WORKER_CONNECTIONS', 1000))
+threads = int(os.environ.get('WEB_THREADS', 32))
+# SSE 连接不会自行结束，平滑重启时最多等待的秒数
+graceful_timeout = 10
+timeout = 60
+keepalive = 5
+accesslog = os.environ.get('ACCESS_LOG')
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
+
+# 主进程先创建应用，再 fork 出工作进程
+preload_app = True
+
+# 协程模式下必须在导入应用之前打补丁，否则预加载时创建的锁和连接不会让出
+if worker_class == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+
+def _engines(app, db):
+    yield db.engine
+    for bind in app.config.get('SQLALCHEMY_BINDS') or {}:
+        yield db.get_engine(app, bind=bind)
+
+
+# 主进程启动：建表与升级表结构、构建静态资源只执行一次
+def on_starting(server):
+    from assets import build_assets
+    from commands import prepare_database
+
+    with server.app.wsgi().app_context():
+        prepare_database()
+        build_assets()
+
+
+# 工作进程启动：丢弃从主进程继承的数据库连接，各进程自行建立连接池
+def post_fork(server, worker):
+    from models import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in _engines(app, db):
+            engine.dispose(close=False)
+
+
+# 工作进程退出：写回缓冲中的点赞计数，关闭密码哈希与图片处理进程池
+def worker_exit(server, worker):
+    from likes import like_buffer
+    from models import db
+    from images import pipeline
+    from passwords import hasher
+
+    with worker.wsgi.app_context():
+        try:
+            like_buffer.flush()
+        finally:
+            db.session.remove()
+            hasher.shutdown()
+            pipeline.shutdown()
@@ -0,0 +1,318 @@
+import re
+import threading
+from collections import namedtuple
+from itertools import groupby
+
+from sqlalchemy import bindparam, insert, select, update
+
+from models import db, Hall, Seat
+
+# 放映厅布局：每个格子一个字符，一行一个字符串
+#   r 普通座  v VIP 座  d 停用座（保留座位记录但不可售）  _ 过道或空位（没有座位）
+CELL_TYPES = {'r': 'regular', 'v': 'vip', 'd': 'disabled'}
+TYPE_CODES = {seat_type: code for code, seat_type in CELL_TYPES.items()}
+AISLE = '_'
+UNSELLABLE_TYPES = ('disabled',)
+
+# 排号最多两个字母（A..Z, AA..ZZ），与 Seat.seat_row 的长度一致
+MAX_ROWS = 26 + 26 * 26
+
+# 批量写入座位时每批的行数
+BATCH_SIZE = 5000
+
+_ROW_RE = re.compile(r'(?:\d*[rvd_])+')
+_RUN_RE = re.compile(r'(\d*)([rvd_])')
+
+# 放映厅座位的只读快照，模板按属性访问，与 Seat 模型字段同名；index 为 行 * 列数 + 列
+SeatInfo = namedtuple('SeatInfo', ['seat_id', 'seat_row', 'seat_col', 'type', 'index'])
+
+
+# 行号与排号互转：0 -> A，25 -> Z，26 -> AA
+def row_label(row):
+    if row < 26:
+        return chr(65 + row)
+    row -= 26
+    return chr(65 + row // 26) + chr(65 + row % 26)
+
+
+def row_number(label):
+    if not label or not label.isascii() or not label.isalpha() or not label.isupper() or len(label) > 2:
+        return -1
+    if len(label) == 1:
+        return ord(label) - 65
+    return 26 + (ord(label[0]) - 65) * 26 + ord(label[1]) - 65
+
+
+def default_grid(rows, cols):
+    return ['r' * cols] * rows
+
+
+def _check_grid(grid):
+    if not grid or len(grid) > MAX_ROWS:
+        raise ValueError(f'放映厅布局需要 1 到 {MAX_ROWS} 排')
+    cols = len(grid[0])
+    for row in grid:
+        if len(row) != cols or not cols:
+            raise ValueError('放映厅布局每排的格子数必须相同')
+        if row.strip('rvd_'):
+            raise ValueError(f'放映厅布局含有无效字符：{row}')
+    return grid
+
+
+# 压缩编码：每排按连续相同格子写成 次数+字符（次数为 1 时省略），连续相同的排写成 排*次数，排之间用 / 分隔
+# 例如 ['__rrrr__', '__rrrr__', 'vvvvvvvv'] -> '2_4r2_*2/8v'
+def encode(grid):
+    _check_grid(grid)
+    encoded_rows = []
+    for row, repeats in groupby(grid):
+        runs = ''.join(f'{len(run) if len(run) > 1 else ""}{cell}' for cell, run in
+                       ((cell, list(run)) for cell, run in groupby(row)))
+        count = len(list(repeats))
+        encoded_rows.append(f'{runs}*{count}' if count > 1 else runs)
+    return '/'.join(encoded_rows)
+
+
+def decode(text):
+    grid = []
+    for part in text.split('/'):
+        runs, _, repeats = part.partition('*')
+        if not _ROW_RE.fullmatch(runs) or (repeats and not repeats.isdigit()):
+            raise ValueError(f'无法解析放映厅布局：{part}')
+        row = ''.join(cell * int(count or 1) for count, cell in _RUN_RE.findall(runs))
+        grid.extend([row] * int(repeats or 1))
+    return _check_grid(grid)
+
+
+# 接受编码后的字符串或逐排的字符串列表
+def parse_layout(layout):
+    return decode(layout) if isinstance(layout, str) else _check_grid(list(layout))
+
+
+# 放映厅布局的不可变快照：grid 按 行 * 列数 + 列 排列，过道为 None；座位号为 seat_id_base + 格子序号
+class HallLayout:
+    __slots__ = ('hall_id', 'rows', 'cols', 'source', 'grid', 'seats', 'capacity', '_by_id')
+
+    def __init__(self, hall_id, grid, seat_ids, source=None):
+        cells = []
+        by_id = {}
+        cols = len(grid[0])
+        for row, line in enumerate(grid):
+            for col, code in enumerate(line):
+                index = row * cols + col
+                seat_id = seat_ids(index)
+                if code == AISLE or seat_id is None:
+                    cells.append(None)
+                    continue
+                seat = SeatInfo(seat_id, row_label(row), col + 1, CELL_TYPES[code], index)
+                cells.append(seat)
+                by_id[seat_id] = seat
+        object.__setattr__(self, 'hall_id', hall_id)
+        object.__setattr__(self, 'rows', len(grid))
+        object.__setattr__(self, 'cols', cols)
+        object.__setattr__(self, 'source', source)
+        object.__setattr__(self, 'grid', tuple(cells))
+        object.__setattr__(self, 'seats', tuple(seat for seat in cells if seat is not None))
+        object.__setattr__(self, 'capacity', sum(1 for seat in self.seats if seat.type not in UNSELLABLE_TYPES))
+        object.__setattr__(self, '_by_id', by_id)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('HallLayout 是只读的')
+
+    def seat(self, seat_id):
+        return self._by_id.get(seat_id)
+
+    # 座位号起点：座位号为 起点 + 格子序号；按 Seat 表拼出的旧布局没有起点
+    @property
+    def seat_id_base(self):
+        return self.source[1] if self.source else None
+
+    # 按当前格子重新编码（格式同 Hall.layout）
+    def encoded(self):
+        codes = [AISLE if seat is None else TYPE_CODES[seat.type] for seat in self.grid]
+        return encode([''.join(codes[row * self.cols:(row + 1) * self.cols]) for row in range(self.rows)])
+
+    # 座位都属于该放映厅且可售
+    def sellable(self, seat_ids):
+        for seat_id in seat_ids:
+            seat = self._by_id.get(seat_id)
+            if seat is None or seat.type in UNSELLABLE_TYPES:
+                return False
+        return True
+
+
+_lock = threading.Lock()
+_layouts = {}
+
+
+# 旧数据没有布局或座位号不连续时，按 Seat 表拼出布局（只查询一次）
+def _layout_from_seats(hall):
+    rows = db.session.execute(
+        select(Seat.seat_id, Seat.seat_row, Seat.seat_col, Seat.type).where(Seat.hall_id == hall.hall_id)
+    ).all()
+    cells = [AISLE] * (hall.rows * hall.cols)
+    seat_ids = {}
+    for seat_id, seat_row, seat_col, seat_type in rows:
+        row, col = row_number(seat_row), seat_col - 1
+        if 0 <= row < hall.rows and 0 <= col < hall.cols:
+            index = row * hall.cols + col
+            cells[index] = TYPE_CODES.get(seat_type, 'r')
+            seat_ids[index] = seat_id
+    grid = [''.join(cells[row * hall.cols:(row + 1) * hall.cols]) for row in range(hall.rows)]
+    return HallLayout(hall.hall_id, grid, seat_ids.get, source=(hall.layout, hall.seat_id_base))
+
+
+# 获取放映厅布局：有编码布局与连续座位号时不访问数据库；布局或座位号起点变化后自动重建
+def get_layout(hall):
+    source = (hall.layout, hall.seat_id_base)
+    with _lock:
+        layout = _layouts.get(hall.hall_id)
+    if layout is not None and layout.source == source:
+        return layout
+
+    if hall.layout and hall.seat_id_base is not None:
+        base = hall.seat_id_base
+        layout = HallLayout(hall.hall_id, decode(hall.layout), lambda index: base + index, source=source)
+    else:
+        layout = _layout_from_seats(hall)
+    with _lock:
+        _layouts[hall.hall_id] = layout
+    return layout
+
+
+def invalidate(hall_id=None):
+    with _lock:
+        if hall_id is None:
+            _layouts.clear()
+        else:
+            _layouts.pop(hall_id, None)
+
+
+def _seat_rows(hall_id, grid, seat_id_base):
+    cols = len(grid[0])
+    for row, line in enumerate(grid):
+        label = row_label(row)
+        for col, code in enumerate(line):
+            if code != AISLE:
+                yield {
+                    'seat_id': seat_id_base + row * cols + col,
+                    'hall_id': hall_id,
+                    'seat_row': label,
+                    'seat_col': col + 1,
+                    'type': CELL_TYPES[code]
+                }
+
+
+def _insert_batches(table, rows, batch_size):
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(insert(table), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(table), batch)
+        count += len(batch)
+    return count
+
+
+def _next_id(column):
+    return (db.session.query(db.func.max(column)).scalar() or 0) + 1
+
+
+# 批量开厅：halls 为 {'cinema_id', 'name', 'layout'} 的列表，layout 为编码字符串或逐排字符串列表
+# 每个放映厅占用一段连续的座位号（过道也占号），查询数与放映厅和座位数量无关（座位按批 executemany 写入）
+# 座位号起点取当前最大值，同一时间只应有一个开厅任务；由调用方提交事务
+def provision_halls(halls, batch_size=BATCH_SIZE):
+    hall_id = _next_id(Hall.hall_id)
+    seat_id_base = _next_id(Seat.seat_id)
+    hall_rows = []
+    grids = []
+    for spec in halls:
+        grid = parse_layout(spec['layout'])
+        rows, cols = len(grid), len(grid[0])
+        hall_rows.append({
+            'hall_id': hall_id,
+            'cinema_id': spec['cinema_id'],
+            'name': spec['name'],
+            'total_seats': sum(line.count('r') + line.count('v') for line in grid),
+            'rows': rows,
+            'cols': cols,
+            'layout': encode(grid),
+            'seat_id_base': seat_id_base
+        })
+        grids.append(grid)
+        hall_id += 1
+        seat_id_base += rows * cols
+
+    if not hall_rows:
+        return []
+    db.session.execute(insert(Hall.__table__), hall_rows)
+    _insert_batches(Seat.__table__, (
+        seat for hall, grid in zip(hall_rows, grids) for seat in _seat_rows(hall['hall_id'], grid, hall['seat_id_base'])
+    ), batch_size)
+    return [(hall['hall_id'], hall['seat_id_base']) for hall in hall_rows]
+
+
+# 为没有布局的旧放映厅补齐编码布局：按已有座位拼出布局，座位号恰好是 起点 + 格子序号 时记录起点
+# 没有任何座位的放映厅按 行 × 列 生成普通座；查询数与放映厅数量无关
+def backfill_hall_layouts(batch_size=BATCH_SIZE):
+    halls = {
+        hall_id: (rows, cols)
+        for hall_id, rows, cols in db.session.execute(select(Hall.hall_id, Hall.rows, Hall.cols).where(Hall.layout.is_(None)))
+    }
+    if not halls:
+        return 0
+
+    seats = db.session.execute(
+        select(Seat.hall_id, Seat.seat_id, Seat.seat_row, Seat.seat_col, Seat.type)
+        .join(Hall, Hall.hall_id == Seat.hall_id)
+        .where(Hall.layout.is_(None))
+        .order_by(Seat.hall_id)
+    ).all()
+    updates = []
+    for hall_id, hall_seats in groupby(seats, key=lambda seat: seat[0]):
+        rows, cols = halls.pop(hall_id)
+        cells = [AISLE] * (rows * cols)
+        bases = set()
+        for _, seat_id, seat_row, seat_col, seat_type in hall_seats:
+            row, col = row_number(seat_row), seat_col - 1
+            if 0 <= row < rows and 0 <= col < cols:
+                index = row * cols + col
+                cells[index] = TYPE_CODES.get(seat_type, 'r')
+                bases.add(seat_id - index)
+            else:
+                bases.add(None)
+        grid = [''.join(cells[row * cols:(row + 1) * cols]) for row in range(rows)]
+        updates.append({
+            'target_id': hall_id,
+            'layout': encode(grid),
+            'seat_id_base': bases.pop() if len(bases) == 1 else None
+        })
+
+    if updates:
+        db.session.execute(
+            update(Hall.__table__).where(Hall.__table__.c.hall_id == bindparam('target_id')),
+            updates
+        )
+
+    # 剩下的放映厅没有座位，按默认布局补齐座位
+    seat_id_base = _next_id(Seat.seat_id)
+    empty = []
+    for hall_id, (rows, cols) in halls.items():
+        grid = default_grid(rows, cols)
+        empty.append({'target_id': hall_id, 'layout': encode(grid), 'seat_id_base': seat_id_base, 'grid': grid})
+        seat_id_base += rows * cols
+    if empty:
+        db.session.execute(
+            update(Hall.__table__).where(Hall.__table__.c.hall_id == bindparam('target_id')),
+            [{key: hall[key] for key in ('target_id', 'layout', 'seat_id_base')} for hall in empty]
+        )
+        _insert_batches(Seat.__table__, (
+            seat for hall in empty for seat in _seat_rows(hall['target_id'], hall['grid'], hall['seat_id_base'])
+        ), batch_size)
+
+    db.session.commit()
+    invalidate()
+    return len(updates) + len(empty)
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event, select
+
+from models import db, User
+
+# 默认缓存参数，可通过 app.config 覆盖
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_CACHE_SECONDS = 60
+
+# 登录用户的只读身份：页面与视图需要的资料字段，不含密码；字段名与 User 模型一致
+PRINCIPAL_FIELDS = ('user_id', 'username', 'email', 'phone', 'real_name', 'avatar', 'created_at')
+
+
+class Principal(namedtuple('Principal', PRINCIPAL_FIELDS), UserMixin):
+    __slots__ = ()
+
+    def get_id(self):
+        return str(self.user_id)
+
+
+# 按 user_id 缓存登录用户的身份，LRU 与 TTL 限制大小和跨进程的陈旧时间；用户资料提交后失效
+class IdentityCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, user_id):
+        row = db.session.execute(
+            select(*(getattr(User, field) for field in PRINCIPAL_FIELDS)).where(User.user_id == user_id)
+        ).first()
+        return Principal(*row) if row else None
+
+    def get(self, user_id):
+        max_age = current_app.config.get('USER_CACHE_SECONDS', DEFAULT_CACHE_SECONDS)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] < max_age:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        principal = self._load(user_id)
+        if principal is None:
+            return None
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), principal)
+            self._entries.move_to_end(user_id)
+            limit = current_app.config.get('USER_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+            while len(self._entries) > limit:
+                self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, user_ids=None):
+        with self._lock:
+            if user_ids is None:
+                self._entries.clear()
+            else:
+                for user_id in user_ids:
+                    self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+identities = IdentityCache()
+
+
+# 登录用户加载：默认返回缓存的 Principal，已登录页面不再每次查询 users 表；
+# 关闭 USER_CACHE_ENABLED 时每次按主键读取完整的 User 对象
+def load_principal(user_id):
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    if not current_app.config.get('USER_CACHE_ENABLED', True):
+        return db.session.get(User, user_id)
+    return identities.get(user_id)
+
+
+# 需要修改资料时按当前登录用户读取 User 对象（current_user 可能是只读的 Principal）
+def current_user_record(principal):
+    if isinstance(principal, User):
+        return principal
+    return db.session.get(User, principal.user_id)
+
+
+# 注册、修改资料等写入在提交后使对应用户的身份缓存失效
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_written(mapper, connection, user):
+    db.session.info.setdefault('identity_users', set()).add(user.user_id)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_on_commit(session):
+    user_ids = session.info.pop('identity_users', None)
+    if user_ids:
+        identities.invalidate(user_ids)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('identity_users', None)
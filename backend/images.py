@@ -0,0 +1,285 @@
+import hashlib
+import io
+import os
+import re
+import threading
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, send_from_directory, url_for
+from sqlalchemy import event
+
+from assets import IMMUTABLE_MAX_AGE, immutable
+from models import db, Movie
+from process_pool import BoundedProcessPool
+
+# Pillow 为可选依赖：未安装时头像按原图保存，海报直接使用原地址
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# 默认参数，可通过 app.config 覆盖
+DEFAULT_FORMAT = 'webp'
+DEFAULT_QUALITY = 80
+DEFAULT_WORKERS = 1
+DEFAULT_QUEUE = 8
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MAX_PIXELS = 40_000_000
+
+# 各类图片生成的尺寸（宽, 高, 是否裁切）：裁切的尺寸按比例居中裁成该宽高，不裁切的尺寸保持原图比例缩放到该范围内；
+# 原图较小时不放大。hero 用作页面横幅背景（由 CSS 按容器裁切），竖版海报也保留完整画面
+VARIANTS = {
+    'avatar': {'thumb': (64, 64, True), 'card': (256, 256, True)},
+    'poster': {'thumb': (120, 180, True), 'card': (300, 450, True), 'hero': (1280, 1280, False)},
+}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+# 未安装 Pillow 时允许保存的头像原图格式
+ORIGINAL_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+# 海报没有地址时各尺寸使用的占位图
+PLACEHOLDERS = {
+    'thumb': 'https://placehold.co/200x300?text=Movie+Poster',
+    'card': 'https://placehold.co/300x450?text=Movie+Poster',
+    'hero': 'https://placehold.co/800x400?text=Movie+Poster',
+}
+MIRROR_THREADS = 8
+DOWNLOAD_TIMEOUT = 15
+DOWNLOAD_MAX_BYTES = 10 * 1024 * 1024
+
+# 处理过的图片记为 内容哈希.扩展名，各尺寸文件为 内容哈希-尺寸.扩展名
+_NAME = re.compile(r'^[0-9a-f]{16}\.(webp|jpg)$')
+
+
+# 图片无法解码、过大或格式不支持
+class ImageError(Exception):
+    pass
+
+
+# 图片处理进程池已满或等待超时，视图应提示稍后重试
+class ImagePipelineBusy(Exception):
+    pass
+
+
+def variant_filename(name, variant):
+    stem, ext = name.rsplit('.', 1)
+    return f'{stem}-{variant}.{ext}'
+
+
+# 文件名由原图内容与输出参数共同决定：同一张图重复上传只处理一次，调整尺寸或质量后生成新文件名，不会命中旧缓存
+def image_name(data, kind, fmt, quality):
+    digest = hashlib.sha256(data)
+    digest.update(repr((sorted(VARIANTS[kind].items()), fmt, quality)).encode())
+    return f'{digest.hexdigest()[:16]}.{EXTENSIONS[fmt]}'
+
+
+# 在工作进程中执行：解码一次原图，依次生成各尺寸文件（先写临时文件再改名，并发生成同一张图也不会读到半个文件）
+# 返回 {尺寸: 文件字节数}；已存在的文件直接跳过
+def render_variants(data, name, sizes, fmt, quality, directory, max_pixels):
+    try:
+        source = Image.open(io.BytesIO(data))
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ValueError(f'无法识别的图片：{e}')
+    with source:
+        # 打开时只读取文件头；像素数超过上限时不解码。不修改进程全局的 Image.MAX_IMAGE_PIXELS，
+        # 在请求线程内处理时也不影响 Web 进程中的其他代码
+        if source.width * source.height > max_pixels:
+            raise ValueError(f'图片过大：{source.width}x{source.height}')
+        try:
+            # JPEG 按最大输出尺寸降采样解码，大图的解码时间与内存明显减少
+            largest = max(sizes.values(), key=lambda size: size[0] * size[1])
+            source.draft('RGB', largest[:2])
+            image = ImageOps.exif_transpose(source)
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            else:
+                image = image.convert('RGB')
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            raise ValueError(f'无法识别的图片：{e}')
+
+    written = {}
+    for variant, (width, height, crop) in sizes.items():
+        path = os.path.join(directory, variant_filename(name, variant))
+        if not os.path.exists(path):
+            if crop:
+                scale = min(1.0, image.width / width, image.height / height)
+                size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                resized = ImageOps.fit(image, size, Image.LANCZOS)
+            else:
+                scale = min(1.0, width / image.width, height / image.height)
+                size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+                resized = image.resize(size, Image.LANCZOS)
+            temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            if fmt == 'webp':
+                resized.save(temporary, PIL_FORMATS[fmt], quality=quality, method=4)
+            else:
+                resized.save(temporary, PIL_FORMATS[fmt], quality=quality, optimize=True, progressive=True)
+            os.replace(temporary, path)
+        written[variant] = os.path.getsize(path)
+    return written
+
+
+# 图片处理进程池：解码与缩放是 CPU 密集型任务，与密码哈希共用有界进程池的实现（见 process_pool.py），
+# 上传请求只等待结果，其他路由不被阻塞；排队超过 进程数 + 队列上限 时拒绝，进程数为 0 时在当前线程处理
+class ImagePipeline:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = BoundedProcessPool(ImagePipelineBusy, '图片处理')
+        self.processed = 0
+
+    def _run(self, *args):
+        config = current_app.config
+        return self._pool.run(
+            config.get('IMAGE_WORKERS', DEFAULT_WORKERS),
+            config.get('IMAGE_QUEUE', DEFAULT_QUEUE),
+            config.get('IMAGE_TIMEOUT', DEFAULT_TIMEOUT),
+            render_variants, *args
+        )
+
+    # 生成一张图片的各尺寸文件，返回记录用的文件名（内容哈希.扩展名）
+    def process(self, data, kind, inline=False):
+        if Image is None:
+            raise ImageError('未安装 Pillow，无法处理图片')
+        config = current_app.config
+        fmt = image_format()
+        quality = config.get('IMAGE_QUALITY', DEFAULT_QUALITY)
+        name = image_name(data, kind, fmt, quality)
+        directory = image_dir()
+        sizes = VARIANTS[kind]
+        if all(os.path.exists(os.path.join(directory, variant_filename(name, variant))) for variant in sizes):
+            return name
+
+        os.makedirs(directory, exist_ok=True)
+        args = (data, name, sizes, fmt, quality, directory, config.get('IMAGE_MAX_PIXELS', DEFAULT_MAX_PIXELS))
+        try:
+            render_variants(*args) if inline else self._run(*args)
+        except ValueError as e:
+            raise ImageError(str(e))
+        with self._lock:
+            self.processed += 1
+        return name
+
+    def stats(self):
+        stats = self._pool.stats()
+        with self._lock:
+            stats['processed'] = self.processed
+        return stats
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+
+pipeline = ImagePipeline()
+
+
+def image_dir():
+    return current_app.config.get('IMAGE_DIR') or os.path.join(current_app.root_path, 'media')
+
+
+# 配置的输出格式；Pillow 未编译 WebP 支持时改用 JPEG
+def image_format():
+    fmt = current_app.config.get('IMAGE_FORMAT', DEFAULT_FORMAT)
+    if fmt == 'webp' and Image is not None:
+        from PIL import features
+        if not features.check('webp'):
+            return 'jpeg'
+    return fmt
+
+
+# 保存上传的头像，返回写入 User.avatar 的值：已安装 Pillow 时为处理后的文件名，否则按内容哈希保存原图
+def save_avatar(data, filename):
+    if Image is not None:
+        return pipeline.process(data, 'avatar')
+
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if ext not in ORIGINAL_EXTENSIONS:
+        raise ImageError('请上传 PNG、JPG、GIF 或 WebP 格式的图片')
+    avatar = f'avatar_{hashlib.sha256(data).hexdigest()[:16]}.{ext}'
+    path = os.path.join(current_app.root_path, 'static', 'images', avatar)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+    return avatar
+
+
+# 模板中使用：头像的指定尺寸；旧头像与默认头像仍从 static/images 读取
+def avatar_url(avatar, variant='card'):
+    if avatar and _NAME.match(avatar):
+        return url_for('main.media', filename=variant_filename(avatar, variant))
+    return url_for('static', filename='images/' + (avatar or 'default_avatar.png'))
+
+
+# 模板中使用：海报的指定尺寸；尚未镜像到本地时使用原地址
+def poster_url(movie, variant='card'):
+    if movie.poster_image and _NAME.match(movie.poster_image):
+        return url_for('main.media', filename=variant_filename(movie.poster_image, variant))
+    return movie.poster or PLACEHOLDERS[variant]
+
+
+# 返回处理后的图片文件，按内容哈希命名，长期缓存
+def send_media(filename):
+    return immutable(send_from_directory(image_dir(), filename, max_age=IMMUTABLE_MAX_AGE))
+
+
+def init_app(app):
+    app.jinja_env.globals.update(avatar_url=avatar_url, poster_url=poster_url)
+
+
+def _read_poster(poster, static_folder):
+    if poster.startswith('/static/'):
+        path = os.path.realpath(os.path.join(static_folder, poster[len('/static/'):].split('?', 1)[0]))
+        if not path.startswith(os.path.realpath(static_folder) + os.sep):
+            raise ImageError('海报路径不在 static 目录下')
+        with open(path, 'rb') as f:
+            return f.read()
+    if not poster.startswith(('http://', 'https://')):
+        raise ImageError('不支持的海报地址')
+    # 地址中的中文等字符按 UTF-8 转义，已转义的部分保持不变
+    url = urllib.parse.quote(poster, safe=":/?&=%#+,;@~!$'()*[]")
+    request = urllib.request.Request(url, headers={'User-Agent': 'Lumina-Cinema poster mirror'})
+    with urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT) as response:
+        data = response.read(DOWNLOAD_MAX_BYTES + 1)
+    if len(data) > DOWNLOAD_MAX_BYTES:
+        raise ImageError('海报文件过大')
+    return data
+
+
+# 把海报（远程地址或 /static 下的文件）下载一次并生成各尺寸文件，记录到 Movie.poster_image；
+# 下载与处理在线程池中并行（缩放与编码时 Pillow 会释放 GIL）。默认跳过已镜像的电影，返回 (成功数, [(电影, 原因), ...])
+def mirror_posters(limit=None, force=False, threads=MIRROR_THREADS):
+    if Image is None:
+        raise ImageError('未安装 Pillow，无法处理图片')
+    query = Movie.query.filter(Movie.poster.isnot(None), Movie.poster != '').order_by(Movie.movie_id)
+    if not force:
+        query = query.filter(Movie.poster_image.is_(None))
+    movies = query.limit(limit).all() if limit else query.all()
+
+    app = current_app._get_current_object()
+
+    def mirror(movie_id, poster):
+        with app.app_context():
+            return pipeline.process(_read_poster(poster, app.static_folder), 'poster', inline=True)
+
+    mirrored = 0
+    failures = []
+    with ThreadPoolExecutor(threads) as executor:
+        futures = {executor.submit(mirror, movie.movie_id, movie.poster): movie for movie in movies}
+        for future, movie in futures.items():
+            try:
+                movie.poster_image = future.result()
+                mirrored += 1
+            except (ImageError, OSError, ValueError) as e:
+                failures.append((movie, str(e)))
+    db.session.commit()
+    return mirrored, failures
+
+
+# 海报地址变化后本地文件不再对应，清空记录，页面改用新地址直到重新镜像
+@event.listens_for(Movie.poster, 'set')
+def _poster_changed(movie, value, oldvalue, initiator):
+    if value != oldvalue:
+        movie.poster_image = None
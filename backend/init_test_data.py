@@ -1,210 +1,493 @@
-from app import app
-from models import db, User, Movie, Cinema, Hall, Screening, Seat
+# 初始化测试数据
+# 用法（在 backend 目录下）：
+#   python init_test_data.py                       # 10 部电影、3 家影院的示例数据
+#   python init_test_data.py --generate --reset    # 按参数生成大规模压测数据，电影来自 backend/movies.json
+import argparse
+import json
+import os
+import random
+import time
 from datetime import datetime, timedelta
 
-with app.app_context():
-    # 创建数据库表
-    db.create_all()
-    
-    # 添加测试电影
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from models import db, User, Movie, Cinema, Hall, Screening, Order, OrderSeat, Review, ScreeningSeat
+from ratings import rebuild_rating_aggregates
+from search import get_search_index
+from catalog import invalidate_facets
+from hall_layout import default_grid, provision_halls
+from scheduling import import_schedule
+
+# OMDb 格式的电影数据
+MOVIES_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'movies.json')
+
+# 每批写入的行数
+BATCH_SIZE = 5000
+
+# 当前上线的10部电影
+SAMPLE_MOVIES = [
+    {
+        'title': '流浪地球3',
+        'director': '郭帆',
+        'actors': '吴京, 刘德华, 李雪健, 沙溢',
+        'genre': '科幻',
+        'duration': 170,
+        'release_date': datetime.now().date(),
+        'description': '太阳危机爆发，人类开启流浪地球计划，联合政府决定启用“方舟计划”，带领人类寻找新家园。在这场横跨宇宙的旅程中，人类将面临前所未有的挑战。',
+        'poster': 'https://placehold.co/250x350/1E90FF/FFFFFF?text=流浪地球3'
+    },
+    {
+        'title': '疯狂动物城2',
+        'director': '拜伦·霍华德',
+        'actors': '金妮弗·古德温, 杰森·贝特曼, 伊德里斯·艾尔巴',
+        'genre': '动画',
+        'duration': 125,
+        'release_date': datetime.now().date(),
+        'description': '兔朱迪和狐尼克将继续在动物城展开新的冒险，他们将面对更大的阴谋和挑战，同时探索动物城不为人知的秘密。',
+        'poster': 'https://placehold.co/250x350/FF6B6B/FFFFFF?text=疯狂动物城2'
+    },
+    {
+        'title': '复仇者联盟6',
+        'director': '乔·罗素',
+        'actors': '小罗伯特·唐尼, 克里斯·埃文斯, 斯嘉丽·约翰逊',
+        'genre': '动作',
+        'duration': 180,
+        'release_date': datetime.now().date(),
+        'description': '复仇者联盟再次集结，面对来自多元宇宙的威胁。他们必须超越时空，拯救整个宇宙免受毁灭。',
+        'poster': 'https://placehold.co/250x350/4ECDC4/FFFFFF?text=复仇者联盟6'
+    },
+    {
+        'title': '哈利·波特与被诅咒的孩子',
+        'director': '大卫·叶茨',
+        'actors': '丹尼尔·雷德克里夫, 艾玛·沃特森, 鲁伯特·格林特',
+        'genre': '奇幻',
+        'duration': 160,
+        'release_date': datetime.now().date(),
+        'description': '哈利·波特与被诅咒的孩子讲述了哈利·波特与儿子阿不思·西弗勒斯·波特的故事，他们将面对新的黑魔法威胁。',
+        'poster': 'https://placehold.co/250x350/45B7D1/FFFFFF?text=哈利波特'
+    },
+    {
+        'title': '速度与激情12',
+        'director': '路易斯·莱特里尔',
+        'actors': '范·迪塞尔, 杰森·莫玛, 米歇尔·罗德里格兹',
+        'genre': '动作',
+        'duration': 140,
+        'release_date': datetime.now().date(),
+        'description': '多米尼克·托莱多和他的团队将再次面对新的挑战，这次他们将跨越全球，展开一场前所未有的速度与激情。',
+        'poster': 'https://placehold.co/250x350/FF9F43/FFFFFF?text=速度与激情12'
+    },
+    {
+        'title': '阿凡达3：带种者',
+        'director': '詹姆斯·卡梅隆',
+        'actors': '萨姆·沃辛顿, 佐伊·索尔达娜, 西格妮·韦弗',
+        'genre': '科幻',
+        'duration': 190,
+        'release_date': datetime.now().date(),
+        'description': '杰克·萨利和奈蒂莉的孩子将在潘多拉星球上成长，他们将面对来自人类的新威胁，同时探索潘多拉星球不为人知的秘密。',
+        'poster': 'https://placehold.co/250x350/26DE81/FFFFFF?text=阿凡达3'
+    },
+    {
+        'title': '碟中谍8',
+        'director': '克里斯托夫·迈考利',
+        'actors': '汤姆·克鲁斯, 海莉·阿特维尔, 文·瑞姆斯',
+        'genre': '动作',
+        'duration': 150,
+        'release_date': datetime.now().date(),
+        'description': '伊森·亨特和IMF团队将再次展开全球性的冒险，他们必须阻止一个威胁世界安全的巨大阴谋。',
+        'poster': 'https://placehold.co/250x350/FF3838/FFFFFF?text=碟中谍8'
+    },
+    {
+        'title': '蜘蛛侠：超越宇宙',
+        'director': '乔伊姆·多斯·桑托斯',
+        'actors': '沙梅克·摩尔, 海莉·斯坦菲尔德, 奥斯卡·伊萨克',
+        'genre': '动画',
+        'duration': 130,
+        'release_date': datetime.now().date(),
+        'description': '迈尔斯·莫拉莱斯将再次穿越多元宇宙，与不同版本的蜘蛛侠一起面对新的威胁，同时探索自己的身份认同。',
+        'poster': 'https://placehold.co/250x350/7158E2/FFFFFF?text=蜘蛛侠：超越宇宙'
+    },
+    {
+        'title': '霸王别姬',
+        'director': '陈凯歌',
+        'actors': '张国荣, 巩俐, 张丰毅',
+        'genre': '剧情',
+        'duration': 171,
+        'release_date': datetime.now().date(),
+        'description': '电影讲述了程蝶衣和段小楼两位京剧演员半个世纪的命运纠葛，展现了中国传统文化的魅力和人性的复杂。',
+        'poster': 'https://placehold.co/250x350/3742FA/FFFFFF?text=霸王别姬'
+    },
+    {
+        'title': '星际穿越2',
+        'director': '克里斯托弗·诺兰',
+        'actors': '马修·麦康纳, 安妮·海瑟薇, 杰西卡·查斯坦',
+        'genre': '科幻',
+        'duration': 185,
+        'release_date': datetime.now().date(),
+        'description': '人类继续探索宇宙的奥秘，面对新的时空挑战和未知的外星文明，寻找人类的未来。',
+        'poster': 'https://placehold.co/250x350/10AC84/FFFFFF?text=星际穿越2'
+    }
+]
+
+# 示例影院
+SAMPLE_CINEMAS = [
+    {
+        'name': '万达影城',
+        'address': '北京市朝阳区建国路93号万达购物中心',
+        'phone': '010-12345678'
+    },
+    {
+        'name': '大地影院',
+        'address': '北京市海淀区中关村大街1号海龙大厦',
+        'phone': '010-87654321'
+    },
+    {
+        'name': '星美影城',
+        'address': '北京市东城区王府井大街138号',
+        'phone': '010-135792468'
+    }
+]
+
+# 生成数据时使用的城市、票价与影评内容
+CITIES = ['北京', '上海', '广州', '深圳', '成都', '杭州', '武汉', '西安', '南京', '重庆', '天津', '苏州']
+PRICES = [35, 45, 50, 60, 70, 80]
+REVIEW_TEXTS = [
+    '画面震撼，值得去影院看。',
+    '剧情有些拖沓，但演员表现不错。',
+    '配乐很棒，情节紧凑。',
+    '一般般，没有达到预期。',
+    '二刷了，细节满满。',
+    '特效一流，故事稍弱。'
+]
+
+
+# 分批执行 Core insert executemany，rows 可以是生成器
+def bulk_insert(model, rows, batch_size=BATCH_SIZE):
+    table = model.__table__
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(insert(table), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(table), batch)
+        count += len(batch)
+    return count
+
+
+# 按依赖顺序分表缓冲待写入的行，任一张表攒够一批后按顺序全部写入
+class BulkWriter:
+    def __init__(self, models, batch_size=BATCH_SIZE):
+        self.models = models
+        self.batch_size = batch_size
+        self.rows = {model: [] for model in models}
+        self.counts = {model.__tablename__: 0 for model in models}
+
+    def add(self, model, row):
+        self.rows[model].append(row)
+        if len(self.rows[model]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for model in self.models:
+            rows = self.rows[model]
+            if rows:
+                db.session.execute(insert(model.__table__), rows)
+                self.counts[model.__tablename__] += len(rows)
+                self.rows[model] = []
+
+
+def _next_id(column):
+    return (db.session.query(db.func.max(column)).scalar() or 0) + 1
+
+
+# 示例数据：10 部电影、3 家影院、9 个放映厅，未来 3 天的场次
+def seed_sample():
     if not Movie.query.first():
-        # 当前上线的10部电影
-        movies_data = [
-            {
-                'title': '流浪地球3',
-                'director': '郭帆',
-                'actors': '吴京, 刘德华, 李雪健, 沙溢',
-                'genre': '科幻',
-                'duration': 170,
-                'release_date': datetime.now().date(),
-                'description': '太阳危机爆发，人类开启流浪地球计划，联合政府决定启用“方舟计划”，带领人类寻找新家园。在这场横跨宇宙的旅程中，人类将面临前所未有的挑战。',
-                'poster': 'https://placehold.co/250x350/1E90FF/FFFFFF?text=流浪地球3'
-            },
-            {
-                'title': '疯狂动物城2',
-                'director': '拜伦·霍华德',
-                'actors': '金妮弗·古德温, 杰森·贝特曼, 伊德里斯·艾尔巴',
-                'genre': '动画',
-                'duration': 125,
-                'release_date': datetime.now().date(),
-                'description': '兔朱迪和狐尼克将继续在动物城展开新的冒险，他们将面对更大的阴谋和挑战，同时探索动物城不为人知的秘密。',
-                'poster': 'https://placehold.co/250x350/FF6B6B/FFFFFF?text=疯狂动物城2'
-            },
-            {
-                'title': '复仇者联盟6',
-                'director': '乔·罗素',
-                'actors': '小罗伯特·唐尼, 克里斯·埃文斯, 斯嘉丽·约翰逊',
-                'genre': '动作',
-                'duration': 180,
-                'release_date': datetime.now().date(),
-                'description': '复仇者联盟再次集结，面对来自多元宇宙的威胁。他们必须超越时空，拯救整个宇宙免受毁灭。',
-                'poster': 'https://placehold.co/250x350/4ECDC4/FFFFFF?text=复仇者联盟6'
-            },
-            {
-                'title': '哈利·波特与被诅咒的孩子',
-                'director': '大卫·叶茨',
-                'actors': '丹尼尔·雷德克里夫, 艾玛·沃特森, 鲁伯特·格林特',
-                'genre': '奇幻',
-                'duration': 160,
-                'release_date': datetime.now().date(),
-                'description': '哈利·波特与被诅咒的孩子讲述了哈利·波特与儿子阿不思·西弗勒斯·波特的故事，他们将面对新的黑魔法威胁。',
-                'poster': 'https://placehold.co/250x350/45B7D1/FFFFFF?text=哈利波特'
-            },
-            {
-                'title': '速度与激情12',
-                'director': '路易斯·莱特里尔',
-                'actors': '范·迪塞尔, 杰森·莫玛, 米歇尔·罗德里格兹',
-                'genre': '动作',
-                'duration': 140,
-                'release_date': datetime.now().date(),
-                'description': '多米尼克·托莱多和他的团队将再次面对新的挑战，这次他们将跨越全球，展开一场前所未有的速度与激情。',
-                'poster': 'https://placehold.co/250x350/FF9F43/FFFFFF?text=速度与激情12'
-            },
-            {
-                'title': '阿凡达3：带种者',
-                'director': '詹姆斯·卡梅隆',
-                'actors': '萨姆·沃辛顿, 佐伊·索尔达娜, 西格妮·韦弗',
-                'genre': '科幻',
-                'duration': 190,
-                'release_date': datetime.now().date(),
-                'description': '杰克·萨利和奈蒂莉的孩子将在潘多拉星球上成长，他们将面对来自人类的新威胁，同时探索潘多拉星球不为人知的秘密。',
-                'poster': 'https://placehold.co/250x350/26DE81/FFFFFF?text=阿凡达3'
-            },
-            {
-                'title': '碟中谍8',
-                'director': '克里斯托夫·迈考利',
-                'actors': '汤姆·克鲁斯, 海莉·阿特维尔, 文·瑞姆斯',
-                'genre': '动作',
-                'duration': 150,
-                'release_date': datetime.now().date(),
-                'description': '伊森·亨特和IMF团队将再次展开全球性的冒险，他们必须阻止一个威胁世界安全的巨大阴谋。',
-                'poster': 'https://placehold.co/250x350/FF3838/FFFFFF?text=碟中谍8'
-            },
-            {
-                'title': '蜘蛛侠：超越宇宙',
-                'director': '乔伊姆·多斯·桑托斯',
-                'actors': '沙梅克·摩尔, 海莉·斯坦菲尔德, 奥斯卡·伊萨克',
-                'genre': '动画',
-                'duration': 130,
-                'release_date': datetime.now().date(),
-                'description': '迈尔斯·莫拉莱斯将再次穿越多元宇宙，与不同版本的蜘蛛侠一起面对新的威胁，同时探索自己的身份认同。',
-                'poster': 'https://placehold.co/250x350/7158E2/FFFFFF?text=蜘蛛侠：超越宇宙'
-            },
-            {
-                'title': '霸王别姬',
-                'director': '陈凯歌',
-                'actors': '张国荣, 巩俐, 张丰毅',
-                'genre': '剧情',
-                'duration': 171,
-                'release_date': datetime.now().date(),
-                'description': '电影讲述了程蝶衣和段小楼两位京剧演员半个世纪的命运纠葛，展现了中国传统文化的魅力和人性的复杂。',
-                'poster': 'https://placehold.co/250x350/3742FA/FFFFFF?text=霸王别姬'
-            },
-            {
-                'title': '星际穿越2',
-                'director': '克里斯托弗·诺兰',
-                'actors': '马修·麦康纳, 安妮·海瑟薇, 杰西卡·查斯坦',
-                'genre': '科幻',
-                'duration': 185,
-                'release_date': datetime.now().date(),
-                'description': '人类继续探索宇宙的奥秘，面对新的时空挑战和未知的外星文明，寻找人类的未来。',
-                'poster': 'https://placehold.co/250x350/10AC84/FFFFFF?text=星际穿越2'
-            }
-        ]
-        
-        for movie_data in movies_data:
-            movie = Movie(**movie_data)
-            db.session.add(movie)
+        bulk_insert(Movie, SAMPLE_MOVIES)
         db.session.commit()
         print('添加10部测试电影成功！')
-    
-    # 添加测试影院
+
     if not Cinema.query.first():
-        cinemas = [
-            {
-                'name': '万达影城',
-                'address': '北京市朝阳区建国路93号万达购物中心',
-                'phone': '010-12345678'
-            },
-            {
-                'name': '大地影院',
-                'address': '北京市海淀区中关村大街1号海龙大厦',
-                'phone': '010-87654321'
-            },
-            {
-                'name': '星美影城',
-                'address': '北京市东城区王府井大街138号',
-                'phone': '010-135792468'
-            }
-        ]
-        
-        for cinema_data in cinemas:
-            cinema = Cinema(**cinema_data)
-            db.session.add(cinema)
+        bulk_insert(Cinema, SAMPLE_CINEMAS)
         db.session.commit()
         print('添加3家测试影院成功！')
-    
-    # 添加测试放映厅
+
+    # 为每家影院添加3个放映厅，按布局一次写入放映厅与座位
     if not Hall.query.first():
-        # 为每家影院添加3个放映厅
-        for cinema_id in range(1, 4):
-            for hall_num in range(1, 4):
-                hall = Hall(
-                    cinema_id=cinema_id,
-                    name=f'{hall_num}号厅',
-                    total_seats=100,
-                    rows=10,
-                    cols=10
-                )
-                db.session.add(hall)
+        cinema_ids = [cinema_id for (cinema_id,) in db.session.query(Cinema.cinema_id).order_by(Cinema.cinema_id)]
+        provision_halls(
+            {'cinema_id': cinema_id, 'name': f'{hall_num}号厅', 'layout': default_grid(10, 10)}
+            for cinema_id in cinema_ids for hall_num in range(1, 4)
+        )
         db.session.commit()
-        print('添加9个测试放映厅成功！')
-    
-    # 添加测试座位
-    if not Seat.query.first():
-        # 为每个放映厅添加座位
-        for hall_id in range(1, 10):
-            for row in range(10):
-                for col in range(10):
-                    seat = Seat(
-                        hall_id=hall_id,
-                        seat_row=chr(65+row),  # A, B, C...
-                        seat_col=col+1,        # 1, 2, 3...
-                        type='regular'
-                    )
-                    db.session.add(seat)
-        db.session.commit()
-        print('添加所有测试座位成功！')
-    
-    # 添加测试场次
+        print(f'添加{len(cinema_ids) * 3}个测试放映厅及座位成功！')
+
+    halls = db.session.query(Hall.hall_id, Hall.total_seats).order_by(Hall.hall_id).all()
+
+    # 每个放映厅未来3天每天从10点起连续排5场，电影轮流上映，场次之间留20分钟，不同时间段不同价格
     if not Screening.query.first():
-        # 获取所有电影和放映厅
-        movies = Movie.query.all()
-        halls = Hall.query.all()
-        
-        # 为每个电影添加多个场次
-        for movie in movies:
-            # 为每个放映厅添加场次
-            for hall in halls:
-                # 未来3天内的场次
-                for day in range(3):
-                    # 每天添加5个场次
-                    for hour in range(10, 22, 2):
-                        start_time = datetime.now().replace(hour=hour, minute=0, second=0, microsecond=0) + timedelta(days=day)
-                        end_time = start_time + timedelta(minutes=movie.duration)
-                        
-                        screening = Screening(
-                            movie_id=movie.movie_id,
-                            hall_id=hall.hall_id,
-                            start_time=start_time,
-                            end_time=end_time,
-                            price=50 + (hour % 4) * 10,  # 不同时间段不同价格
-                            remaining_seats=hall.total_seats,
-                            status='upcoming'
-                        )
-                        db.session.add(screening)
-        
-        db.session.commit()
-        print('添加所有测试场次成功！')
-    
-    print('所有测试数据添加完成！')
\ No newline at end of file
+        movies = db.session.query(Movie.movie_id, Movie.duration).order_by(Movie.movie_id).all()
+        today = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0)
+        schedule = []
+        for hall_index, (hall_id, _) in enumerate(halls):
+            for day in range(3):
+                start_time = today + timedelta(days=day)
+                for show in range(5):
+                    movie_id, duration = movies[(hall_index + day + show) % len(movies)]
+                    end_time = start_time + timedelta(minutes=duration)
+                    schedule.append({
+                        'movie_id': movie_id,
+                        'hall_id': hall_id,
+                        'start_time': start_time,
+                        'end_time': end_time,
+                        'price': 50 + (start_time.hour % 4) * 10
+                    })
+                    start_time = _round_up(end_time + timedelta(minutes=20))
+        import_schedule(schedule)
+        print(f'添加{len(schedule)}个测试场次成功！')
+
+
+def _text(value, length=None):
+    if value in (None, '', 'N/A'):
+        return None
+    return value[:length] if length else value
+
+
+def _runtime(value):
+    try:
+        return int(value.split()[0])
+    except (AttributeError, IndexError, ValueError):
+        return 120
+
+
+def _released(entry):
+    try:
+        return datetime.strptime(entry.get('Released', ''), '%d %b %Y').date()
+    except ValueError:
+        year = (entry.get('Year') or '')[:4]
+        return datetime(int(year), 1, 1).date() if year.isdigit() else None
+
+
+# IMDb 评分为 10 分制，换算为站内的 5 分制
+def _rating(value):
+    try:
+        return round(float(value) / 2, 1)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# 读取 OMDb 格式的电影；需要的数量超过文件中的电影数时循环使用并在片名后加序号
+def movie_rows(count, path=MOVIES_JSON):
+    with open(path, encoding='utf-8') as f:
+        entries = [entry for entry in json.load(f)['movies'] if entry.get('Title')]
+
+    for i in range(count):
+        entry = entries[i % len(entries)]
+        copy = i // len(entries)
+        title = entry['Title'] if copy == 0 else f"{entry['Title']} {copy + 1}"
+        yield {
+            'title': title[:100],
+            'director': _text(entry.get('Director'), 50),
+            'actors': _text(entry.get('Actors')),
+            'genre': _text((entry.get('Genre') or '').split(',')[0].strip(), 50),
+            'duration': _runtime(entry.get('Runtime')),
+            'release_date': _released(entry),
+            'description': _text(entry.get('Plot')),
+            'poster': _text(entry.get('Poster'), 255),
+            'rating': _rating(entry.get('imdbRating'))
+        }
+
+
+def _round_up(value, minutes=5):
+    value = value.replace(second=0, microsecond=0)
+    return value + timedelta(minutes=-value.minute % minutes)
+
+
+# 按参数生成可复现的大规模数据：电影、用户、影院、放映厅、座位、场次、订单与影评
+# 每个放映厅每天从 10 点起连续排片，场次之间留 20 分钟；每个场次按 occupancy 左右的上座率随机售出座位
+def generate_dataset(movies=1000, cinemas=100, halls_per_cinema=6, rows=10, cols=12, days=3,
+                     shows_per_day=5, users=10000, occupancy=0.3, reviews=20000, seed=42,
+                     movies_path=MOVIES_JSON, batch_size=BATCH_SIZE):
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    capacity = rows * cols
+    counts = {}
+
+    first_movie_id = _next_id(Movie.movie_id)
+    counts['movies'] = bulk_insert(Movie, movie_rows(movies, movies_path), batch_size)
+    durations = dict(db.session.query(Movie.movie_id, Movie.duration).filter(Movie.movie_id >= first_movie_id))
+    movie_ids = sorted(durations)
+
+    # 所有生成的用户使用同一个密码，只计算一次哈希
+    password = generate_password_hash('password123')
+    first_user_id = _next_id(User.user_id)
+    user_ids = range(first_user_id, first_user_id + users)
+    counts['users'] = bulk_insert(User, (
+        {'user_id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com', 'password': password}
+        for user_id in user_ids
+    ), batch_size)
+
+    first_cinema_id = _next_id(Cinema.cinema_id)
+    counts['cinemas'] = bulk_insert(Cinema, (
+        {
+            'cinema_id': first_cinema_id + i,
+            'name': f'Lumina 影城 {first_cinema_id + i}号店',
+            'address': f'{rng.choice(CITIES)}市中心路{rng.randint(1, 999)}号',
+            'phone': f'400-{rng.randint(1000000, 9999999)}'
+        }
+        for i in range(cinemas)
+    ), batch_size)
+
+    grid = default_grid(rows, cols)
+    halls = provision_halls((
+        {
+            'cinema_id': first_cinema_id + i // halls_per_cinema,
+            'name': f'{i % halls_per_cinema + 1}号厅',
+            'layout': grid
+        }
+        for i in range(cinemas * halls_per_cinema)
+    ), batch_size)
+    counts['halls'] = len(halls)
+    counts['seats'] = len(halls) * capacity
+
+    writer = BulkWriter([Screening, Order, OrderSeat, ScreeningSeat], batch_size)
+    screening_id = _next_id(Screening.screening_id)
+    order_id = _next_id(Order.order_id)
+    today = now.replace(hour=0, minute=0, second=0)
+
+    for hall_id, seat_id_base in halls:
+        hall_seat_ids = list(range(seat_id_base, seat_id_base + capacity))
+        for day in range(days):
+            start_time = today + timedelta(days=day, hours=10)
+            for _ in range(shows_per_day):
+                movie_id = rng.choice(movie_ids)
+                end_time = start_time + timedelta(minutes=durations[movie_id] or 120)
+                price = rng.choice(PRICES)
+
+                # 随机挑出本场售出的座位，按 1-4 张一单拆成订单，约一成订单已取消
+                target = min(capacity, int(capacity * occupancy * rng.uniform(0.5, 1.5)))
+                chosen = rng.sample(hall_seat_ids, target)
+                orders = []
+                position = 0
+                while position < len(chosen):
+                    group = chosen[position:position + rng.randint(1, 4)]
+                    position += len(group)
+                    orders.append((group, rng.random() >= 0.1))
+                sold = sum(len(group) for group, paid in orders if paid)
+
+                writer.add(Screening, {
+                    'screening_id': screening_id,
+                    'movie_id': movie_id,
+                    'hall_id': hall_id,
+                    'start_time': start_time,
+                    'end_time': end_time,
+                    'price': price,
+                    'remaining_seats': capacity - sold,
+                    'status': 'upcoming'
+                })
+                for group, paid in orders:
+                    writer.add(Order, {
+                        'order_id': order_id,
+                        'user_id': rng.choice(user_ids),
+                        'screening_id': screening_id,
+                        'total_price': price * len(group),
+                        'order_time': now - timedelta(minutes=rng.randint(1, 7 * 24 * 60)),
+                        'status': 'paid' if paid else 'cancelled',
+                        'payment_method': 'online' if paid else None,
+                        'transaction_id': f'TX{order_id}' if paid else None
+                    })
+                    for seat_id in group:
+                        writer.add(OrderSeat, {'order_id': order_id, 'seat_id': seat_id})
+                        if paid:
+                            writer.add(ScreeningSeat, {
+                                'screening_id': screening_id,
+                                'seat_id': seat_id,
+                                'order_id': order_id,
+                                'status': 'sold',
+                                'expires_at': None
+                            })
+                    order_id += 1
+                screening_id += 1
+                start_time = _round_up(end_time + timedelta(minutes=20))
+
+    writer.flush()
+    counts.update((table, count) for table, count in writer.counts.items())
+
+    # 每位用户对每部电影最多一条影评：从 (用户, 电影) 组合中不重复抽样，影评数不超过组合数
+    pairs = rng.sample(range(len(user_ids) * len(movie_ids)), min(reviews, len(user_ids) * len(movie_ids)))
+    counts['reviews'] = bulk_insert(Review, (
+        {
+            'user_id': user_ids[pair // len(movie_ids)],
+            'movie_id': movie_ids[pair % len(movie_ids)],
+            'rating': rng.choices(range(1, 6), weights=(1, 2, 4, 6, 4))[0],
+            'content': rng.choice(REVIEW_TEXTS),
+            'created_at': now - timedelta(minutes=rng.randint(0, 180 * 24 * 60)),
+            'likes': 0
+        }
+        for pair in pairs
+    ), batch_size)
+
+    db.session.commit()
+    return counts
+
+
+# 批量写入绕过了 ORM 事件，写入后重算评分聚合与检索索引，并使筛选项缓存失效
+def rebuild_derived_data():
+    rebuild_rating_aggregates()
+    get_search_index().rebuild()
+    invalidate_facets()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='初始化测试数据')
+    parser.add_argument('--generate', action='store_true', help='按参数生成大规模压测数据')
+    parser.add_argument('--reset', action='store_true', help='写入前清空所有表')
+    parser.add_argument('--movies', type=int, default=1000)
+    parser.add_argument('--cinemas', type=int, default=100)
+    parser.add_argument('--halls-per-cinema', type=int, default=6)
+    parser.add_argument('--rows', type=int, default=10)
+    parser.add_argument('--cols', type=int, default=12)
+    parser.add_argument('--days', type=int, default=3)
+    parser.add_argument('--shows-per-day', type=int, default=5)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--occupancy', type=float, default=0.3, help='平均上座率')
+    parser.add_argument('--reviews', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42, help='随机种子，相同参数生成相同数据')
+    parser.add_argument('--movies-json', default=MOVIES_JSON)
+    args = parser.parse_args()
+
+    from app import create_app
+    from commands import prepare_database
+
+    with create_app().app_context():
+        if args.reset:
+            db.drop_all()
+        prepare_database()
+
+        started = time.perf_counter()
+        if args.generate:
+            counts = generate_dataset(
+                movies=args.movies,
+                cinemas=args.cinemas,
+                halls_per_cinema=args.halls_per_cinema,
+                rows=args.rows,
+                cols=args.cols,
+                days=args.days,
+                shows_per_day=args.shows_per_day,
+                users=args.users,
+                occupancy=args.occupancy,
+                reviews=args.reviews,
+                seed=args.seed,
+                movies_path=args.movies_json
+            )
+            for table, count in counts.items():
+                print(f'{table}: {count} 行')
+        else:
+            seed_sample()
+        rebuild_derived_data()
+
+        print(f'所有测试数据添加完成！耗时 {time.perf_counter() - started:.1f} 秒')
@@ -0,0 +1,156 @@
+import atexit
+import logging
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import bindparam, delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Review, ReviewLike
+
+logger = logging.getLogger(__name__)
+
+# 点赞计数默认合并写入间隔（秒）与触发立即写入的待写条数，可通过 app.config 覆盖
+DEFAULT_FLUSH_SECONDS = 2.0
+DEFAULT_FLUSH_THRESHOLD = 500
+
+
+# 点赞计数写合并缓冲：内存中累计每条影评的增量，定期用一条批量 UPDATE 写回 Review.likes
+class LikeCounterBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._deltas = {}
+        self._last_flush = time.monotonic()
+        self._flusher = None
+        self._app = None
+
+    def add(self, review_id, delta):
+        with self._lock:
+            self._deltas[review_id] = self._deltas.get(review_id, 0) + delta
+            if self._flusher is None:
+                self._start_flusher()
+
+    def pending(self, review_id):
+        with self._lock:
+            return self._deltas.get(review_id, 0)
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._deltas)
+
+    def display_counts(self, reviews):
+        with self._lock:
+            return {review.review_id: (review.likes or 0) + self._deltas.get(review.review_id, 0) for review in reviews}
+
+    def should_flush(self):
+        interval = current_app.config.get('LIKE_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+        threshold = current_app.config.get('LIKE_FLUSH_THRESHOLD', DEFAULT_FLUSH_THRESHOLD)
+        with self._lock:
+            return len(self._deltas) >= threshold or (
+                self._deltas and time.monotonic() - self._last_flush >= interval
+            )
+
+    # 取出全部增量并批量写回；写入失败时把增量放回缓冲，避免丢失
+    def flush(self):
+        with self._lock:
+            deltas = {review_id: delta for review_id, delta in self._deltas.items() if delta}
+            self._deltas = {}
+            self._last_flush = time.monotonic()
+        if not deltas:
+            return 0
+
+        reviews = Review.__table__
+        try:
+            db.session.execute(
+                reviews.update()
+                .where(reviews.c.review_id == bindparam('b_review_id'))
+                .values(likes=reviews.c.likes + bindparam('b_delta')),
+                [{'b_review_id': review_id, 'b_delta': delta} for review_id, delta in deltas.items()]
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            with self._lock:
+                for review_id, delta in deltas.items():
+                    self._deltas[review_id] = self._deltas.get(review_id, 0) + delta
+            raise
+        return len(deltas)
+
+    # 首次有增量时才启动后台写回线程，空闲时也能按间隔写回
+    def _start_flusher(self):
+        self._app = current_app._get_current_object()
+        self._flusher = threading.Thread(target=self._run_flusher, name='like-flusher', daemon=True)
+        self._flusher.start()
+
+    def _run_flusher(self):
+        interval = self._app.config.get('LIKE_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+        while True:
+            time.sleep(interval)
+            with self._app.app_context():
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception('写回点赞计数时出错')
+                finally:
+                    db.session.remove()
+
+    def discard(self):
+        with self._lock:
+            self._deltas = {}
+
+    def flush_at_exit(self):
+        if self._app is not None and self.pending_count():
+            with self._app.app_context():
+                self.flush()
+
+
+like_buffer = LikeCounterBuffer()
+atexit.register(like_buffer.flush_at_exit)
+
+
+# 点赞/取消点赞：先尝试删除，删除不到再插入；(user_id, review_id) 唯一约束防止重复点赞
+def toggle_like(user_id, review_id):
+    result = db.session.execute(
+        delete(ReviewLike)
+        .where(ReviewLike.user_id == user_id, ReviewLike.review_id == review_id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        db.session.commit()
+        like_buffer.add(review_id, -1)
+        return 'unliked'
+
+    try:
+        db.session.execute(insert(ReviewLike).values(user_id=user_id, review_id=review_id))
+        db.session.commit()
+    except IntegrityError:
+        # 并发的重复点击已经插入过，计数不变
+        db.session.rollback()
+        return 'liked'
+    like_buffer.add(review_id, 1)
+    return 'liked'
+
+
+# 当前用户点赞过的影评，一次集合查询
+def liked_review_ids(user_id, review_ids):
+    if not review_ids:
+        return set()
+    return set(db.session.execute(
+        select(ReviewLike.review_id).where(
+            ReviewLike.user_id == user_id,
+            ReviewLike.review_id.in_(review_ids)
+        )
+    ).scalars().all())
+
+
+# 按点赞表重算所有影评的点赞数（会丢弃尚未写回的增量）
+def rebuild_like_counts():
+    like_buffer.discard()
+    counts = select(db.func.count(ReviewLike.like_id)).where(
+        ReviewLike.review_id == Review.review_id
+    ).scalar_subquery()
+    db.session.execute(
+        Review.__table__.update().values(likes=counts)
+    )
+    db.session.commit()
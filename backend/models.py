@@ -1,9 +1,10 @@
-from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
 
-# 创建数据库实例
-db = SQLAlchemy()
+from database import RoutingSQLAlchemy
+
+# 创建数据库实例（引擎按配置创建，只读页面可路由到只读副本）
+db = RoutingSQLAlchemy()
 
 # 用户信息表
 class User(db.Model, UserMixin):
@@ -34,6 +35,11 @@ class User(db.Model, UserMixin):
 # 电影信息表
 class Movie(db.Model):
     __tablename__ = 'movies'
+    __table_args__ = (
+        # 电影列表按类型、上映年份筛选
+        db.Index('ix_movies_genre', 'genre'),
+        db.Index('ix_movies_release_date', 'release_date'),
+    )
     
     movie_id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -44,7 +50,17 @@ class Movie(db.Model):
     release_date = db.Column(db.Date)
     description = db.Column(db.Text)
     poster = db.Column(db.String(255))
+    # 镜像到本地的海报（内容哈希文件名，见 images.py），为空时页面直接使用 poster 地址
+    poster_image = db.Column(db.String(40))
     rating = db.Column(db.Numeric(3, 1), default=0.0)
+    # 评分聚合：影评数、评分总和及 1-5 星分布，随影评写入原子更新
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_total = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_1 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_2 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_3 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_4 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_5 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -52,6 +68,13 @@ class Movie(db.Model):
     screenings = db.relationship('Screening', backref='movie', lazy=True)
     reviews = db.relationship('Review', backref='movie', lazy=True)
     
+    # 评分分布：[(星级, 人数, 百分比)]，从 5 星到 1 星
+    @property
+    def rating_distribution(self):
+        counts = [(star, getattr(self, f'rating_{star}') or 0) for star in range(5, 0, -1)]
+        total = self.review_count or 0
+        return [(star, count, round(count * 100 / total) if total else 0) for star, count in counts]
+    
     def __repr__(self):
         return f"<Movie {self.title}>"
 
@@ -75,6 +98,9 @@ class Cinema(db.Model):
 # 放映厅表
 class Hall(db.Model):
     __tablename__ = 'halls'
+    __table_args__ = (
+        db.Index('ix_halls_cinema_id', 'cinema_id'),
+    )
     
     hall_id = db.Column(db.Integer, primary_key=True)
     cinema_id = db.Column(db.Integer, db.ForeignKey('cinemas.cinema_id'), nullable=False)
@@ -82,6 +108,10 @@ class Hall(db.Model):
     total_seats = db.Column(db.Integer, nullable=False)
     rows = db.Column(db.Integer, nullable=False)
     cols = db.Column(db.Integer, nullable=False)
+    # 压缩编码的座位布局（座位类型、过道、停用座），见 hall_layout.encode
+    layout = db.Column(db.Text)
+    # 座位号起点：格子 行 * 列数 + 列 对应的座位号为 seat_id_base + 格子序号；为空时需按 Seat 表读取
+    seat_id_base = db.Column(db.Integer)
     
     # 关系
     screenings = db.relationship('Screening', backref='hall', lazy=True)
@@ -93,6 +123,14 @@ class Hall(db.Model):
 # 放映场次表
 class Screening(db.Model):
     __tablename__ = 'screenings'
+    __table_args__ = (
+        # 电影详情页按电影查询未来场次并按开始时间排序
+        db.Index('ix_screenings_movie_start', 'movie_id', 'start_time'),
+        # 按放映厅查询排片时段
+        db.Index('ix_screenings_hall_start', 'hall_id', 'start_time'),
+        # 清理进程按结束时间查找过期场次
+        db.Index('ix_screenings_end_time', 'end_time'),
+    )
     
     screening_id = db.Column(db.Integer, primary_key=True)
     movie_id = db.Column(db.Integer, db.ForeignKey('movies.movie_id'), nullable=False)
@@ -114,6 +152,10 @@ class Screening(db.Model):
 # 座位表
 class Seat(db.Model):
     __tablename__ = 'seats'
+    __table_args__ = (
+        # 同一放映厅的座位位置唯一，选座页按放映厅取座位并按行列排序
+        db.Index('uq_seat_hall_row_col', 'hall_id', 'seat_row', 'seat_col', unique=True),
+    )
     
     seat_id = db.Column(db.Integer, primary_key=True)
     hall_id = db.Column(db.Integer, db.ForeignKey('halls.hall_id'), nullable=False)
@@ -130,6 +172,12 @@ class Seat(db.Model):
 # 订单表
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # 按场次与状态查找订单（清理、释放锁座）
+        db.Index('ix_orders_screening_status', 'screening_id', 'status'),
+        # 个人中心按下单时间倒序键集分页
+        db.Index('ix_orders_user_time', 'user_id', 'order_time', 'order_id'),
+    )
     
     order_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
@@ -149,6 +197,10 @@ class Order(db.Model):
 # 订单座位表
 class OrderSeat(db.Model):
     __tablename__ = 'order_seats'
+    __table_args__ = (
+        # 同一订单不会重复包含同一座位，也用于按订单加载座位
+        db.Index('uq_order_seat', 'order_id', 'seat_id', unique=True),
+    )
     
     order_seat_id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.order_id'), nullable=False)
@@ -160,6 +212,10 @@ class OrderSeat(db.Model):
 # 影评表
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        # 电影详情页按电影取影评并按时间倒序
+        db.Index('ix_reviews_movie_created', 'movie_id', 'created_at'),
+    )
     
     review_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
@@ -179,6 +235,12 @@ class Review(db.Model):
 # 影评点赞表
 class ReviewLike(db.Model):
     __tablename__ = 'review_likes'
+    __table_args__ = (
+        # 同一用户对同一影评只能点赞一次
+        db.Index('uq_review_like_user_review', 'user_id', 'review_id', unique=True),
+        # 按影评统计点赞数
+        db.Index('ix_review_likes_review_id', 'review_id'),
+    )
     
     like_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
@@ -186,4 +248,22 @@ class ReviewLike(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
-        return f"<ReviewLike {self.like_id}>"
\ No newline at end of file
+        return f"<ReviewLike {self.like_id}>"
+
+# 场次座位占用表（每个场次的每个座位最多一行，用唯一约束保证不会重复售出）
+class ScreeningSeat(db.Model):
+    __tablename__ = 'screening_seats'
+    __table_args__ = (
+        db.UniqueConstraint('screening_id', 'seat_id', name='uq_screening_seat'),
+    )
+    
+    screening_seat_id = db.Column(db.Integer, primary_key=True)
+    screening_id = db.Column(db.Integer, db.ForeignKey('screenings.screening_id'), nullable=False)
+    seat_id = db.Column(db.Integer, db.ForeignKey('seats.seat_id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.order_id'), nullable=False, index=True)
+    status = db.Column(db.Enum('held', 'sold'), default='held', nullable=False)
+    # 锁座到期时间，已售座位为空；索引保证清理过期锁座时不做全表扫描
+    expires_at = db.Column(db.DateTime, index=True)
+    
+    def __repr__(self):
+        return f"<ScreeningSeat {self.screening_id}:{self.seat_id}>"
@@ -0,0 +1,69 @@
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import db, Order, OrderSeat, Screening, Hall
+
+# 订单页面使用的只读投影，模板统一通过 view.movie / view.seats 等字段访问
+OrderView = namedtuple('OrderView', ['order', 'screening', 'movie', 'hall', 'cinema', 'seats'])
+
+# 个人中心每页订单数默认值，可通过 app.config['ORDER_PAGE_SIZE'] 覆盖
+DEFAULT_PAGE_SIZE = 10
+
+
+# 订单及其场次、电影、影厅、影院用 JOIN 一次取出，座位用一次 IN 查询批量加载
+def order_query():
+    return Order.query.options(
+        joinedload(Order.screening).joinedload(Screening.movie),
+        joinedload(Order.screening).joinedload(Screening.hall).joinedload(Hall.cinema),
+        selectinload(Order.order_seats).joinedload(OrderSeat.seat)
+    )
+
+
+def project_order(order):
+    screening = order.screening
+    hall = screening.hall
+    seats = sorted(
+        (order_seat.seat for order_seat in order.order_seats),
+        key=lambda seat: (seat.seat_row, seat.seat_col)
+    )
+    return OrderView(order, screening, screening.movie, hall, hall.cinema, seats)
+
+
+def load_order_view(order_id, user_id=None):
+    query = order_query().filter(Order.order_id == order_id)
+    if user_id is not None:
+        query = query.filter(Order.user_id == user_id)
+    order = query.first()
+    return project_order(order) if order else None
+
+
+# 游标格式为 "订单时间ISO格式_订单ID"，按 (order_time, order_id) 倒序翻页
+def encode_cursor(order):
+    return f'{order.order_time.isoformat()}_{order.order_id}'
+
+
+def decode_cursor(cursor):
+    try:
+        order_time, order_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(order_time), int(order_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+# 键集分页：只读取本页及是否有下一页所需的行，不做 OFFSET 扫描
+def user_order_page(user_id, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    query = order_query().filter(Order.user_id == user_id)
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        order_time, order_id = position
+        query = query.filter(db.or_(
+            Order.order_time < order_time,
+            db.and_(Order.order_time == order_time, Order.order_id < order_id)
+        ))
+
+    orders = query.order_by(Order.order_time.desc(), Order.order_id.desc()).limit(page_size + 1).all()
+    next_cursor = encode_cursor(orders[page_size - 1]) if len(orders) > page_size else None
+    return [project_order(order) for order in orders[:page_size]], next_cursor
@@ -0,0 +1,207 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from markupsafe import Markup
+from sqlalchemy import event
+
+from models import db, Movie, Review, Screening
+
+# 默认缓存条数与有效期（秒），可通过 app.config 覆盖
+DEFAULT_CACHE_SIZE = 512
+DEFAULT_CACHE_SECONDS = 60
+
+CachedPage = namedtuple('CachedPage', ['body', 'mimetype', 'etag', 'last_modified', 'tags', 'built_at'])
+
+
+# 进程内页面/片段缓存：按 LRU 淘汰并限制有效期，每条缓存带若干失效标签
+class PageCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tags = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, max_age):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.built_at < max_age:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def set(self, key, body, tags, max_size, mimetype='text/html'):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        entry = CachedPage(
+            body=body,
+            mimetype=mimetype,
+            etag=hashlib.md5(body).hexdigest(),
+            last_modified=datetime.now(timezone.utc).replace(microsecond=0),
+            tags=frozenset(tags),
+            built_at=time.monotonic()
+        )
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > max_size:
+                self._drop(next(iter(self._entries)))
+        return entry
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+page_cache = PageCache()
+
+
+def _settings():
+    config = current_app.config
+    return (
+        config.get('PAGE_CACHE_SIZE', DEFAULT_CACHE_SIZE),
+        config.get('PAGE_CACHE_SECONDS', DEFAULT_CACHE_SECONDS)
+    )
+
+
+def _flashed():
+    return bool(session.get('_flashes'))
+
+
+# 只缓存匿名访客的 GET 页面；登录用户的页面含个人状态，有待显示的提示消息时也不缓存
+def _cacheable():
+    return (
+        current_app.config.get('PAGE_CACHE_ENABLED', True)
+        and request.method == 'GET'
+        and not current_user.is_authenticated
+        and not _flashed()
+    )
+
+
+def _page_key():
+    args = sorted(request.args.items(multi=True))
+    return ('page', request.path, urlencode(args))
+
+
+def _cached_response(entry):
+    response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+    response.set_etag(entry.etag)
+    response.last_modified = entry.last_modified
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+# 整页缓存装饰器：tags 根据视图参数返回失效标签，响应带 ETag / Last-Modified 并支持 304
+def cached_page(tags):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if not _cacheable():
+                return view(**kwargs)
+            max_size, max_age = _settings()
+            key = _page_key()
+            entry = page_cache.get(key, max_age)
+            if entry is None:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200 or _flashed():
+                    return response
+                entry = page_cache.set(key, response.get_data(), tags(**kwargs), max_size, response.mimetype)
+            return _cached_response(entry)
+        return wrapper
+    return decorator
+
+
+# 片段缓存：不含个人状态的页面片段对所有用户共用，render 只在未命中时调用
+def cached_fragment(name, tags, render):
+    if not current_app.config.get('PAGE_CACHE_ENABLED', True):
+        return Markup(render())
+    max_size, max_age = _settings()
+    key = ('fragment',) + tuple(name)
+    entry = page_cache.get(key, max_age)
+    if entry is None:
+        entry = page_cache.set(key, render(), tags, max_size)
+    return Markup(entry.body.decode('utf-8'))
+
+
+def invalidate_pages(*tags):
+    page_cache.invalidate(tags)
+
+
+# 电影、影评、场次写入后在提交时使相关页面失效
+def _mark(*tags):
+    db.session.info.setdefault('page_cache_tags', set()).update(tags)
+
+
+@event.listens_for(Movie, 'after_insert')
+@event.listens_for(Movie, 'after_update')
+@event.listens_for(Movie, 'after_delete')
+def _movie_written(mapper, connection, movie):
+    _mark('home', f'movie:{movie.movie_id}')
+
+
+@event.listens_for(Review, 'after_insert')
+@event.listens_for(Review, 'after_update')
+@event.listens_for(Review, 'after_delete')
+def _review_written(mapper, connection, review):
+    _mark('home', f'movie:{review.movie_id}')
+
+
+@event.listens_for(Screening, 'after_insert')
+@event.listens_for(Screening, 'after_update')
+@event.listens_for(Screening, 'after_delete')
+def _screening_written(mapper, connection, screening):
+    _mark(f'movie:{screening.movie_id}')
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_on_commit(session):
+    tags = session.info.pop('page_cache_tags', None)
+    if tags:
+        page_cache.invalidate(tags)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('page_cache_tags', None)
@@ -0,0 +1,59 @@
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from process_pool import BoundedProcessPool
+
+# 默认参数，可通过 app.config 覆盖
+DEFAULT_METHOD = f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE = 32
+DEFAULT_TIMEOUT = 5.0
+
+
+# 哈希进程池已满或等待超时，视图应提示稍后重试
+class PasswordHasherBusy(Exception):
+    pass
+
+
+# 计算密码哈希的进程池：哈希是 CPU 密集型任务，在有界进程池（见 process_pool.py）中计算，
+# 正在计算与排队的任务总数超过 进程数 + 队列上限 时直接拒绝；进程数为 0 时在当前线程计算
+class PasswordHasher:
+    def __init__(self):
+        self._pool = BoundedProcessPool(PasswordHasherBusy, '密码校验')
+
+    def _run(self, function, *args):
+        config = current_app.config
+        return self._pool.run(
+            config.get('PASSWORD_HASH_WORKERS', DEFAULT_WORKERS),
+            config.get('PASSWORD_HASH_QUEUE', DEFAULT_QUEUE),
+            config.get('PASSWORD_HASH_TIMEOUT', DEFAULT_TIMEOUT),
+            function, *args
+        )
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, hash_method())
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def stats(self):
+        return self._pool.stats()
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+
+hasher = PasswordHasher()
+
+
+# 当前配置的哈希方法，pbkdf2 未写迭代次数时补上 werkzeug 的默认值，便于与已存哈希比较
+def hash_method():
+    method = current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    if method.startswith('pbkdf2:') and method.count(':') == 1:
+        method = f'{method}:{DEFAULT_PBKDF2_ITERATIONS}'
+    return method
+
+
+# 已存哈希的方法或迭代次数与当前配置不同，登录成功后需要重新计算
+def needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != hash_method()
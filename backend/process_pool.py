@@ -0,0 +1,63 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+
+# 有界的 CPU 密集型任务进程池（密码哈希、图片处理共用）：任务放在独立进程中执行，请求线程（或 gevent 协程）
+# 只等待结果，其他路由不被阻塞。进程池在第一次使用时创建（Gunicorn 中即每个 worker 进程各自创建），
+# 正在执行与排队的任务总数达到 进程数 + 队列上限 时直接拒绝；进程数为 0 时在当前线程执行。
+# 等待超时只放弃结果，已开始执行的任务无法取消，计数在任务真正结束（完成或被取消）时才减少
+class BoundedProcessPool:
+    def __init__(self, busy_error, label):
+        self._busy_error = busy_error
+        self._label = label
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _get_executor(self, workers):
+        with self._lock:
+            if self._executor is None:
+                # spawn 启动的子进程不继承 Web 进程的线程、连接与 gevent 补丁
+                self._executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def run(self, workers, queue, timeout, function, *args):
+        if not workers:
+            return function(*args)
+
+        with self._lock:
+            if self._pending >= workers + queue:
+                self.rejected += 1
+                raise self._busy_error(f'{self._label}排队已满')
+            self._pending += 1
+        try:
+            future = self._get_executor(workers).submit(function, *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._finished)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise self._busy_error(f'{self._label}超时')
+
+    def stats(self):
+        with self._lock:
+            return {'pending': self._pending, 'rejected': self.rejected, 'timeouts': self.timeouts}
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,191 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# 请求耗时直方图的分桶上界（秒）
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# 同一条 SQL 在一个请求内以多少组不同参数执行视为 N+1（参数相同的重复执行不计）
+DEFAULT_NPLUSONE_THRESHOLD = 5
+DEFAULT_SLOW_REQUEST_MS = 500
+DEFAULT_SLOW_SAMPLE_SIZE = 100
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# 单个路由的耗时直方图与 SQL 统计
+class RouteStats:
+    def __init__(self):
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.nplusone = 0
+        self.errors = 0
+
+    def observe(self, duration, queries, db_time, nplusone, error):
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if duration <= bound:
+                self.buckets[i] += 1
+        self.count += 1
+        self.duration += duration
+        self.queries += queries
+        self.db_time += db_time
+        self.nplusone += nplusone
+        self.errors += int(error)
+
+
+# 按请求统计 SQL 条数与数据库耗时，发现 N+1 查询，按路由记录耗时直方图，并可在运行时开启慢请求采样。
+# 统计保存在进程内：多进程部署（Gunicorn）时 /internal/metrics 只反映处理该请求的工作进程，需按进程分别采集
+class RequestProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = defaultdict(RouteStats)
+        self._slow_requests = deque(maxlen=DEFAULT_SLOW_SAMPLE_SIZE)
+        self.slow_sampling = False
+        self.slow_request_ms = DEFAULT_SLOW_REQUEST_MS
+
+    def init_app(self, app):
+        app.extensions['profiler'] = self
+        self.slow_sampling = app.config.get('SLOW_REQUEST_SAMPLING', False)
+        self.slow_request_ms = app.config.get('SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS)
+        app.before_request(self._start_request)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish_request)
+
+    def _enabled(self):
+        return has_request_context() and current_app.config.get('PROFILING_ENABLED', True) and '_profile' in g
+
+    def _start_request(self):
+        if current_app.config.get('PROFILING_ENABLED', True):
+            g._profile = {'started': time.perf_counter(), 'queries': 0, 'db_time': 0.0, 'statements': Counter(),
+                         'parameters': defaultdict(set), 'status': 200}
+
+    def _record_status(self, response):
+        profile = g.get('_profile')
+        if profile is not None:
+            profile['status'] = response.status_code
+        return response
+
+    def on_before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._enabled() and context is not None:
+            context._profile_started = time.perf_counter()
+
+    def on_after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not self._enabled():
+            return
+        started = getattr(context, '_profile_started', None)
+        if started is None:
+            return
+        profile = g._profile
+        profile['queries'] += 1
+        profile['db_time'] += time.perf_counter() - started
+        profile['statements'][statement] += 1
+        # 只记录参数的哈希，区分“同一条 SQL 以不同参数逐条查询”（N+1）与相同查询的重复执行
+        profile['parameters'][statement].add(hash(repr(parameters)))
+
+    def _finish_request(self, exc):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return
+        duration = time.perf_counter() - profile['started']
+        route = request.endpoint or 'unmatched'
+        threshold = current_app.config.get('NPLUSONE_THRESHOLD', DEFAULT_NPLUSONE_THRESHOLD)
+        repeated = [
+            (statement, len(parameter_sets)) for statement, parameter_sets in profile['parameters'].items()
+            if len(parameter_sets) >= threshold
+        ]
+        # 分批读取的路由（如全量导出）按设计重复执行同一条 SQL，不计为 N+1
+        if route in current_app.config.get('NPLUSONE_EXEMPT_ENDPOINTS', ()):
+            repeated = []
+        error = exc is not None or profile['status'] >= 500
+
+        for statement, count in repeated:
+            logger.warning('疑似 N+1 查询：%s 在一次请求中以 %d 组不同参数执行：%s', route, count, statement)
+
+        with self._lock:
+            self._routes[route].observe(duration, profile['queries'], profile['db_time'], len(repeated), error)
+            if self.slow_sampling and duration * 1000 >= self.slow_request_ms:
+                self._slow_requests.append({
+                    'route': route,
+                    'method': request.method,
+                    'path': request.path,
+                    'status': 500 if exc is not None else profile['status'],
+                    'duration_ms': round(duration * 1000, 2),
+                    'queries': profile['queries'],
+                    'db_ms': round(profile['db_time'] * 1000, 2),
+                    'top_statements': [
+                        {'statement': statement[:500], 'count': count}
+                        for statement, count in profile['statements'].most_common(5)
+                    ]
+                })
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('%s %s %.1fms，%d 条 SQL，数据库耗时 %.1fms', request.method, request.path,
+                         duration * 1000, profile['queries'], profile['db_time'] * 1000)
+
+    # 运行时开关慢请求采样，threshold_ms 为空时保持原阈值
+    def configure_sampling(self, enabled, threshold_ms=None):
+        with self._lock:
+            self.slow_sampling = enabled
+            if threshold_ms is not None:
+                self.slow_request_ms = threshold_ms
+            if not enabled:
+                self._slow_requests.clear()
+
+    def slow_requests(self):
+        with self._lock:
+            return list(self._slow_requests)
+
+    # Prometheus 文本格式的指标
+    def render_metrics(self, extra=None):
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                '# HELP lumina_request_duration_seconds 请求耗时（当前工作进程）',
+                '# TYPE lumina_request_duration_seconds histogram'
+            ]
+            for route, stats in routes:
+                label = f'route="{_escape(route)}"'
+                for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                    lines.append(f'lumina_request_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'lumina_request_duration_seconds_bucket{{{label},le="+Inf"}} {stats.count}')
+                lines.append(f'lumina_request_duration_seconds_sum{{{label}}} {stats.duration:.6f}')
+                lines.append(f'lumina_request_duration_seconds_count{{{label}}} {stats.count}')
+
+            for name, help_text, attr in (
+                ('lumina_request_sql_queries_total', 'SQL 执行条数', 'queries'),
+                ('lumina_request_sql_seconds_total', '数据库耗时', 'db_time'),
+                ('lumina_request_nplusone_total', '疑似 N+1 查询次数', 'nplusone'),
+                ('lumina_request_errors_total', '出错的请求数', 'errors'),
+            ):
+                lines.append(f'# HELP {name} {help_text}（当前工作进程）')
+                lines.append(f'# TYPE {name} counter')
+                for route, stats in routes:
+                    value = getattr(stats, attr)
+                    value = f'{value:.6f}' if isinstance(value, float) else value
+                    lines.append(f'{name}{{route="{_escape(route)}"}} {value}')
+
+        for name, (metric_type, help_text, value) in (extra or {}).items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.append(f'{name} {value}')
+        lines.append('# HELP lumina_slow_request_sampling 慢请求采样是否开启（当前工作进程）')
+        lines.append('# TYPE lumina_slow_request_sampling gauge')
+        lines.append(f'lumina_slow_request_sampling {int(self.slow_sampling)}')
+        return '\n'.join(lines) + '\n'
+
+
+profiler = RequestProfiler()
+
+event.listen(Engine, 'before_cursor_execute', profiler.on_before_execute)
+event.listen(Engine, 'after_cursor_execute', profiler.on_after_execute)
@@ -0,0 +1,72 @@
+from sqlalchemy import bindparam, update
+
+from models import db, Movie, Review
+
+
+def _average(total, count):
+    return db.func.round(total * 1.0 / count, 1)
+
+
+# 新增影评时在同一事务内原子更新电影评分聚合，不再重新读取全部影评
+# rating 放在 SET 子句最前面，保证各数据库都基于更新前的计数计算平均分
+def apply_review(movie_id, rating):
+    star_column = getattr(Movie, f'rating_{rating}')
+    db.session.execute(
+        update(Movie)
+        .where(Movie.movie_id == movie_id)
+        .ordered_values(
+            (Movie.rating, _average(Movie.rating_total + rating, Movie.review_count + 1)),
+            (Movie.review_count, Movie.review_count + 1),
+            (Movie.rating_total, Movie.rating_total + rating),
+            (star_column, star_column + 1)
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+# 按影评表批量重算所有电影的评分聚合
+def rebuild_rating_aggregates():
+    histograms = {}
+    rows = db.session.query(Review.movie_id, Review.rating, db.func.count(Review.review_id)).group_by(
+        Review.movie_id, Review.rating
+    )
+    for movie_id, rating, count in rows:
+        if 1 <= rating <= 5:
+            histograms.setdefault(movie_id, [0] * 5)[rating - 1] = count
+
+    # 先清零，再批量写入有影评的电影；没有影评的电影保留原有评分
+    db.session.execute(
+        update(Movie).values(
+            review_count=0, rating_total=0,
+            rating_1=0, rating_2=0, rating_3=0, rating_4=0, rating_5=0
+        ).execution_options(synchronize_session=False)
+    )
+
+    params = []
+    for movie_id, histogram in histograms.items():
+        count = sum(histogram)
+        total = sum(star * n for star, n in zip(range(1, 6), histogram))
+        params.append({
+            'b_movie_id': movie_id,
+            'b_rating': round(total / count, 1),
+            'b_review_count': count,
+            'b_rating_total': total,
+            **{f'b_rating_{star}': histogram[star - 1] for star in range(1, 6)}
+        })
+
+    if params:
+        movies = Movie.__table__
+        db.session.execute(
+            movies.update()
+            .where(movies.c.movie_id == bindparam('b_movie_id'))
+            .values(
+                rating=bindparam('b_rating'),
+                review_count=bindparam('b_review_count'),
+                rating_total=bindparam('b_rating_total'),
+                **{f'rating_{star}': bindparam(f'b_rating_{star}') for star in range(1, 6)}
+            ),
+            params
+        )
+
+    db.session.commit()
+    return len(params)
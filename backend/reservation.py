@@ -0,0 +1,214 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from hall_layout import get_layout
+from models import db, Order, OrderSeat, Screening, ScreeningSeat
+from seat_map import record_change
+
+# 默认锁座时长（分钟），可通过 app.config['SEAT_HOLD_MINUTES'] 覆盖
+DEFAULT_HOLD_MINUTES = 15
+
+
+# 座位不可用（已被占用、不属于该放映厅或余票不足）
+class SeatUnavailableError(Exception):
+    def __init__(self, message, seat_ids=None):
+        super().__init__(message)
+        self.seat_ids = seat_ids or []
+
+
+def hold_deadline(now=None):
+    now = now or datetime.now()
+    minutes = current_app.config.get('SEAT_HOLD_MINUTES', DEFAULT_HOLD_MINUTES)
+    return now + timedelta(minutes=minutes)
+
+
+# 原子锁座：创建待支付订单并占用座位，任一座位不可用则整单回滚
+def reserve_seats(user_id, screening, seat_ids, now=None):
+    now = now or datetime.now()
+    seat_ids = sorted(set(seat_ids))
+    screening_id = screening.screening_id
+
+    # 校验座位属于该场次的放映厅且可售，按缓存的放映厅布局判断，无需查询座位表
+    if not get_layout(screening.hall).sellable(seat_ids):
+        raise SeatUnavailableError('座位不属于该放映厅或不可售', seat_ids)
+
+    # 回收这些座位上已过期的锁座，避免过期订单继续占座
+    stale_order_ids = db.session.execute(
+        select(ScreeningSeat.order_id).distinct().where(
+            ScreeningSeat.screening_id == screening_id,
+            ScreeningSeat.seat_id.in_(seat_ids),
+            ScreeningSeat.status == 'held',
+            ScreeningSeat.expires_at < now
+        )
+    ).scalars().all()
+    if stale_order_ids:
+        release_orders(stale_order_ids)
+        db.session.commit()
+
+    # 条件更新扣减余票，避免并发下的读-改-写丢失
+    result = db.session.execute(
+        update(Screening)
+        .where(Screening.screening_id == screening_id, Screening.remaining_seats >= len(seat_ids))
+        .values(remaining_seats=Screening.remaining_seats - len(seat_ids))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.session.rollback()
+        raise SeatUnavailableError('余票不足', seat_ids)
+
+    order = Order(
+        user_id=user_id,
+        screening_id=screening_id,
+        total_price=screening.price * len(seat_ids),
+        status='pending',
+        order_time=now
+    )
+    db.session.add(order)
+    db.session.flush()
+
+    # 唯一约束 (screening_id, seat_id) 保证同一座位只会被一个订单占用
+    expires_at = hold_deadline(now)
+    try:
+        db.session.execute(insert(ScreeningSeat), [
+            {
+                'screening_id': screening_id,
+                'seat_id': seat_id,
+                'order_id': order.order_id,
+                'status': 'held',
+                'expires_at': expires_at
+            }
+            for seat_id in seat_ids
+        ])
+    except IntegrityError:
+        db.session.rollback()
+        raise SeatUnavailableError('座位已被占用', seat_ids)
+    record_change(screening_id, seat_ids, 'held', expires_at)
+
+    db.session.execute(insert(OrderSeat), [
+        {'order_id': order.order_id, 'seat_id': seat_id} for seat_id in seat_ids
+    ])
+    db.session.commit()
+    return order
+
+
+# 支付确认：锁座转为已售；锁座已过期或已被释放（条件更新未命中任何记录）时返回 False，由调用方回滚并释放
+def confirm_seats(order, now=None):
+    now = now or datetime.now()
+    held = (
+        ScreeningSeat.order_id == order.order_id,
+        ScreeningSeat.status == 'held',
+        ScreeningSeat.expires_at >= now
+    )
+    seat_ids = db.session.execute(select(ScreeningSeat.seat_id).where(*held)).scalars().all()
+    result = db.session.execute(
+        update(ScreeningSeat)
+        .where(*held)
+        .values(status='sold', expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        return False
+    record_change(order.screening_id, seat_ids, 'sold')
+    return True
+
+
+# 释放订单占用的座位：先以条件更新把待支付订单改为已取消，只处理本次更新成功的订单，
+# 并发的过期回收、用户取消与锁座前的清理不会重复释放同一订单；余票按实际删除的占座记录数归还（由调用方提交事务）
+def release_orders(order_ids):
+    cancelled = []
+    for order_id in sorted(set(order_ids)):
+        result = db.session.execute(
+            update(Order)
+            .where(Order.order_id == order_id, Order.status == 'pending')
+            .values(status='cancelled')
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            cancelled.append(order_id)
+    if not cancelled:
+        return 0
+
+    orders_by_screening = {}
+    for order_id, screening_id in db.session.execute(
+        select(Order.order_id, Order.screening_id).where(Order.order_id.in_(cancelled))
+    ):
+        orders_by_screening.setdefault(screening_id, []).append(order_id)
+
+    released = 0
+    for screening_id, screening_order_ids in sorted(orders_by_screening.items()):
+        held = (
+            ScreeningSeat.screening_id == screening_id,
+            ScreeningSeat.order_id.in_(screening_order_ids),
+            ScreeningSeat.status == 'held'
+        )
+        seat_ids = db.session.execute(select(ScreeningSeat.seat_id).where(*held)).scalars().all()
+        deleted = db.session.execute(
+            delete(ScreeningSeat).where(*held).execution_options(synchronize_session=False)
+        ).rowcount
+        if not deleted:
+            continue
+        db.session.execute(
+            update(Screening)
+            .where(Screening.screening_id == screening_id)
+            .values(remaining_seats=Screening.remaining_seats + deleted)
+            .execution_options(synchronize_session=False)
+        )
+        record_change(screening_id, seat_ids, 'released')
+        released += deleted
+    return released
+
+
+# 批量回收过期锁座，只通过 expires_at 索引定位到期记录
+def purge_expired_holds(now=None, limit=500):
+    now = now or datetime.now()
+    order_ids = db.session.execute(
+        select(ScreeningSeat.order_id).distinct()
+        .where(ScreeningSeat.status == 'held', ScreeningSeat.expires_at < now)
+        .limit(limit)
+    ).scalars().all()
+    released = release_orders(order_ids)
+    db.session.commit()
+    return len(order_ids), released
+
+
+# 当前场次不可选的座位：已售或锁座未过期
+def occupied_seat_ids(screening_id, now=None):
+    now = now or datetime.now()
+    return set(db.session.execute(
+        select(ScreeningSeat.seat_id).where(
+            ScreeningSeat.screening_id == screening_id,
+            db.or_(ScreeningSeat.status == 'sold', ScreeningSeat.expires_at >= now)
+        )
+    ).scalars().all())
+
+
+# 为引入占座表之前的订单补齐占座记录（仅在占座表为空时执行）
+def backfill_screening_seats():
+    if db.session.query(ScreeningSeat.screening_seat_id).first():
+        return 0
+
+    rows = db.session.query(Order.screening_id, OrderSeat.seat_id, Order.order_id, Order.status).join(
+        OrderSeat, OrderSeat.order_id == Order.order_id
+    ).filter(Order.status.in_(['pending', 'paid'])).order_by(Order.order_time).all()
+
+    seen = set()
+    records = []
+    for screening_id, seat_id, order_id, status in rows:
+        if (screening_id, seat_id) in seen:
+            continue
+        seen.add((screening_id, seat_id))
+        records.append({
+            'screening_id': screening_id,
+            'seat_id': seat_id,
+            'order_id': order_id,
+            'status': 'sold' if status == 'paid' else 'held',
+            'expires_at': None if status == 'paid' else hold_deadline()
+        })
+
+    if records:
+        db.session.execute(insert(ScreeningSeat), records)
+        db.session.commit()
+    return len(records)
@@ -0,0 +1,306 @@
+import csv
+import json
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict, defaultdict, namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from flask import current_app
+from sqlalchemy import event, insert, select
+
+from models import db, Hall, Movie, Screening
+from page_cache import invalidate_pages
+
+# 默认参数，可通过 app.config 覆盖
+DEFAULT_INDEX_SIZE = 1024
+DEFAULT_INDEX_SECONDS = 60
+# 排片文件未给出结束时间且电影没有片长时使用的时长（分钟）
+DEFAULT_DURATION = 120
+BATCH_SIZE = 5000
+# IN 查询每次最多带的 id 数（SQLite 默认上限 999 个参数）
+ID_CHUNK = 500
+
+# 电影详情页展示的一个场次
+Showtime = namedtuple('Showtime', ['screening_id', 'start_time', 'price', 'hall_name'])
+
+# 时间段索引中的一个区间：line 为排片文件中的行号，已有场次为 None
+_Slot = namedtuple('_Slot', ['start_time', 'end_time', 'line', 'screening_id'])
+
+
+# 排片文件有误（格式错误、电影或放映厅不存在、同一放映厅时间重叠），problems 为逐条说明
+class ScheduleError(Exception):
+    def __init__(self, message, problems=None):
+        super().__init__(message)
+        self.problems = problems or []
+
+
+# 读取排片文件：CSV 表头或 JSON 对象的键为 movie_id, hall_id, start_time, price，可选 end_time（默认按电影片长）
+def read_schedule(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.json'):
+            return json.load(f)
+        return list(csv.DictReader(f))
+
+
+def _chunks(values):
+    values = sorted(values)
+    for i in range(0, len(values), ID_CHUNK):
+        yield values[i:i + ID_CHUNK]
+
+
+def _lookup(columns, key, ids):
+    found = {}
+    for chunk in _chunks(ids):
+        found.update((row[0], row[1]) for row in db.session.execute(select(*columns).where(key.in_(chunk))))
+    return found
+
+
+def _parse_time(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).strip())
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# 校验并补全排片行：电影与放映厅各查询一次，结束时间默认为开始时间加片长
+def _normalize(rows):
+    rows = list(rows)
+    durations = _lookup((Movie.movie_id, Movie.duration), Movie.movie_id,
+                        {_int_or_none(row.get('movie_id')) for row in rows} - {None})
+    capacities = _lookup((Hall.hall_id, Hall.total_seats), Hall.hall_id,
+                         {_int_or_none(row.get('hall_id')) for row in rows} - {None})
+
+    screenings = []
+    problems = []
+    for line, row in enumerate(rows, 1):
+        try:
+            movie_id = int(row['movie_id'])
+            hall_id = int(row['hall_id'])
+            start_time = _parse_time(row['start_time'])
+            end_time = _parse_time(row['end_time']) if row.get('end_time') else None
+            price = Decimal(str(row['price']))
+        except (KeyError, TypeError, ValueError, InvalidOperation) as e:
+            problems.append(f'第 {line} 行格式错误：{type(e).__name__} {e}')
+            continue
+        if movie_id not in durations:
+            problems.append(f'第 {line} 行：电影 {movie_id} 不存在')
+            continue
+        if hall_id not in capacities:
+            problems.append(f'第 {line} 行：放映厅 {hall_id} 不存在')
+            continue
+        end_time = end_time or start_time + timedelta(minutes=durations[movie_id] or DEFAULT_DURATION)
+        if end_time <= start_time or price < 0:
+            problems.append(f'第 {line} 行：结束时间须晚于开始时间且票价不能为负')
+            continue
+        screenings.append({
+            'line': line,
+            'movie_id': movie_id,
+            'hall_id': hall_id,
+            'start_time': start_time,
+            'end_time': end_time,
+            'price': price,
+            'remaining_seats': capacities[hall_id],
+            'status': 'upcoming'
+        })
+    return screenings, problems
+
+
+# 区间索引：按放映厅把新场次与这些放映厅在同一时间范围内的已有场次合并排序，顺序扫描一遍，
+# 与此前结束最晚的区间重叠即冲突；排序 O(n log n)，不做两两比较。已有场次之间的重叠不报告
+def find_conflicts(screenings):
+    slots = defaultdict(list)
+    for screening in screenings:
+        slots[screening['hall_id']].append(
+            _Slot(screening['start_time'], screening['end_time'], screening['line'], None)
+        )
+    if not slots:
+        return []
+
+    earliest = min(screening['start_time'] for screening in screenings)
+    latest = max(screening['end_time'] for screening in screenings)
+    for chunk in _chunks(slots):
+        existing = db.session.execute(
+            select(Screening.screening_id, Screening.hall_id, Screening.start_time, Screening.end_time).where(
+                Screening.hall_id.in_(chunk),
+                Screening.start_time < latest,
+                Screening.end_time > earliest
+            )
+        )
+        for screening_id, hall_id, start_time, end_time in existing:
+            slots[hall_id].append(_Slot(start_time, end_time, None, screening_id))
+
+    conflicts = []
+    for hall_id, hall_slots in slots.items():
+        hall_slots.sort(key=lambda slot: (slot.start_time, slot.end_time))
+        previous = None
+        for slot in hall_slots:
+            if previous is not None and slot.start_time < previous.end_time and (slot.line or previous.line):
+                conflicts.append((hall_id, previous, slot))
+            if previous is None or slot.end_time > previous.end_time:
+                previous = slot
+    return conflicts
+
+
+def _describe(slot):
+    if slot.line is not None:
+        return f'第 {slot.line} 行（{slot.start_time:%m-%d %H:%M}-{slot.end_time:%H:%M}）'
+    return f'已有场次 {slot.screening_id}（{slot.start_time:%m-%d %H:%M}-{slot.end_time:%H:%M}）'
+
+
+# 批量导入排片：校验全部通过后在一个事务内分批 executemany 写入，有任何问题则不写入并抛出 ScheduleError
+# dry_run 时只做校验；返回导入（或可导入）的场次数
+def import_schedule(rows, batch_size=BATCH_SIZE, dry_run=False):
+    screenings, problems = _normalize(rows)
+    problems.extend(
+        f'放映厅 {hall_id} 时间重叠：{_describe(first)} 与 {_describe(second)}'
+        for hall_id, first, second in find_conflicts(screenings)
+    )
+    if problems:
+        raise ScheduleError(f'排片文件有 {len(problems)} 处问题', problems)
+    if dry_run or not screenings:
+        return len(screenings)
+
+    table = Screening.__table__
+    for i in range(0, len(screenings), batch_size):
+        db.session.execute(insert(table), [
+            {key: value for key, value in screening.items() if key != 'line'}
+            for screening in screenings[i:i + batch_size]
+        ])
+    db.session.commit()
+
+    # Core 批量写入不触发 ORM 事件，提交后直接使相关电影的场次索引与页面缓存失效
+    movie_ids = {screening['movie_id'] for screening in screenings}
+    showtimes.invalidate(movie_ids)
+    invalidate_pages(*(f'movie:{movie_id}' for movie_id in movie_ids))
+    return len(screenings)
+
+
+# 按电影、日期预先分好组的未来场次，进程内 LRU 缓存；场次写入提交后失效，
+# 其他进程（如命令行导入）的写入最多在 SHOWTIME_INDEX_SECONDS 后可见
+class ShowtimeIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    # 一部电影的场次（按开始时间排序）打包为索引条目
+    def _pack(self, showtimes):
+        showtimes = tuple(showtimes)
+        starts = [showtime.start_time for showtime in showtimes]
+        # 每天的场次在 showtimes 中的起止位置
+        days = []
+        for position, showtime in enumerate(showtimes):
+            day = showtime.start_time.date()
+            if days and days[-1][0] == day:
+                days[-1][2] = position + 1
+            else:
+                days.append([day, position, position + 1])
+        return time.monotonic(), showtimes, starts, tuple(tuple(day) for day in days)
+
+    def _build(self, movie_id, now):
+        return self._build_many([movie_id], now)[movie_id]
+
+    # 多部电影的场次一次查询
+    def _build_many(self, movie_ids, now):
+        rows = db.session.execute(
+            select(Screening.movie_id, Screening.screening_id, Screening.start_time, Screening.price, Hall.name)
+            .join(Hall, Hall.hall_id == Screening.hall_id)
+            .where(Screening.movie_id.in_(movie_ids), Screening.start_time > now)
+            .order_by(Screening.movie_id, Screening.start_time)
+        ).all()
+        grouped = defaultdict(list)
+        for movie_id, *showtime in rows:
+            grouped[movie_id].append(Showtime(*showtime))
+        return {movie_id: self._pack(grouped[movie_id]) for movie_id in movie_ids}
+
+    def _cached(self, movie_id):
+        max_age = current_app.config.get('SHOWTIME_INDEX_SECONDS', DEFAULT_INDEX_SECONDS)
+        entry = self._entries.get(movie_id)
+        if entry is not None and time.monotonic() - entry[0] < max_age:
+            self._entries.move_to_end(movie_id)
+            return entry
+        return None
+
+    def _store(self, entries):
+        with self._lock:
+            for movie_id, entry in entries.items():
+                self._entries[movie_id] = entry
+                self._entries.move_to_end(movie_id)
+            limit = current_app.config.get('SHOWTIME_INDEX_SIZE', DEFAULT_INDEX_SIZE)
+            while len(self._entries) > limit:
+                self._entries.popitem(last=False)
+
+    def _entry(self, movie_id, now):
+        with self._lock:
+            entry = self._cached(movie_id)
+        if entry is None:
+            entry = self._build(movie_id, now)
+            self._store({movie_id: entry})
+        return entry
+
+    def _days(self, entry, now):
+        _, showtimes, starts, days = entry
+        first = bisect_right(starts, now)
+        return [
+            {'date': day, 'screenings': showtimes[max(begin, first):end]}
+            for day, begin, end in days
+            if end > first
+        ]
+
+    # 电影的未来场次按日期分组：[{'date': date, 'screenings': [Showtime, ...]}, ...]，已开场的场次跳过
+    def by_date(self, movie_id, now=None):
+        now = now or datetime.now()
+        return self._days(self._entry(movie_id, now), now)
+
+    # 多部电影的场次：{movie_id: 同 by_date}，未缓存的电影合并为每 ID_CHUNK 部一次查询
+    def by_date_many(self, movie_ids, now=None):
+        now = now or datetime.now()
+        entries = {}
+        with self._lock:
+            for movie_id in movie_ids:
+                entry = self._cached(movie_id)
+                if entry is not None:
+                    entries[movie_id] = entry
+        for chunk in _chunks(set(movie_ids) - entries.keys()):
+            built = self._build_many(chunk, now)
+            self._store(built)
+            entries.update(built)
+        return {movie_id: self._days(entries[movie_id], now) for movie_id in movie_ids}
+
+    def invalidate(self, movie_ids=None):
+        with self._lock:
+            if movie_ids is None:
+                self._entries.clear()
+            else:
+                for movie_id in movie_ids:
+                    self._entries.pop(movie_id, None)
+
+
+showtimes = ShowtimeIndex()
+
+
+# 通过 ORM 写入场次时，提交后使对应电影的场次索引失效
+@event.listens_for(Screening, 'after_insert')
+@event.listens_for(Screening, 'after_update')
+@event.listens_for(Screening, 'after_delete')
+def _screening_written(mapper, connection, screening):
+    db.session.info.setdefault('showtime_movies', set()).add(screening.movie_id)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_on_commit(session):
+    movie_ids = session.info.pop('showtime_movies', None)
+    if movie_ids:
+        showtimes.invalidate(movie_ids)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('showtime_movies', None)
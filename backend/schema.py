@@ -0,0 +1,122 @@
+import logging
+
+from sqlalchemy import and_, func, inspect, select, text
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+
+# 为已有数据库补齐模型中新增的列（db.create_all 只会创建缺失的表，不会修改已有表）
+def add_missing_columns():
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}'
+            if column.server_default is not None:
+                ddl += f' DEFAULT {column.server_default.arg}'
+                if not column.nullable:
+                    ddl += ' NOT NULL'
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+            added.append(f'{table.name}.{column.name}')
+
+    return added
+
+
+# 已有数据违反新增的唯一索引，需确认后以 flask init-db --dedupe 删除重复行
+class DuplicateRowsError(Exception):
+    def __init__(self, problems):
+        lines = [f'{len(problems)} 组重复数据违反新增的唯一索引，未创建索引。'
+                 f'确认可以删除后执行 flask init-db --dedupe（每组保留主键最小的一行）：']
+        lines += [f'  {problem}' for problem in problems[:20]]
+        if len(problems) > 20:
+            lines.append(f'  ……另有 {len(problems) - 20} 组')
+        super().__init__('\n'.join(lines))
+        self.problems = problems
+
+
+# 违反唯一索引的重复行：[(键值, [主键, ...])]，主键升序
+def _find_duplicates(conn, index):
+    table = index.table
+    pk = list(table.primary_key.columns)[0]
+    key_columns = list(index.columns)
+    groups = {}
+    duplicated = select(*key_columns).group_by(*key_columns).having(func.count() > 1).subquery()
+    rows = conn.execute(
+        select(pk, *key_columns)
+        .join(duplicated, and_(*(column == duplicated.c[column.name] for column in key_columns)))
+        .order_by(*key_columns, pk)
+    )
+    for row in rows:
+        groups.setdefault(tuple(row[1:]), []).append(row[0])
+    return list(groups.items())
+
+
+# 删除重复行，每组保留主键最小的一行，逐行记录日志
+def _remove_duplicates(conn, index, duplicates):
+    table = index.table
+    pk = list(table.primary_key.columns)[0]
+    names = ', '.join(column.name for column in index.columns)
+    removed = 0
+    for key, ids in duplicates:
+        for row_id in ids[1:]:
+            logger.warning('删除 %s 中违反 %s 的重复行：%s=%s，(%s)=%s，保留 %s=%s',
+                           table.name, index.name, pk.name, row_id, names, key, pk.name, ids[0])
+        conn.execute(table.delete().where(pk.in_(ids[1:])))
+        removed += len(ids) - 1
+    return removed
+
+
+# 为已有数据库补齐模型中声明的索引。已有数据违反新增的唯一索引时抛出 DuplicateRowsError 列出冲突的键，
+# 不修改任何数据；dedupe=True 时删除重复行（逐行记录日志）后再建索引
+def add_missing_indexes(dedupe=False):
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        missing += [index for index in table.indexes if index.name not in existing_indexes]
+
+    duplicates = {}
+    with engine.connect() as conn:
+        for index in missing:
+            if index.unique:
+                found = _find_duplicates(conn, index)
+                if found:
+                    duplicates[index.name] = found
+    if duplicates and not dedupe:
+        names = {index.name: ', '.join(column.name for column in index.columns) for index in missing}
+        raise DuplicateRowsError([
+            f'{name}：({names[name]})={key} 共 {len(ids)} 行，主键 {ids}'
+            for name, found in duplicates.items() for key, ids in found
+        ])
+
+    created = []
+    for index in missing:
+        with engine.begin() as conn:
+            if index.name in duplicates:
+                _remove_duplicates(conn, index, duplicates[index.name])
+            index.create(conn)
+        created.append(index.name)
+
+    return created
+
+
+# 建表并升级已有表结构，返回新增的列与索引；dedupe 见 add_missing_indexes
+def upgrade_schema(dedupe=False):
+    db.create_all()
+    return add_missing_columns() + add_missing_indexes(dedupe)
@@ -0,0 +1,367 @@
+import bisect
+import logging
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app
+from sqlalchemy import event, select, text
+
+from models import db, Movie
+
+logger = logging.getLogger(__name__)
+
+# 参与检索的字段及其权重（标题命中最重要）
+FIELD_WEIGHTS = (('title', 10.0), ('director', 5.0), ('actors', 3.0), ('description', 1.0))
+SEARCH_FIELDS = tuple(field for field, _ in FIELD_WEIGHTS)
+
+# 默认最多返回的检索结果数
+DEFAULT_LIMIT = 500
+# 内存索引：检查电影表是否被其他进程修改的间隔，以及无论是否变化都全量重建的最长时间（秒），可通过 app.config 覆盖
+DEFAULT_CHECK_SECONDS = 10
+DEFAULT_INDEX_SECONDS = 300
+
+_CJK = '\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff'
+_CJK_RE = re.compile(f'[{_CJK}]')
+_TOKEN_RE = re.compile(f'[{_CJK}]+|[^\\W_{_CJK}]+')
+
+
+# 分词：拉丁文字按单词切分，中日文连续字符切成二元组（单字保留原样）
+def tokenize(value):
+    tokens = []
+    for run in _TOKEN_RE.findall((value or '').lower()):
+        if len(run) == 1 or not _CJK_RE.match(run):
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+# 查询词：二元组精确匹配，拉丁单词与单个汉字按前缀匹配
+def _query_terms(query):
+    terms = []
+    for token in dict.fromkeys(tokenize(query)):
+        is_cjk = bool(_CJK_RE.match(token))
+        terms.append((token, not is_cjk or len(token) == 1))
+    return terms
+
+
+def _movie_fields(movie):
+    return {field: getattr(movie, field) for field in SEARCH_FIELDS}
+
+
+# SQLite FTS5 全文索引，rowid 与 movie_id 一致，存储预先分好词的文本
+class Fts5SearchIndex:
+    name = 'fts5'
+    table = 'movie_search'
+
+    def ensure(self):
+        with db.engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': self.table}
+            ).first()
+            if exists:
+                return False
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {self.table} USING fts5({', '.join(SEARCH_FIELDS)}, tokenize='unicode61')"
+            ))
+        return True
+
+    def _params(self, movie_id, fields):
+        params = {field: ' '.join(tokenize(fields[field])) for field in SEARCH_FIELDS}
+        params['rowid'] = movie_id
+        return params
+
+    def index_movies(self, conn, movies):
+        if not movies:
+            return
+        self.remove(conn, [movie_id for movie_id, _ in movies])
+        columns = ', '.join(SEARCH_FIELDS)
+        values = ', '.join(f':{field}' for field in SEARCH_FIELDS)
+        conn.execute(
+            text(f'INSERT INTO {self.table} (rowid, {columns}) VALUES (:rowid, {values})'),
+            [self._params(movie_id, fields) for movie_id, fields in movies]
+        )
+
+    def remove(self, conn, movie_ids):
+        if movie_ids:
+            conn.execute(text(f'DELETE FROM {self.table} WHERE rowid = :rowid'), [{'rowid': movie_id} for movie_id in movie_ids])
+
+    def rebuild(self, batch_size=1000):
+        self.ensure()
+        with db.engine.begin() as conn:
+            conn.execute(text(f'DELETE FROM {self.table}'))
+            batch = []
+            for row in conn.execute(select(Movie.movie_id, *[getattr(Movie, f) for f in SEARCH_FIELDS])):
+                batch.append((row[0], dict(zip(SEARCH_FIELDS, row[1:]))))
+                if len(batch) >= batch_size:
+                    self.index_movies(conn, batch)
+                    batch = []
+            self.index_movies(conn, batch)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        terms = _query_terms(query)
+        if not terms:
+            return []
+        match = ' '.join(f'"{token}"*' if prefix else f'"{token}"' for token, prefix in terms)
+        weights = ', '.join(str(weight) for _, weight in FIELD_WEIGHTS)
+        rows = db.session.execute(
+            text(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH :match '
+                f'ORDER BY bm25({self.table}, {weights}) LIMIT :limit'
+            ),
+            {'match': match, 'limit': limit}
+        )
+        return [movie_id for (movie_id,) in rows]
+
+
+# 进程内倒排索引：非 SQLite 数据库或 FTS5 不可用时使用，首次检索时构建。本进程的写入在提交后增量更新；
+# 其他进程（如 Gunicorn 的其他工作进程）新增或删除的电影通过定期比较电影数与最大 movie_id 发现并重建，
+# 其他进程对已有电影的修改在 SEARCH_INDEX_SECONDS 后随全量重建生效。除首次构建外，重建在后台线程中进行，
+# 同一时间只有一个重建，完成前检索继续使用旧索引
+class MemorySearchIndex:
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+        self._built = False
+        self._built_at = 0.0
+        self._checked_at = 0.0
+        # 重建互斥；重建期间提交的增量变化记入 _replay，替换索引后重放
+        self._rebuilding = threading.Lock()
+        self._replay = None
+
+    def ensure(self):
+        return False
+
+    # 电影表的水位：(电影数, 最大 movie_id)，与索引中的文档比较
+    def _watermark(self):
+        count, max_id = db.session.query(db.func.count(Movie.movie_id), db.func.max(Movie.movie_id)).one()
+        return count, max_id
+
+    def _stale(self):
+        now = time.monotonic()
+        config = current_app.config
+        if not self._built or now - self._built_at >= config.get('SEARCH_INDEX_SECONDS', DEFAULT_INDEX_SECONDS):
+            return True
+        if now - self._checked_at < config.get('SEARCH_INDEX_CHECK_SECONDS', DEFAULT_CHECK_SECONDS):
+            return False
+        self._checked_at = now
+        with self._lock:
+            indexed = (len(self._documents), max(self._documents, default=None))
+        return self._watermark() != indexed
+
+    def _add(self, movie_id, fields):
+        scores = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(fields[field]):
+                scores[token] += weight
+        for token, score in scores.items():
+            if token not in self._postings:
+                self._vocabulary_dirty = True
+            self._postings[token][movie_id] = score
+        self._documents[movie_id] = tuple(scores)
+
+    def _remove(self, movie_id):
+        for token in self._documents.pop(movie_id, ()):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(movie_id, None)
+                if not postings:
+                    del self._postings[token]
+                    self._vocabulary_dirty = True
+
+    def index_movies(self, conn, movies):
+        with self._lock:
+            if self._replay is not None:
+                self._replay.extend(movies)
+            if not self._built:
+                return
+            for movie_id, fields in movies:
+                self._remove(movie_id)
+                self._add(movie_id, fields)
+
+    def remove(self, conn, movie_ids):
+        with self._lock:
+            if self._replay is not None:
+                self._replay.extend((movie_id, None) for movie_id in movie_ids)
+            for movie_id in movie_ids:
+                self._remove(movie_id)
+
+    # 全量重建：在新的索引中构建，完成后一次替换，期间检索不受影响；返回时新索引已生效
+    def rebuild(self, batch_size=1000):
+        with self._rebuilding:
+            self._rebuild(batch_size)
+
+    def _rebuild(self, batch_size=1000):
+        with self._lock:
+            self._replay = []
+        try:
+            fresh = MemorySearchIndex()
+            rows = db.session.query(Movie.movie_id, *[getattr(Movie, f) for f in SEARCH_FIELDS]).yield_per(batch_size)
+            for row in rows:
+                fresh._add(row[0], dict(zip(SEARCH_FIELDS, row[1:])))
+            with self._lock:
+                self._postings, self._documents = fresh._postings, fresh._documents
+                for movie_id, fields in self._replay:
+                    self._remove(movie_id)
+                    if fields is not None:
+                        self._add(movie_id, fields)
+                self._vocabulary_dirty = True
+                self._built = True
+                self._built_at = self._checked_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._replay = None
+
+    # 后台重建：已有重建在进行时直接返回，不排队
+    def _rebuild_in_background(self):
+        if not self._rebuilding.acquire(blocking=False):
+            return
+        app = current_app._get_current_object()
+
+        def run():
+            try:
+                with app.app_context():
+                    self._rebuild()
+            except Exception:
+                logger.exception('重建内存检索索引失败')
+            finally:
+                self._rebuilding.release()
+
+        threading.Thread(target=run, name='search-index-rebuild', daemon=True).start()
+
+    def _matching_tokens(self, token, prefix):
+        if not prefix:
+            return [token] if token in self._postings else []
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect.bisect_left(self._vocabulary, token)
+        matches = []
+        for candidate in self._vocabulary[start:]:
+            if not candidate.startswith(token):
+                break
+            matches.append(candidate)
+        return matches
+
+    # 所有查询词都必须命中；得分为 字段权重 × 逆文档频率 之和
+    def search(self, query, limit=DEFAULT_LIMIT):
+        terms = _query_terms(query)
+        if not terms:
+            return []
+        if not self._built:
+            # 首次检索没有可用的旧索引，同步构建；并发的首次检索等待同一次构建完成
+            with self._rebuilding:
+                if not self._built:
+                    self._rebuild()
+        elif self._stale():
+            self._rebuild_in_background()
+
+        with self._lock:
+            total = len(self._documents) or 1
+            scores = None
+            for token, prefix in terms:
+                term_scores = defaultdict(float)
+                for candidate in self._matching_tokens(token, prefix):
+                    postings = self._postings[candidate]
+                    idf = math.log(1 + total / len(postings))
+                    for movie_id, weight in postings.items():
+                        term_scores[movie_id] = max(term_scores[movie_id], weight * idf)
+                if scores is None:
+                    scores = dict(term_scores)
+                else:
+                    scores = {movie_id: score + term_scores[movie_id] for movie_id, score in scores.items() if movie_id in term_scores}
+                if not scores:
+                    return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [movie_id for movie_id, _ in ranked[:limit]]
+
+
+def _fts5_available():
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    with db.engine.connect() as conn:
+        options = {row[0] for row in conn.execute(text('PRAGMA compile_options'))}
+    return 'ENABLE_FTS5' in options
+
+
+# 按配置选择检索后端：SEARCH_BACKEND = auto / fts5 / memory
+def get_search_index():
+    extensions = current_app.extensions
+    index = extensions.get('movie_search')
+    if index is None:
+        backend = current_app.config.get('SEARCH_BACKEND', 'auto')
+        if backend == 'fts5' or (backend == 'auto' and _fts5_available()):
+            index = Fts5SearchIndex()
+        else:
+            index = MemorySearchIndex()
+        extensions['movie_search'] = index
+    return index
+
+
+# 启动时确保索引存在；FTS5 表首次创建时从电影表全量构建
+def init_search_index():
+    index = get_search_index()
+    if index.ensure():
+        index.rebuild()
+    return index
+
+
+def search_movie_ids(query, limit=DEFAULT_LIMIT):
+    return get_search_index().search(query, limit)
+
+
+# 电影增删改时增量更新索引：FTS5 与电影写入在同一事务内完成，内存索引在提交后更新
+def _apply(connection, movie_id, fields):
+    index = get_search_index()
+    if isinstance(index, Fts5SearchIndex):
+        if fields is None:
+            index.remove(connection, [movie_id])
+        else:
+            index.index_movies(connection, [(movie_id, fields)])
+    else:
+        db.session.info.setdefault('search_changes', []).append((movie_id, fields))
+
+
+@event.listens_for(Movie, 'after_insert')
+def _movie_inserted(mapper, connection, movie):
+    _apply(connection, movie.movie_id, _movie_fields(movie))
+
+
+@event.listens_for(Movie, 'after_update')
+def _movie_updated(mapper, connection, movie):
+    state = db.inspect(movie)
+    if any(state.attrs[field].history.has_changes() for field in SEARCH_FIELDS):
+        _apply(connection, movie.movie_id, _movie_fields(movie))
+
+
+@event.listens_for(Movie, 'after_delete')
+def _movie_deleted(mapper, connection, movie):
+    _apply(connection, movie.movie_id, None)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_memory_changes(session):
+    changes = session.info.pop('search_changes', None)
+    if not changes:
+        return
+    index = current_app.extensions.get('movie_search')
+    for movie_id, fields in changes:
+        if fields is None:
+            index.remove(None, [movie_id])
+        else:
+            index.index_movies(None, [(movie_id, fields)])
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_memory_changes(session):
+    session.info.pop('search_changes', None)
@@ -0,0 +1,186 @@
+import heapq
+import json
+import secrets
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# 保活注释的间隔、每个场次保留的最近事件数、无人订阅的频道保留多久（秒），可通过 app.config 覆盖
+DEFAULT_HEARTBEAT_SECONDS = 15
+DEFAULT_BACKLOG = 256
+DEFAULT_IDLE_SECONDS = 300
+# 客户端断线后的重连间隔（毫秒）
+RETRY_MS = 3000
+
+# 单个场次的座位事件频道：订阅者只记录读到的序号，不为每个连接单独排队；
+# 频道同时记录已知锁座的到期时间，到期时由等待中的订阅者发布 released 事件。
+# 序号属于频道自身，对外的游标为 "频道标识-序号"：多进程部署时页面与订阅请求可能由不同进程处理，
+# 频道重建后也会换新标识，不属于本频道的游标一律视为未知，由调用方改发当前座位快照
+class ScreeningChannel:
+    def __init__(self, screening_id, backlog, holds=()):
+        self.screening_id = screening_id
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=backlog)
+        self.epoch = secrets.token_hex(4)
+        self.seq = 0
+        # 已被挤出缓冲区的最新序号，早于它的 cursor 无法补发
+        self._floor = self.seq
+        self.subscribers = 0
+        self.idle_since = time.monotonic()
+        self._held = {}
+        self._expiries = []
+        for seat_id, expires_at in holds:
+            self._hold(seat_id, expires_at)
+
+    def _hold(self, seat_id, expires_at):
+        self._held[seat_id] = expires_at
+        heapq.heappush(self._expiries, (expires_at, seat_id))
+
+    def _append(self, diff):
+        if len(self._events) == self._events.maxlen:
+            self._floor = self._events[0][0]
+        self.seq += 1
+        self._events.append((self.seq, json.dumps(diff)))
+        self._cond.notify_all()
+
+    # 当前位置的游标，页面渲染前取得，订阅时从该位置补发
+    @property
+    def cursor(self):
+        return self.event_id(self.seq)
+
+    def event_id(self, seq):
+        return f'{self.epoch}-{seq}'
+
+    # 解析游标：属于本频道且仍可补发时返回序号，否则返回 None
+    def position(self, cursor):
+        epoch, _, seq = (cursor or '').partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        with self._cond:
+            return seq if self._floor <= seq <= self.seq else None
+
+    def publish(self, state, seat_ids, expires_at=None):
+        with self._cond:
+            for seat_id in seat_ids:
+                if state == 'held' and expires_at:
+                    self._hold(seat_id, expires_at)
+                else:
+                    self._held.pop(seat_id, None)
+            self._append({state: list(seat_ids)})
+
+    # 发布已到期锁座的释放事件；已支付或已释放的座位不在 _held 中，直接丢弃
+    def _expire(self, now):
+        released = []
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, seat_id = heapq.heappop(self._expiries)
+            if self._held.get(seat_id) == expires_at:
+                del self._held[seat_id]
+                released.append(seat_id)
+        if released:
+            self._append({'released': released})
+
+    # 等待序号 cursor 之后的事件，返回 (事件列表, 新序号, 是否已无法补发)；
+    # 订阅者落后超过缓冲区时无法补发，由 stream 结束连接，客户端重连后收到座位快照
+    def wait(self, cursor, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = datetime.now()
+                self._expire(now)
+                if cursor > self.seq or cursor < self._floor:
+                    return [], self.seq, True
+                if cursor < self.seq:
+                    return [event for event in self._events if event[0] > cursor], self.seq, False
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return [], cursor, False
+                if self._expiries:
+                    until_expiry = (self._expiries[0][0] - now).total_seconds()
+                    remaining = min(remaining, max(until_expiry, 0) + 0.01)
+                self._cond.wait(remaining)
+
+    def _subscribe(self):
+        with self._cond:
+            self.subscribers += 1
+
+    def _unsubscribe(self):
+        with self._cond:
+            self.subscribers -= 1
+            if not self.subscribers:
+                self.idle_since = time.monotonic()
+
+
+# 进程内按场次分发座位变化，选座页面通过 SSE 订阅；多进程部署时各进程只分发本进程提交的变化
+class SeatEventHub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+        self.backlog = DEFAULT_BACKLOG
+        self.idle_seconds = DEFAULT_IDLE_SECONDS
+
+    def init_app(self, app):
+        app.extensions['seat_events'] = self
+        self.backlog = app.config.get('SEAT_EVENTS_BACKLOG', DEFAULT_BACKLOG)
+        self.idle_seconds = app.config.get('SEAT_EVENTS_IDLE_SECONDS', DEFAULT_IDLE_SECONDS)
+
+    def get(self, screening_id):
+        return self._channels.get(screening_id)
+
+    # 获取或创建场次频道；load_holds 只在创建时调用一次，返回当前未到期锁座的 (seat_id, expires_at)
+    def channel(self, screening_id, load_holds=None):
+        channel = self._channels.get(screening_id)
+        if channel is not None:
+            return channel
+        holds = load_holds() if load_holds else ()
+        with self._lock:
+            channel = self._channels.get(screening_id)
+            if channel is None:
+                self._prune()
+                channel = ScreeningChannel(screening_id, self.backlog, holds)
+                self._channels[screening_id] = channel
+            return channel
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        for screening_id, channel in list(self._channels.items()):
+            if not channel.subscribers and channel.idle_since < cutoff:
+                del self._channels[screening_id]
+
+    # 只向已有订阅频道的场次发布，无人关注的场次不占内存
+    def publish(self, screening_id, state, seat_ids, expires_at=None):
+        channel = self._channels.get(screening_id)
+        if channel is not None:
+            channel.publish(state, seat_ids, expires_at)
+
+    def stats(self):
+        with self._lock:
+            channels = list(self._channels.values())
+        return {
+            'channels': len(channels),
+            'watchers': sum(channel.subscribers for channel in channels)
+        }
+
+
+hub = SeatEventHub()
+
+
+# SSE 响应体：snapshot 不为空时先发送当前已占用座位的完整列表（游标未知时），再补发 cursor 之后的事件，
+# 之后阻塞等待新事件，空闲时发送保活注释；落后超过缓冲区时结束连接，客户端按最后的事件 ID 重连
+def stream(channel, cursor, heartbeat=DEFAULT_HEARTBEAT_SECONDS, snapshot=None):
+    channel._subscribe()
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        if snapshot is not None:
+            yield f'id: {channel.event_id(cursor)}\nevent: snapshot\ndata: {json.dumps({"occupied": snapshot})}\n\n'
+        while True:
+            events, cursor, reset = channel.wait(cursor, heartbeat)
+            if reset:
+                return
+            if not events:
+                yield ': keepalive\n\n'
+            for seq, data in events:
+                yield f'id: {channel.event_id(seq)}\nevent: seats\ndata: {data}\n\n'
+    finally:
+        channel._unsubscribe()
@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event, select
+
+import hall_layout
+from models import db, ScreeningSeat
+from seat_events import hub as seat_events
+
+# 默认缓存参数，可通过 app.config 覆盖
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_SECONDS = 30
+
+
+# 单个场次的座位占用位图，按 行 * 列数 + 列 定位
+class SeatMap:
+    def __init__(self, screening_id, layout, occupied_ids, valid_until=None):
+        self.screening_id = screening_id
+        self.layout = layout
+        self.rows = layout.rows
+        self.cols = layout.cols
+        self.seats = layout.seats
+        self.valid_until = valid_until
+        self.built_at = time.monotonic()
+        self._index = {seat.seat_id: seat.index for seat in layout.seats}
+        self._bits = bytearray((self.rows * self.cols + 7) // 8)
+        self.mark(occupied_ids)
+
+    def _positions(self, seat_ids):
+        for seat_id in seat_ids:
+            index = self._index.get(seat_id)
+            if index is not None:
+                yield index
+
+    def mark(self, seat_ids):
+        for index in self._positions(seat_ids):
+            self._bits[index >> 3] |= 1 << (index & 7)
+
+    def clear(self, seat_ids):
+        for index in self._positions(seat_ids):
+            self._bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def is_occupied(self, seat):
+        index = seat.index
+        return index is not None and bool(self._bits[index >> 3] & (1 << (index & 7)))
+
+    def occupied_count(self):
+        return sum(bin(byte).count('1') for byte in self._bits)
+
+    def to_bytes(self):
+        return bytes(self._bits)
+
+
+_lock = threading.Lock()
+_seat_maps = OrderedDict()
+
+
+def _build(screening, now):
+    rows = db.session.execute(
+        select(ScreeningSeat.seat_id, ScreeningSeat.status, ScreeningSeat.expires_at).where(
+            ScreeningSeat.screening_id == screening.screening_id,
+            db.or_(ScreeningSeat.status == 'sold', ScreeningSeat.expires_at >= now)
+        )
+    ).all()
+    # 最早到期的锁座时间之后位图失效，需要重建以释放过期座位
+    expiries = [expires_at for _, status, expires_at in rows if status == 'held' and expires_at]
+    return SeatMap(
+        screening.screening_id,
+        hall_layout.get_layout(screening.hall),
+        [seat_id for seat_id, _, _ in rows],
+        valid_until=min(expiries) if expiries else None
+    )
+
+
+def _is_fresh(seat_map, now):
+    max_age = current_app.config.get('SEAT_MAP_CACHE_SECONDS', DEFAULT_CACHE_SECONDS)
+    if time.monotonic() - seat_map.built_at > max_age:
+        return False
+    return seat_map.valid_until is None or now < seat_map.valid_until
+
+
+# 获取场次座位图：命中缓存时不访问数据库
+def get_seat_map(screening, now=None):
+    now = now or datetime.now()
+    with _lock:
+        seat_map = _seat_maps.get(screening.screening_id)
+        if seat_map is not None and _is_fresh(seat_map, now):
+            _seat_maps.move_to_end(screening.screening_id)
+            return seat_map
+
+    seat_map = _build(screening, now)
+    with _lock:
+        _seat_maps[screening.screening_id] = seat_map
+        _seat_maps.move_to_end(screening.screening_id)
+        limit = current_app.config.get('SEAT_MAP_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+        while len(_seat_maps) > limit:
+            _seat_maps.popitem(last=False)
+    return seat_map
+
+
+def invalidate(screening_id=None, hall_id=None):
+    with _lock:
+        if screening_id is None:
+            _seat_maps.clear()
+        else:
+            _seat_maps.pop(screening_id, None)
+    if hall_id is not None:
+        hall_layout.invalidate(hall_id)
+
+
+# 场次当前未到期的锁座，供座位事件频道跟踪到期时间
+def active_holds(screening_id, now=None):
+    now = now or datetime.now()
+    return db.session.execute(
+        select(ScreeningSeat.seat_id, ScreeningSeat.expires_at).where(
+            ScreeningSeat.screening_id == screening_id,
+            ScreeningSeat.status == 'held',
+            ScreeningSeat.expires_at >= now
+        )
+    ).all()
+
+
+# 记录本事务内的占座变化（state 为 held / sold / released），提交成功后再增量更新位图并推送给选座页面
+def record_change(screening_id, seat_ids, state, expires_at=None):
+    db.session.info.setdefault('seat_map_changes', []).append((screening_id, list(seat_ids), state, expires_at))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_changes(session):
+    changes = session.info.pop('seat_map_changes', None)
+    if not changes:
+        return
+    with _lock:
+        for screening_id, seat_ids, state, expires_at in changes:
+            seat_map = _seat_maps.get(screening_id)
+            if seat_map is None:
+                continue
+            if state == 'released':
+                seat_map.clear(seat_ids)
+            else:
+                seat_map.mark(seat_ids)
+                if expires_at and (seat_map.valid_until is None or expires_at < seat_map.valid_until):
+                    seat_map.valid_until = expires_at
+    for screening_id, seat_ids, state, expires_at in changes:
+        seat_events.publish(screening_id, state, seat_ids, expires_at)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('seat_map_changes', None)
@@ -116,7 +116,7 @@ function initReviewLikes() {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/x-www-form-urlencoded',
-                    'X-CSRFToken': getCookie('csrftoken')
+                    'X-CSRFToken': getCsrfToken()
                 }
             })
             .then(response => response.json())
@@ -184,7 +184,12 @@ function initFormValidation() {
     });
 }
 
-// 获取CSRF令牌
+// 获取CSRF令牌：优先读取页面 meta 标签
+function getCsrfToken() {
+    const meta = document.querySelector('meta[name="csrf-token"]');
+    return meta ? meta.content : getCookie('csrftoken');
+}
+
 function getCookie(name) {
     let cookieValue = null;
     if (document.cookie && document.cookie !== '') {
@@ -0,0 +1,510 @@
+import hmac
+import re
+from datetime import datetime
+
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify, abort
+from flask_login import login_user, login_required, logout_user, current_user
+from flask_wtf.csrf import generate_csrf
+from sqlalchemy import update
+
+import seat_events
+from assets import send_asset
+from catalog import get_facets, movie_page, page_size_arg
+from identity import current_user_record, identities, load_principal
+from images import ImageError, ImagePipelineBusy, pipeline, save_avatar, send_media
+from likes import like_buffer, toggle_like, liked_review_ids
+from models import db, User, Movie, Cinema, Hall, Screening, Order, Review
+from order_views import load_order_view, user_order_page
+from page_cache import page_cache, cached_page, cached_fragment
+from passwords import PasswordHasherBusy, hasher, needs_rehash
+from profiling import profiler
+from ratings import apply_review
+from reservation import SeatUnavailableError, reserve_seats, confirm_seats, release_orders, occupied_seat_ids
+from scheduling import showtimes
+from seat_map import get_seat_map, active_holds
+
+# 页面路由
+main = Blueprint('main', __name__)
+
+# 首页
+@main.route('/')
+@cached_page(lambda: ['home'])
+def home():
+    movies = Movie.query.all()
+    return render_template('home.html', movies=movies)
+
+# 电影列表
+@main.route('/movies')
+def movie_list():
+    # 获取搜索和筛选参数
+    search_query = request.args.get('search', '')
+    genre_filter = request.args.get('genre', '')
+    year_filter = request.args.get('year', '')
+    
+    # 分页获取电影，筛选项及数量来自缓存
+    movies, next_cursor = movie_page(
+        search_query,
+        genre_filter,
+        year_filter,
+        cursor=request.args.get('cursor'),
+        page_size=page_size_arg(request.args.get('per_page'))
+    )
+    facets = get_facets()
+    
+    return render_template('movie_list.html', 
+                         movies=movies, 
+                         search_query=search_query,
+                         genre_filter=genre_filter,
+                         year_filter=year_filter,
+                         genres=facets['genres'],
+                         years=facets['years'],
+                         next_cursor=next_cursor,
+                         per_page=request.args.get('per_page'))
+
+# 电影详情
+@main.route('/movie/<int:movie_id>')
+@cached_page(lambda movie_id: [f'movie:{movie_id}'])
+def movie_detail(movie_id):
+    movie = Movie.query.get_or_404(movie_id)
+    reviews = Review.query.options(db.joinedload(Review.user)).filter_by(movie_id=movie_id).order_by(Review.created_at.desc()).all()
+    
+    # 场次片段不含个人状态，缓存后登录用户也无需再查询场次；场次按日期分组后保存在进程内索引中
+    screenings_html = cached_fragment(
+        ('movie_screenings', movie_id),
+        [f'movie:{movie_id}'],
+        lambda: render_template('movie_screenings.html', screenings_by_date=showtimes.by_date(movie_id))
+    )
+    
+    # 点赞数包含尚未写回的增量；当前用户的点赞状态一次查询得到
+    like_counts = like_buffer.display_counts(reviews)
+    liked_ids = set()
+    if current_user.is_authenticated:
+        liked_ids = liked_review_ids(current_user.user_id, [review.review_id for review in reviews])
+    
+    return render_template('movie_detail.html', movie=movie, reviews=reviews, screenings_html=screenings_html, like_counts=like_counts, liked_ids=liked_ids)
+
+# 处理后的头像与海报（内容哈希命名，长期缓存）
+@main.route('/media/<path:filename>')
+def media(filename):
+    return send_media(filename)
+
+# 构建后的静态资源（内容哈希命名，预压缩，长期缓存）
+@main.route('/assets/<path:filename>')
+def asset(filename):
+    return send_asset(filename)
+
+# 内部接口须带 Authorization: Bearer <INTERNAL_TOKEN>；未配置令牌时内部接口不可用。
+# 不按来源地址判断：部署在本机反向代理之后时，所有请求的 remote_addr 都是本机
+def require_internal():
+    token = current_app.config.get('INTERNAL_TOKEN')
+    supplied = request.headers.get('Authorization', '')
+    if not token or not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+        abort(404)
+
+# 页面缓存命中率
+@main.route('/internal/cache-stats')
+def cache_stats():
+    require_internal()
+    return jsonify(page_cache.stats())
+
+# Prometheus 指标：各路由耗时直方图、SQL 条数与耗时、N+1 次数，以及页面缓存命中情况。
+# 指标只统计处理本次请求的工作进程，多进程部署时需按进程分别采集或在 Prometheus 中汇总
+@main.route('/internal/metrics')
+def metrics():
+    require_internal()
+    cache = page_cache.stats()
+    watchers = seat_events.hub.stats()
+    users = identities.stats()
+    hashing = hasher.stats()
+    imaging = pipeline.stats()
+    body = profiler.render_metrics({
+        'lumina_page_cache_hits_total': ('counter', '页面缓存命中次数', cache['hits']),
+        'lumina_page_cache_misses_total': ('counter', '页面缓存未命中次数', cache['misses']),
+        'lumina_page_cache_entries': ('gauge', '页面缓存条数', cache['entries']),
+        'lumina_seat_event_watchers': ('gauge', '正在订阅座位变化的连接数', watchers['watchers']),
+        'lumina_seat_event_channels': ('gauge', '座位事件频道数', watchers['channels']),
+        'lumina_user_cache_hits_total': ('counter', '登录用户身份缓存命中次数', users['hits']),
+        'lumina_user_cache_misses_total': ('counter', '登录用户身份缓存未命中次数', users['misses']),
+        'lumina_password_hash_pending': ('gauge', '正在计算或排队的密码哈希任务数', hashing['pending']),
+        'lumina_password_hash_rejected_total': ('counter', '因排队已满被拒绝的密码哈希任务数', hashing['rejected']),
+        'lumina_password_hash_timeouts_total': ('counter', '等待超时的密码哈希任务数', hashing['timeouts']),
+        'lumina_image_jobs_pending': ('gauge', '正在处理或排队的图片数', imaging['pending']),
+        'lumina_image_jobs_total': ('counter', '已生成各尺寸文件的图片数', imaging['processed']),
+        'lumina_image_jobs_rejected_total': ('counter', '因排队已满被拒绝的图片处理任务数', imaging['rejected']),
+        'lumina_image_jobs_timeouts_total': ('counter', '等待超时的图片处理任务数', imaging['timeouts']),
+    })
+    return current_app.response_class(body, mimetype='text/plain; version=0.0.4')
+
+# 慢请求采样：GET 查看最近的慢请求，POST enabled=1/0 与 threshold_ms 在运行时开关；
+# POST 同样校验 CSRF 令牌，令牌由 GET 返回（须携带同一会话 Cookie，放在 X-CSRFToken 请求头或 csrf_token 字段）
+@main.route('/internal/slow-requests', methods=['GET', 'POST'])
+def slow_requests():
+    require_internal()
+    if request.method == 'POST':
+        threshold = request.form.get('threshold_ms', type=int)
+        profiler.configure_sampling(request.form.get('enabled') == '1', threshold)
+    return jsonify({
+        'enabled': profiler.slow_sampling,
+        'threshold_ms': profiler.slow_request_ms,
+        'requests': profiler.slow_requests(),
+        'csrf_token': generate_csrf()
+    })
+
+# 选座页面
+@main.route('/screening/<int:screening_id>/seats')
+@login_required
+def select_seats(screening_id):
+    screening = Screening.query.get_or_404(screening_id)
+    hall = Hall.query.get(screening.hall_id)
+    cinema = Cinema.query.get(hall.cinema_id)
+    
+    # 先取事件序号再取座位图，页面订阅时从该序号补发，渲染期间的变化不会丢失
+    channel = seat_events.hub.channel(screening_id, lambda: active_holds(screening_id))
+    event_seq = channel.cursor
+    # 放映厅布局与占用位图来自缓存，命中时无需查询座位和订单
+    seat_map = get_seat_map(screening)
+    
+    return render_template('select_seats.html', screening=screening, hall=hall, cinema=cinema, layout=seat_map.layout, seat_map=seat_map, screening_id=screening_id, event_seq=event_seq)
+
+# 选座页面的座位变化推送（SSE）：held / sold / released 增量，断线重连时按 Last-Event-ID 补发；
+# 游标来自其他进程、已重建的频道或已无法补发时，改为先发送当前已占用座位的快照，页面无需重新加载
+@main.route('/screening/<int:screening_id>/seats/events')
+@login_required
+def seat_event_stream(screening_id):
+    Screening.query.get_or_404(screening_id)
+    channel = seat_events.hub.channel(screening_id, lambda: active_holds(screening_id))
+    cursor = channel.position(request.headers.get('Last-Event-ID') or request.args.get('since'))
+    snapshot = None
+    if cursor is None:
+        # 先取序号再查询占用座位，查询期间的变化随后补发
+        cursor = channel.seq
+        snapshot = sorted(occupied_seat_ids(screening_id))
+    return current_app.response_class(
+        seat_events.stream(channel, cursor, current_app.config['SEAT_EVENTS_HEARTBEAT_SECONDS'], snapshot),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# 创建订单
+@main.route('/create_order', methods=['POST'])
+@login_required
+def create_order():
+    screening_id = request.form.get('screening_id')
+    
+    # 如果表单中的screening_id为空，尝试从Referer头中提取
+    if not screening_id or screening_id == 'NaN' or screening_id.strip() == '':
+        referer = request.headers.get('Referer', '')
+        match = re.search(r'/screening/(\d+)', referer)
+        if match:
+            screening_id = match.group(1)
+            current_app.logger.debug('表单缺少 screening_id，从 Referer 中提取到 %s', screening_id)
+        else:
+            current_app.logger.debug('表单缺少 screening_id，Referer 中也没有：%s', referer)
+    
+    seat_ids_str = request.form.get('seat_ids')
+    
+    # 检查screening_id和seat_ids_str是否存在且有效
+    if not screening_id or screening_id == 'NaN':
+        flash('无效的放映信息！', 'danger')
+        return redirect(url_for('main.home'))  # 将index改为home
+
+    if not seat_ids_str or seat_ids_str == 'NaN' or seat_ids_str.strip() == '' or 'NaN' in seat_ids_str:
+        flash('请选择座位！', 'danger')
+        return redirect(url_for('main.select_seats', screening_id=screening_id))
+    
+    try:
+        # 解析座位ID字符串为列表
+        seat_ids = []
+        for id_str in seat_ids_str.split(','):
+            id_str = id_str.strip()
+            if id_str and id_str != 'NaN':
+                seat_ids.append(int(id_str))
+        
+        # 检查是否有有效的座位ID
+        if not seat_ids:
+            flash('请选择座位！', 'danger')
+            return redirect(url_for('main.select_seats', screening_id=screening_id))
+            
+    except ValueError:
+        current_app.logger.debug('座位ID解析失败：%r', seat_ids_str, exc_info=True)
+        flash('座位选择无效，请重新选择！', 'danger')
+        return redirect(url_for('main.select_seats', screening_id=screening_id))
+    
+    screening = Screening.query.get_or_404(screening_id)
+    
+    # 原子锁座并创建待支付订单
+    try:
+        order = reserve_seats(current_user.user_id, screening, seat_ids)
+    except SeatUnavailableError as e:
+        flash(f'{e}，请重新选择！', 'danger')
+        return redirect(url_for('main.select_seats', screening_id=screening_id))
+    
+    return redirect(url_for('main.order_confirmation', order_id=order.order_id))
+
+# 订单确认
+@main.route('/order/<int:order_id>')
+@login_required
+def order_confirmation(order_id):
+    view = load_order_view(order_id)
+    if view is None:
+        abort(404)
+    if view.order.user_id != current_user.user_id:
+        flash('无权访问该订单！', 'danger')
+        return redirect(url_for('main.home'))
+    
+    return render_template('order_confirmation.html', **view._asdict())
+
+# 支付订单
+@main.route('/order/<int:order_id>/pay', methods=['POST'])
+@login_required
+def pay_order(order_id):
+    order = Order.query.get_or_404(order_id)
+    if order.user_id != current_user.user_id:
+        flash('无权操作该订单！', 'danger')
+        return redirect(url_for('main.home'))
+    
+    if order.status != 'pending':
+        flash('订单状态错误！', 'danger')
+        return redirect(url_for('main.order_confirmation', order_id=order_id))
+    
+    # 条件更新订单状态：并发的过期回收或取消已处理该订单时不会命中
+    result = db.session.execute(
+        update(Order)
+        .where(Order.order_id == order_id, Order.status == 'pending')
+        .values(
+            status='paid',
+            payment_method='online',
+            transaction_id=f'TX{datetime.now().strftime("%Y%m%d%H%M%S")}{order_id}'
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.session.rollback()
+        flash('订单状态错误！', 'danger')
+        return redirect(url_for('main.order_confirmation', order_id=order_id))
+    
+    # 锁座已过期或已被释放则撤销支付，订单自动取消
+    if not confirm_seats(order):
+        db.session.rollback()
+        release_orders([order_id])
+        db.session.commit()
+        flash('订单已超时，座位已释放！', 'danger')
+        return redirect(url_for('main.user_profile'))
+    
+    db.session.commit()
+    flash('订单支付成功！', 'success')
+    return redirect(url_for('main.order_confirmation', order_id=order_id))
+
+# 用户中心
+@main.route('/user/profile')
+@login_required
+def user_profile():
+    # 按下单时间键集分页
+    orders, next_cursor = user_order_page(
+        current_user.user_id,
+        cursor=request.args.get('cursor'),
+        page_size=current_app.config['ORDER_PAGE_SIZE']
+    )
+    return render_template('user_center.html', user=current_user, orders=orders, next_cursor=next_cursor)
+
+# 订单详情
+@main.route('/order/<int:order_id>')
+@login_required
+def order_detail(order_id):
+    # 订单及关联信息一次加载
+    view = load_order_view(order_id, user_id=current_user.user_id)
+    if view is None:
+        abort(404)
+    
+    return render_template('order_detail.html', **view._asdict())
+
+# 编辑个人资料
+@main.route('/user/edit', methods=['GET', 'POST'])
+@login_required
+def edit_profile():
+    if request.method == 'POST':
+        # 头像先在进程池中生成各尺寸文件（按内容哈希命名），等待期间不占用数据库连接
+        avatar = None
+        avatar_file = request.files.get('avatar')
+        if avatar_file and avatar_file.filename != '':
+            try:
+                avatar = save_avatar(avatar_file.read(), avatar_file.filename)
+            except ImagePipelineBusy:
+                flash('头像处理繁忙，请稍后再试', 'warning')
+                return redirect(url_for('main.edit_profile'))
+            except ImageError as e:
+                flash(f'头像上传失败：{e}', 'danger')
+                return redirect(url_for('main.edit_profile'))
+
+        # current_user 是缓存的只读身份，修改资料时读取 User 记录，提交后身份缓存失效
+        user = current_user_record(current_user)
+        
+        # 更新用户信息
+        user.real_name = request.form.get('real_name', user.real_name)
+        user.phone = request.form.get('phone', user.phone)
+        if avatar:
+            user.avatar = avatar
+        
+        db.session.commit()
+        flash('个人资料更新成功！', 'success')
+        return redirect(url_for('main.user_profile'))
+    
+    return render_template('edit_profile.html', user=current_user)
+
+# 注册
+@main.route('/register', methods=['GET', 'POST'])
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.home'))
+    
+    if request.method == 'POST':
+        username = request.form['username']
+        email = request.form['email']
+        password = request.form['password']
+        confirm_password = request.form['confirm_password']
+        
+        if User.query.filter_by(username=username).first():
+            flash('用户名已存在！', 'danger')
+            return redirect(url_for('main.register'))
+        
+        if User.query.filter_by(email=email).first():
+            flash('邮箱已被注册！', 'danger')
+            return redirect(url_for('main.register'))
+        
+        if password != confirm_password:
+            flash('两次密码不一致！', 'danger')
+            return redirect(url_for('main.register'))
+        
+        # 哈希在进程池中计算，等待期间不占用数据库连接
+        db.session.close()
+        try:
+            hashed_password = hasher.hash(password)
+        except PasswordHasherBusy:
+            flash('当前注册人数较多，请稍后再试', 'warning')
+            return redirect(url_for('main.register'))
+        user = User(username=username, email=email, password=hashed_password)
+        
+        db.session.add(user)
+        db.session.commit()
+        
+        flash('注册成功！请登录', 'success')
+        return redirect(url_for('main.login'))
+    
+    return render_template('register.html')
+
+# 登录
+@main.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.home'))
+    
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        
+        # 同时支持用户名和邮箱登录；只取主键与密码哈希，校验在进程池中进行，等待期间不占用数据库连接
+        account = db.session.query(User.user_id, User.password).filter(
+            (User.username == username) | (User.email == username)
+        ).first()
+        db.session.close()
+        
+        try:
+            verified = account is not None and hasher.verify(account.password, password)
+        except PasswordHasherBusy:
+            flash('当前登录人数较多，请稍后再试', 'warning')
+            return render_template('login.html')
+        
+        if verified:
+            # 哈希参数调整后，登录成功时按新参数重新计算；进程池繁忙时下次登录再处理
+            if needs_rehash(account.password):
+                try:
+                    db.session.execute(
+                        update(User).where(User.user_id == account.user_id).values(password=hasher.hash(password))
+                    )
+                    db.session.commit()
+                except PasswordHasherBusy:
+                    pass
+            login_user(load_principal(account.user_id))
+            next_page = request.args.get('next')
+            return redirect(next_page) if next_page else redirect(url_for('main.home'))
+        else:
+            flash('登录失败！用户名或密码错误', 'danger')
+    
+    return render_template('login.html')
+
+# 退出登录
+@main.route('/logout')
+def logout():
+    logout_user()
+    return redirect(url_for('main.home'))
+
+# 发布影评
+@main.route('/movie/<int:movie_id>/review', methods=['POST'])
+@login_required
+def add_review(movie_id):
+    Movie.query.get_or_404(movie_id)
+    
+    rating = int(request.form['rating'])
+    content = request.form['content']
+    
+    if rating < 1 or rating > 5:
+        flash('评分必须在1到5星之间！', 'danger')
+        return redirect(url_for('main.movie_detail', movie_id=movie_id))
+    
+    # 检查用户是否已评论过该电影
+    existing_review = Review.query.filter_by(user_id=current_user.user_id, movie_id=movie_id).first()
+    if existing_review:
+        flash('您已经评论过这部电影！', 'warning')
+        return redirect(url_for('main.movie_detail', movie_id=movie_id))
+    
+    review = Review(
+        user_id=current_user.user_id,
+        movie_id=movie_id,
+        rating=rating,
+        content=content
+    )
+    
+    db.session.add(review)
+    
+    # 与影评插入在同一事务内更新电影评分聚合
+    apply_review(movie_id, rating)
+    
+    db.session.commit()
+    
+    flash('影评发布成功！', 'success')
+    return redirect(url_for('main.movie_detail', movie_id=movie_id))
+
+# 点赞影评
+@main.route('/review/<int:review_id>/like', methods=['POST'])
+@login_required
+def like_review(review_id):
+    likes = db.session.query(Review.likes).filter_by(review_id=review_id).scalar()
+    if likes is None:
+        abort(404)
+    
+    # 点赞记录立即写入，计数增量先进缓冲再批量写回
+    status = toggle_like(current_user.user_id, review_id)
+    if like_buffer.should_flush():
+        like_buffer.flush()
+        likes = db.session.query(Review.likes).filter_by(review_id=review_id).scalar()
+    
+    return jsonify({'status': status, 'likes': likes + like_buffer.pending(review_id)})
+
+# 取消订单
+@main.route('/order/<int:order_id>/cancel', methods=['POST'])
+@login_required
+def cancel_order(order_id):
+    order = Order.query.get_or_404(order_id)
+    if order.user_id != current_user.user_id:
+        flash('无权操作该订单！', 'danger')
+        return redirect(url_for('main.home'))
+    
+    if order.status != 'pending':
+        flash('订单状态错误！', 'danger')
+        return redirect(url_for('main.order_confirmation', order_id=order_id))
+    
+    # 释放锁座并归还余票；并发的支付或过期回收已处理该订单时不做任何修改
+    release_orders([order.order_id])
+    db.session.commit()
+    flash('订单已取消！', 'success')
+    return redirect(url_for('main.user_profile'))